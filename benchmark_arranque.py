@@ -0,0 +1,92 @@
+# filename: benchmark_arranque.py
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TEXTOS_PRIMERA = ["¡Me encanta este producto ❤️, lo recomiendo totalmente!", "El envío tardó muchísimo y llegó roto."]
+TEXTOS_SEGUNDA = ["La atención al cliente fue excelente.", "No lo volvería a comprar, una decepción."]
+
+ETAPAS = [
+    ('importacion_ms', "Importar src.api.endpoints"),
+    ('carga_spacy_ms', "Cargar spaCy (LimpiaTexto.cargar)"),
+    ('carga_modelo_ms', "Cargar el modelo (AnalizadorSentimiento.cargar)"),
+    ('primera_inferencia_ms', "Primera limpieza + inferencia"),
+    ('segunda_inferencia_ms', "Segunda limpieza + inferencia (caliente)"),
+]
+
+
+def medicion() -> dict:
+    """Mide cada etapa del arranque en este proceso, que debe ser nuevo."""
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    from src.api import endpoints
+    tiempos['importacion_ms'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    endpoints.limpiador.cargar()
+    tiempos['carga_spacy_ms'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    endpoints.analizador.cargar()
+    tiempos['carga_modelo_ms'] = (time.perf_counter() - inicio) * 1000
+
+    async def inferir(textos):
+        limpios = endpoints.limpiador.limpiar_lote(textos)
+        return await endpoints.analizador.analizar_lote(limpios)
+
+    for clave, textos in (('primera_inferencia_ms', TEXTOS_PRIMERA), ('segunda_inferencia_ms', TEXTOS_SEGUNDA)):
+        inicio = time.perf_counter()
+        asyncio.run(inferir(textos))
+        tiempos[clave] = (time.perf_counter() - inicio) * 1000
+
+    endpoints.db.cerrar()
+    return tiempos
+
+
+def ejecutar_repeticion(directorio: str) -> dict:
+    """Lanza una medición en un proceso nuevo (sin módulos ni modelos ya cargados)."""
+    entorno = dict(os.environ, DB_RUTA=os.path.join(directorio, 'benchmark_arranque.db'))
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--medicion'],
+        env=entorno, capture_output=True, text=True, check=True,
+    ).stdout
+    # La última línea es el JSON con los tiempos; las anteriores son mensajes de los componentes.
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mide el arranque en frío de la API: importación, carga de modelos y primera inferencia.")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Procesos nuevos a medir.")
+    parser.add_argument('--backend', default=None, help="Backend de inferencia (por defecto, ANALIZADOR_BACKEND).")
+    parser.add_argument('--medicion', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['ANALIZADOR_BACKEND'] = args.backend
+
+    if args.medicion:
+        print(json.dumps(medicion()))
+        sys.exit(0)
+
+    print(f"--- Arranque en frío (backend {os.getenv('ANALIZADOR_BACKEND', 'pytorch')}, "
+          f"{args.repeticiones} procesos) ---")
+    with tempfile.TemporaryDirectory() as directorio:
+        mediciones = [ejecutar_repeticion(directorio) for _ in range(args.repeticiones)]
+
+    for clave, nombre in ETAPAS:
+        valores = [m[clave] for m in mediciones]
+        print(f"   - {nombre:<48} mediana {statistics.median(valores):>9,.1f} ms | mín {min(valores):>9,.1f} ms")
+    hasta_listo = [m['importacion_ms'] + m['carga_spacy_ms'] + m['carga_modelo_ms'] + m['primera_inferencia_ms']
+                   for m in mediciones]
+    hasta_salud = [m['importacion_ms'] for m in mediciones]
+    print(f"\n   /salud disponible tras ~{statistics.median(hasta_salud):,.0f} ms; "
+          f"/listo tras ~{statistics.median(hasta_listo):,.0f} ms.")
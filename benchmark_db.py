@@ -0,0 +1,59 @@
+# filename: benchmark_db.py
+
+import argparse
+import os
+import tempfile
+import time
+
+from src.core.database import DatabaseManager
+
+RESULTADO_EJEMPLO = {'sentimiento': 'POS', 'confianza': 0.93, 'scores_detallados': {'POS': 0.93, 'NEU': 0.05, 'NEG': 0.02}}
+
+
+def medir(nombre: str, db_kwargs: dict, escribir, filas: int) -> float:
+    """Escribe `filas` resultados en una base de datos temporal y devuelve filas por segundo."""
+    with tempfile.TemporaryDirectory() as directorio:
+        db = DatabaseManager(os.path.join(directorio, 'benchmark.db'), **db_kwargs)
+        inicio = time.perf_counter()
+        escribir(db, filas)
+        duracion = time.perf_counter() - inicio
+        db.cerrar()
+    velocidad = filas / duracion
+    print(f"   - {nombre:<45} {velocidad:>12,.0f} filas/s")
+    return velocidad
+
+
+def fila_a_fila(db: DatabaseManager, filas: int):
+    for i in range(filas):
+        db.guardar_analisis(f"comentario de prueba {i}", RESULTADO_EJEMPLO, fuente="Benchmark")
+
+
+def por_lotes(db: DatabaseManager, filas: int, tamano: int = 1000):
+    for inicio in range(0, filas, tamano):
+        db.guardar_lote([
+            {'texto_original': f"comentario de prueba {i}", 'resultado': RESULTADO_EJEMPLO, 'fuente': "Benchmark"}
+            for i in range(inicio, min(inicio + tamano, filas))
+        ])
+
+
+def sesion_masiva(db: DatabaseManager, filas: int):
+    with db.sesion_masiva(filas_por_flush=1000) as sesion:
+        for i in range(filas):
+            sesion.agregar(f"comentario de prueba {i}", RESULTADO_EJEMPLO, fuente="Benchmark")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide filas/s de las rutas de escritura de DatabaseManager.")
+    parser.add_argument('--filas', type=int, default=20000, help="Filas a escribir en las rutas por lotes.")
+    parser.add_argument('--filas-lentas', type=int, default=2000, help="Filas a escribir en las rutas fila a fila.")
+    args = parser.parse_args()
+
+    # Configuración anterior de SQLite: journal DELETE y synchronous FULL (fsync en cada commit).
+    original = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+    print("--- Escritura de resultados en SQLite ---")
+    base = medir("guardar_analisis (DELETE/FULL, original)", original, fila_a_fila, args.filas_lentas)
+    medir("guardar_analisis (WAL/NORMAL)", {}, fila_a_fila, args.filas_lentas)
+    lotes = medir("guardar_lote x1000 (WAL/NORMAL)", {}, por_lotes, args.filas)
+    sesion = medir("sesion_masiva flush=1000 (WAL/NORMAL)", {}, sesion_masiva, args.filas)
+    print(f"\n   Aceleración guardar_lote: x{lotes / base:.1f} | sesion_masiva: x{sesion / base:.1f}")
@@ -0,0 +1,73 @@
+# filename: benchmark_normalizacion.py
+
+import argparse
+import random
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from src.utils.preprocesamiento import LimpiaTexto
+
+# --- 1. CONFIGURACIÓN ---
+NOMBRE_DATASET_CSV = 'dataset_sentimiento.csv'
+ADORNOS = ['@usuario', '#promo', 'https://t.co/abc123', 'www.tienda.com', '❤️', '😂', '👍', '🚀', '!!!', '2024', '...']
+
+
+def generar_corpus(cantidad: int) -> list[str]:
+    """Genera comentarios de prueba a partir del dataset, con menciones, URLs y emojis."""
+    base = pd.read_csv(NOMBRE_DATASET_CSV)['texto'].dropna().astype(str).tolist()
+    aleatorio = random.Random(42)
+    return [
+        f"{aleatorio.choice(base)} {' '.join(aleatorio.sample(ADORNOS, aleatorio.randint(1, 4)))}"
+        for _ in range(cantidad)
+    ]
+
+
+def normalizar_por_pasos(limpiador: LimpiaTexto, texto: str) -> str:
+    """Pasos originales de LimpiaTexto, uno tras otro."""
+    texto = limpiador._a_minusculas(texto)
+    texto = limpiador._remover_urls(texto)
+    texto = limpiador._remover_menciones_hashtags(texto)
+    texto = limpiador._remover_emojis(texto)
+    return limpiador._remover_puntuacion_y_numeros(texto)
+
+
+def medir(nombre: str, funcion, repeticiones: int) -> float:
+    """Devuelve el mejor tiempo de varias repeticiones."""
+    mejor = min(_cronometrar(funcion) for _ in range(repeticiones))
+    print(f"   - {nombre:<28} {mejor:.4f}s")
+    return mejor
+
+
+def _cronometrar(funcion) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara la normalización por pasos con el motor precompilado.")
+    parser.add_argument('--cantidad', type=int, default=50000, help="Número de comentarios de prueba.")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Repeticiones por medición.")
+    args = parser.parse_args()
+
+    limpiador = LimpiaTexto()
+    motor = limpiador.motor
+    textos = generar_corpus(args.cantidad)
+    serie = pd.Series(textos, dtype=object)
+    serie_arrow = pd.Series(textos, dtype=pd.ArrowDtype(pa.string()))
+
+    esperados = [normalizar_por_pasos(limpiador, texto) for texto in textos]
+    assert [motor.normalizar(texto) for texto in textos] == esperados, "El motor no reproduce la limpieza por pasos."
+    for s in (serie, serie_arrow):
+        assert motor.normalizar_serie(s).tolist() == esperados, \
+            f"La versión vectorizada ({s.dtype}) no reproduce la limpieza por pasos."
+
+    print(f"--- Normalización sin spaCy ({len(textos)} comentarios) ---")
+    tiempo_pasos = medir("Por pasos (original)", lambda: [normalizar_por_pasos(limpiador, t) for t in textos], args.repeticiones)
+    tiempo_motor = medir("Motor precompilado", lambda: [motor.normalizar(t) for t in textos], args.repeticiones)
+    tiempo_serie = medir("Series (object)", lambda: motor.normalizar_serie(serie), args.repeticiones)
+    tiempo_arrow = medir("Series (ArrowDtype)", lambda: motor.normalizar_serie(serie_arrow), args.repeticiones)
+    print(f"\n   Aceleración motor: x{tiempo_pasos / tiempo_motor:.2f} | Series object: x{tiempo_pasos / tiempo_serie:.2f}"
+          f" | Series Arrow: x{tiempo_pasos / tiempo_arrow:.2f}")
@@ -3,25 +3,35 @@ import pandas as pd
 import plotly.express as px
 from src.core.database import DatabaseManager
 
+# Número de comentarios mostrados en la tabla de datos crudos.
+COMENTARIOS_RECIENTES = 500
+
 st.set_page_config(layout="wide")
 st.title("📊 Dashboard de Análisis de Sentimiento")
 
+@st.cache_resource
+def obtener_db() -> DatabaseManager:
+    """
+    Un único DatabaseManager para todas las recargas y sesiones del dashboard: es seguro
+    entre hilos y cada hilo de Streamlit lee con su propia conexión de solo lectura.
+    """
+    return DatabaseManager()
+
+
 # Conectar a la base de datos
-db = DatabaseManager()
-datos = db.obtener_todos_los_analisis()
+db = obtener_db()
+# Los KPIs y los gráficos se leen de los resúmenes precalculados: su coste depende
+# del número de días, no del número de comentarios.
+totales = db.totales_por_sentimiento()
 
-if not datos:
+if not totales:
     st.warning("No hay datos en la base de datos para mostrar. Ejecuta un análisis primero desde 'run_analysis.py'.")
 else:
-    # Convertir a DataFrame de Pandas para fácil manipulación
-    columnas = ["ID", "Fuente", "Texto", "Sentimiento", "Confianza", "Fecha"]
-    df = pd.DataFrame(datos, columns=columnas)
-
     # --- Fila de KPIs ---
     st.header("Resumen General")
-    total_comentarios = len(df)
-    sent_positivo = len(df[df["Sentimiento"] == "POS"])
-    sent_negativo = len(df[df["Sentimiento"] == "NEG"])
+    total_comentarios = sum(totales.values())
+    sent_positivo = totales.get("POS", 0)
+    sent_negativo = totales.get("NEG", 0)
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Total de Comentarios", f"{total_comentarios}")
@@ -34,15 +44,17 @@ else:
 
     with col_graf1:
         # Gráfico de Pastel
-        fig_pie = px.pie(df, names='Sentimiento', title='Distribución de Sentimientos',
+        df_totales = pd.DataFrame(list(totales.items()), columns=['Sentimiento', 'Cantidad'])
+        fig_pie = px.pie(df_totales, names='Sentimiento', values='Cantidad', title='Distribución de Sentimientos',
                          color='Sentimiento',
                          color_discrete_map={'POS':'green', 'NEG':'red', 'NEU':'grey'})
         st.plotly_chart(fig_pie, use_container_width=True)
 
     with col_graf2:
         # Gráfico de Líneas (evolución en el tiempo)
-        df['Fecha'] = pd.to_datetime(df['Fecha']).dt.date
-        sent_por_dia = df.groupby(['Fecha', 'Sentimiento']).size().reset_index(name='Cantidad')
+        sent_por_dia = pd.DataFrame(db.resumen_por_periodo('dia'),
+                                    columns=['Fecha', 'Sentimiento', 'Cantidad', 'Confianza media'])
+        sent_por_dia['Fecha'] = pd.to_datetime(sent_por_dia['Fecha']).dt.date
         fig_line = px.line(sent_por_dia, x='Fecha', y='Cantidad', color='Sentimiento',
                            title='Evolución de Sentimientos por Día',
                            color_discrete_map={'POS':'green', 'NEG':'red', 'NEU':'grey'})
@@ -50,4 +62,8 @@ else:
 
     # --- Tabla de Datos Crudos ---
     st.header("Comentarios Recientes")
+    columnas = ["ID", "Fuente", "Texto", "Sentimiento", "Confianza", "Fecha"]
+    # Solo el primer bloque de la lectura paginada: los comentarios más recientes.
+    recientes = next(db.iterar_analisis(tamano_bloque=COMENTARIOS_RECIENTES, descendente=True), [])
+    df = pd.DataFrame(recientes, columns=columnas)
     st.dataframe(df[["Fecha", "Texto", "Sentimiento", "Confianza", "Fuente"]], use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,176 @@
+# filename: destilar.py
+
+import argparse
+import asyncio
+import glob
+import os
+import random
+import sqlite3
+import time
+from typing import Iterator, List
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import FeatureUnion
+
+from src.analysis.analizador import AnalizadorSentimiento
+from src.analysis.backends import BackendEstudiante
+from src.utils.preprocesamiento import LimpiaTexto
+
+# --- 1. CONFIGURACIÓN ---
+RUTA_BASE_DATOS = 'sentimientos.db'
+PATRON_COMENTARIOS = 'comentarios_*.txt'
+DIRECTORIO_ESTUDIANTE = AnalizadorSentimiento.DIRECTORIO_ESTUDIANTE
+TAMANO_BLOQUE = 4096
+# Textos que se limpian y etiquetan con el maestro de una vez.
+TAMANO_BLOQUE_MAESTRO = 1024
+
+
+def cargar_corpus(ruta_db: str, patron_txt: str) -> Iterator[str]:
+    """Recorre los textos sin etiquetar de la base de datos y de los archivos de comentarios, sin cargarlos todos."""
+    if os.path.exists(ruta_db):
+        conn = sqlite3.connect(ruta_db)
+        try:
+            for (texto,) in conn.execute("SELECT DISTINCT texto_original FROM analisis"):
+                if isinstance(texto, str):
+                    yield texto
+        finally:
+            conn.close()
+    for ruta in glob.glob(patron_txt):
+        with open(ruta, encoding='utf-8') as archivo:
+            yield from (linea.strip() for linea in archivo if linea.strip())
+
+
+def bloques(textos: Iterator[str], tamano: int) -> Iterator[List[str]]:
+    """Agrupa un iterable de textos en listas de como mucho `tamano` elementos."""
+    bloque = []
+    for texto in textos:
+        bloque.append(texto)
+        if len(bloque) == tamano:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def crear_vectorizador() -> FeatureUnion:
+    """N-gramas de palabras y de caracteres con hashing: sin vocabulario que ajustar ni guardar."""
+    return FeatureUnion([
+        ('palabras', HashingVectorizer(ngram_range=(1, 2), n_features=2 ** 20, alternate_sign=False, norm='l2')),
+        ('caracteres', HashingVectorizer(analyzer='char_wb', ngram_range=(2, 4), n_features=2 ** 20,
+                                         alternate_sign=False, norm='l2')),
+    ])
+
+
+def entrenar_estudiante(textos: list[str], probabilidades: np.ndarray, etiquetas: list[str],
+                        epocas: int) -> tuple[FeatureUnion, SGDClassifier]:
+    """
+    Entrena el estudiante con las etiquetas suaves del maestro: cada texto se repite
+    una vez por clase con peso igual a la probabilidad que le asignó el maestro, lo
+    que equivale a minimizar la entropía cruzada contra la distribución del maestro.
+    """
+    vectorizador = crear_vectorizador()
+    clasificador = SGDClassifier(loss='log_loss', alpha=1e-6)
+    orden = list(range(len(textos)))
+
+    for epoca in range(epocas):
+        random.Random(epoca).shuffle(orden)
+        for inicio in range(0, len(orden), TAMANO_BLOQUE):
+            indices = orden[inicio:inicio + TAMANO_BLOQUE]
+            X = vectorizador.transform([textos[i] for i in indices])
+            X_rep = sp.vstack([X] * len(etiquetas))
+            y_rep = np.repeat(etiquetas, len(indices))
+            pesos = probabilidades[indices].T.reshape(-1)
+            clasificador.partial_fit(X_rep, y_rep, classes=etiquetas, sample_weight=pesos)
+        print(f"   - Época {epoca + 1}/{epocas} completada.")
+
+    return vectorizador, clasificador
+
+
+async def main(ruta_db: str, patron_txt: str, epocas: int, proporcion_validacion: float):
+    print("1. Limpiando el corpus y etiquetándolo con el modelo maestro por bloques...")
+    limpiador = LimpiaTexto()
+    maestro = AnalizadorSentimiento(backend='pytorch')
+    # La carga del modelo no cuenta en la velocidad del maestro.
+    await maestro.calentar()
+    etiquetas = maestro.ejecutor.etiquetas
+
+    # Solo se guardan los textos limpios, sus etiquetas suaves y la etiqueta final del maestro.
+    textos, sentimientos_maestro, filas_probabilidades = [], [], []
+    vistos = set()
+    tiempo_maestro = 0.0
+    for bloque in bloques(cargar_corpus(ruta_db, patron_txt), TAMANO_BLOQUE_MAESTRO):
+        nuevos = []
+        for texto in limpiador.limpiar_lote(bloque):
+            if texto.strip() and texto not in vistos:
+                vistos.add(texto)
+                nuevos.append(texto)
+        if not nuevos:
+            continue
+        inicio = time.perf_counter()
+        resultados = await maestro.analizar_lote(nuevos)
+        tiempo_maestro += time.perf_counter() - inicio
+        textos.extend(nuevos)
+        sentimientos_maestro.extend(r['sentimiento'] for r in resultados)
+        filas_probabilidades.append(np.array([[r['scores_detallados'][e] for e in etiquetas] for r in resultados],
+                                             dtype=np.float32))
+        print(f"   - {len(textos)} textos limpios y únicos etiquetados.")
+    del vistos
+
+    if not textos:
+        print("No hay textos para destilar. Ejecuta primero algún análisis o añade archivos de comentarios.")
+        return
+    probabilidades = np.vstack(filas_probabilidades)
+    del filas_probabilidades
+
+    # Se reserva una parte del corpus para medir la concordancia con el maestro.
+    indices = list(range(len(textos)))
+    random.Random(42).shuffle(indices)
+    n_validacion = max(1, int(len(indices) * proporcion_validacion)) if len(indices) > 1 else 0
+    validacion, entrenamiento = indices[:n_validacion], indices[n_validacion:]
+
+    print(f"\n2. Entrenando el estudiante con {len(entrenamiento)} textos...")
+    vectorizador, clasificador = entrenar_estudiante(
+        [textos[i] for i in entrenamiento], probabilidades[entrenamiento], etiquetas, epocas
+    )
+
+    os.makedirs(DIRECTORIO_ESTUDIANTE, exist_ok=True)
+    joblib.dump(
+        {'vectorizador': vectorizador, 'clasificador': clasificador, 'etiquetas': etiquetas},
+        os.path.join(DIRECTORIO_ESTUDIANTE, BackendEstudiante.ARCHIVO)
+    )
+    print(f"   - Estudiante guardado en: {DIRECTORIO_ESTUDIANTE}")
+
+    if validacion:
+        print(f"\n3. Comparando estudiante y maestro sobre {len(validacion)} textos de validación...")
+        # El estudiante se carga por la misma interfaz que usarán los backfills.
+        estudiante = AnalizadorSentimiento(backend='estudiante')
+        await estudiante.calentar()
+        textos_validacion = [textos[i] for i in validacion]
+        inicio = time.perf_counter()
+        resultados_estudiante = await estudiante.analizar_lote(textos_validacion)
+        tiempo_estudiante = time.perf_counter() - inicio
+
+        concordancia = np.mean([
+            sentimientos_maestro[i] == r['sentimiento']
+            for i, r in zip(validacion, resultados_estudiante)
+        ])
+        velocidad_maestro = len(textos) / tiempo_maestro
+        velocidad_estudiante = len(textos_validacion) / tiempo_estudiante
+        print(f"   - Concordancia con el maestro: {concordancia:.2%}")
+        print(f"   - Maestro: {velocidad_maestro:.1f} textos/s | Estudiante: {velocidad_estudiante:.1f} textos/s "
+              f"(x{velocidad_estudiante / velocidad_maestro:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Destila el modelo fine-tuned en un estudiante lineal ligero.")
+    parser.add_argument('--db', default=RUTA_BASE_DATOS, help="Base de datos con textos ya analizados.")
+    parser.add_argument('--comentarios', default=PATRON_COMENTARIOS, help="Patrón de archivos de comentarios (uno por línea).")
+    parser.add_argument('--epocas', type=int, default=5, help="Pasadas de entrenamiento sobre el corpus.")
+    parser.add_argument('--validacion', type=float, default=0.1, help="Proporción del corpus reservada para medir la concordancia.")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.db, args.comentarios, args.epocas, args.validacion))
@@ -0,0 +1,106 @@
+# filename: evaluar_cascada.py
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+from src.analysis.analizador import AnalizadorSentimiento
+from src.analysis.cascada import AnalizadorCascada, ClasificadorLexico
+from src.utils.preprocesamiento import LimpiaTexto
+
+# --- 1. CONFIGURACIÓN ---
+NOMBRE_DATASET_CSV = 'dataset_sentimiento.csv'
+# Dataset con el que fine_tune.py ajusta el transformer.
+DATASET_FINE_TUNE = 'dataset_sentimiento.csv'
+UMBRALES = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+async def evaluar(analizador: AnalizadorSentimiento, pliegues: list[tuple[ClasificadorLexico, list[str], list[str]]],
+                  umbral: float) -> dict:
+    """
+    Ejecuta la cascada sobre cada pliegue de prueba (con el clasificador léxico entrenado
+    sin ese pliegue) y mide exactitud y velocidad sobre el total de textos.
+    """
+    aciertos = textos_lexico = total = 0
+    duracion = 0.0
+    for clasificador, textos, etiquetas in pliegues:
+        cascada = AnalizadorCascada(analizador, clasificador, umbral)
+        inicio = time.perf_counter()
+        resultados = await cascada.analizar_lote(textos)
+        duracion += time.perf_counter() - inicio
+        aciertos += sum(r['sentimiento'] == etiqueta for r, etiqueta in zip(resultados, etiquetas))
+        textos_lexico += cascada.textos_lexico
+        total += len(textos)
+
+    return {
+        'umbral': umbral,
+        'exactitud': round(aciertos / total, 4),
+        'aciertos': f"{aciertos}/{total}",
+        'fraccion_lexico': round(textos_lexico / total, 4),
+        'textos_lexico': f"{textos_lexico}/{total}",
+        'fraccion_transformer': round((total - textos_lexico) / total, 4),
+        'textos_por_segundo': round(total / duracion, 1),
+    }
+
+
+async def main(ruta_dataset: str, umbrales: list[float], n_pliegues: int, guardar: bool):
+    print(f"Cargando y limpiando el dataset '{ruta_dataset}'...")
+    df = pd.read_csv(ruta_dataset).dropna(subset=['texto', 'etiqueta'])
+    df = df[df['etiqueta'].isin(['NEG', 'NEU', 'POS'])].reset_index(drop=True)
+    limpiador = LimpiaTexto()
+    df['texto_limpio'] = [limpiador.limpiar(texto) for texto in df['texto'].astype(str)]
+
+    if os.path.abspath(ruta_dataset) == os.path.abspath(DATASET_FINE_TUNE):
+        print(f"⚠️ El transformer se ajustó con '{DATASET_FINE_TUNE}': su exactitud sobre estos textos es "
+              f"optimista. Usa --dataset con comentarios etiquetados que no estén en el ajuste fino.")
+
+    # Validación cruzada estratificada: cada texto se evalúa una vez, con un clasificador
+    # léxico que no lo vio al entrenar.
+    n_pliegues = min(n_pliegues, int(df['etiqueta'].value_counts().min()))
+    if n_pliegues < 2:
+        sys.exit("❌ Cada etiqueta necesita al menos 2 textos para la validación cruzada.")
+    print(f"Entrenando el clasificador léxico en {n_pliegues} pliegues ({len(df)} textos)...")
+    pliegues = []
+    for entrenamiento, prueba in StratifiedKFold(n_pliegues, shuffle=True, random_state=42).split(df, df['etiqueta']):
+        clasificador = ClasificadorLexico().entrenar(
+            df['texto_limpio'].iloc[entrenamiento].tolist(), df['etiqueta'].iloc[entrenamiento].tolist()
+        )
+        pliegues.append((clasificador, df['texto_limpio'].iloc[prueba].tolist(), df['etiqueta'].iloc[prueba].tolist()))
+
+    # Sin caché, para medir el coste real del transformer en cada umbral.
+    analizador = AnalizadorSentimiento()
+
+    # Calentamiento para que la primera medición no incluya la carga perezosa del modelo.
+    await analizador.calentar()
+
+    # Un umbral mayor que 1 envía todo al transformer y sirve de referencia.
+    filas = []
+    for umbral in [1.01] + sorted(umbrales):
+        filas.append(await evaluar(analizador, pliegues, umbral))
+
+    print(f"\n--- Compromiso exactitud / velocidad ({len(df)} textos, validación cruzada de {n_pliegues} pliegues) ---")
+    print(pd.DataFrame(filas).to_string(index=False))
+    if len(df) < 200:
+        print(f"ℹ️ Con {len(df)} textos cada acierto mueve la exactitud {1 / len(df):.1%}: "
+              f"las diferencias pequeñas entre umbrales no son significativas.")
+
+    if guardar:
+        ClasificadorLexico().entrenar(df['texto_limpio'].tolist(), df['etiqueta'].tolist()).guardar()
+        print(f"\nClasificador léxico entrenado con todo el dataset y guardado en: {ClasificadorLexico.RUTA_MODELO}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evalúa la cascada léxico → transformer sobre el dataset etiquetado.")
+    parser.add_argument('--dataset', default=NOMBRE_DATASET_CSV,
+                        help="CSV etiquetado (texto, etiqueta). Idealmente, comentarios que no se usaron en fine_tune.py.")
+    parser.add_argument('--umbrales', type=float, nargs='+', default=UMBRALES, help="Umbrales de confianza a evaluar.")
+    parser.add_argument('--pliegues', type=int, default=5, help="Pliegues de la validación cruzada estratificada.")
+    parser.add_argument('--no-guardar', action='store_true', help="No guardar el clasificador léxico final.")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.dataset, args.umbrales, args.pliegues, guardar=not args.no_guardar))
@@ -0,0 +1,135 @@
+# filename: exportar_onnx.py
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from src.analysis.analizador import AnalizadorSentimiento
+from src.analysis.backends import BackendONNX, BackendPyTorch
+from src.utils.preprocesamiento import LimpiaTexto
+
+# --- 1. CONFIGURACIÓN ---
+DIRECTORIO_MODELO_FINE_TUNED = './modelo_fine_tuned'
+DIRECTORIO_ONNX = './modelo_onnx'
+NOMBRE_DATASET_CSV = 'dataset_sentimiento.csv'
+
+
+def exportar(directorio_modelo: str, directorio_salida: str, int8: bool = True) -> None:
+    """
+    Convierte el modelo fine-tuned a ONNX (FP32) y, opcionalmente, genera una
+    versión con cuantización dinámica int8 para CPU.
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise ImportError(
+            "La exportación necesita onnx y onnxruntime. "
+            "Instálalos ejecutando: pip install onnx onnxruntime"
+        )
+
+    os.makedirs(directorio_salida, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(directorio_modelo)
+    modelo = AutoModelForSequenceClassification.from_pretrained(directorio_modelo)
+    modelo.eval()
+
+    # Entrada de ejemplo con dos textos de distinta longitud para fijar los ejes dinámicos.
+    ejemplo = tokenizer(["texto de ejemplo", "otro texto de ejemplo un poco más largo"],
+                        padding=True, truncation=True, return_tensors='pt')
+    nombres_entrada = list(ejemplo.keys())
+    ejes_dinamicos = {nombre: {0: 'lote', 1: 'secuencia'} for nombre in nombres_entrada}
+    ejes_dinamicos['logits'] = {0: 'lote'}
+
+    ruta_fp32 = os.path.join(directorio_salida, BackendONNX.ARCHIVOS['onnx'])
+    print(f"Exportando a ONNX FP32 en: {ruta_fp32}")
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo,
+            tuple(ejemplo[nombre] for nombre in nombres_entrada),
+            ruta_fp32,
+            input_names=nombres_entrada,
+            output_names=['logits'],
+            dynamic_axes=ejes_dinamicos,
+            opset_version=14,
+        )
+
+    # El backend ONNX lee el tokenizer y la configuración (etiquetas) del mismo directorio.
+    tokenizer.save_pretrained(directorio_salida)
+    shutil.copy(os.path.join(directorio_modelo, 'config.json'), directorio_salida)
+
+    if int8:
+        ruta_int8 = os.path.join(directorio_salida, BackendONNX.ARCHIVOS['onnx-int8'])
+        print(f"Cuantizando a int8 (dinámico) en: {ruta_int8}")
+        quantize_dynamic(ruta_fp32, ruta_int8, weight_type=QuantType.QInt8)
+
+
+def verificar_paridad(referencia, candidato, textos: list[str], tolerancia: float, batch_size: int = 32) -> bool:
+    """
+    Compara las probabilidades y las etiquetas de un backend candidato contra la
+    referencia en PyTorch y muestra también la ganancia de velocidad. Los textos
+    deben venir ya limpios con LimpiaTexto, como los recibe el modelo en producción,
+    y las etiquetas se comparan después de las reglas de negocio de AnalizadorSentimiento
+    (un NEU débil puede reasignarse de forma distinta aunque el argmax coincida).
+    """
+    inicio = time.perf_counter()
+    esperado = referencia.inferir(textos, batch_size)
+    tiempo_referencia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenido = candidato.inferir(textos, batch_size)
+    tiempo_candidato = time.perf_counter() - inicio
+
+    reglas = AnalizadorSentimiento(backend='pytorch').aplicar_reglas
+    finales_esperados = [r['sentimiento'] for r in reglas(esperado, referencia.etiquetas)]
+    finales_obtenidos = [r['sentimiento'] for r in reglas(obtenido, candidato.etiquetas)]
+
+    diferencias = np.abs(esperado - obtenido).max(axis=1)
+    diferencia_maxima = float(diferencias.max())
+    coincidencia = float((esperado.argmax(axis=1) == obtenido.argmax(axis=1)).mean())
+    coincidencia_final = float(np.mean([a == b for a, b in zip(finales_esperados, finales_obtenidos)]))
+    correcto = diferencia_maxima <= tolerancia and coincidencia == 1.0 and coincidencia_final == 1.0
+
+    print(f"\n--- Paridad {candidato.nombre} vs pytorch ({len(textos)} textos limpios) ---")
+    print(f"   - Diferencia de score: máxima {diferencia_maxima:.6f} | p50 {float(np.median(diferencias)):.6f} "
+          f"| p99 {float(np.quantile(diferencias, 0.99)):.6f} (tolerancia {tolerancia})")
+    print(f"   - Coincidencia de etiquetas (argmax): {coincidencia:.2%}")
+    print(f"   - Coincidencia de etiquetas finales (con reglas de negocio): {coincidencia_final:.2%}")
+    for texto, a, b in [(t, a, b) for t, a, b in zip(textos, finales_esperados, finales_obtenidos) if a != b][:5]:
+        print(f"     · '{texto}': pytorch {a} | {candidato.nombre} {b}")
+    print(f"   - Tiempo pytorch: {tiempo_referencia:.3f}s | {candidato.nombre}: {tiempo_candidato:.3f}s "
+          f"(x{tiempo_referencia / tiempo_candidato:.2f})")
+    print("   - Resultado: " + ("OK" if correcto else "FUERA DE TOLERANCIA"))
+    return correcto
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el modelo fine-tuned a ONNX y verifica la paridad con PyTorch.")
+    parser.add_argument('--modelo', default=DIRECTORIO_MODELO_FINE_TUNED, help="Directorio del modelo fine-tuned.")
+    parser.add_argument('--salida', default=DIRECTORIO_ONNX, help="Directorio donde se guarda el modelo ONNX.")
+    parser.add_argument('--sin-int8', action='store_true', help="No generar la versión cuantizada int8.")
+    parser.add_argument('--tolerancia', type=float, default=1e-4, help="Diferencia máxima de score admitida para FP32.")
+    parser.add_argument('--tolerancia-int8', type=float, default=0.05, help="Diferencia máxima de score admitida para int8.")
+    parser.add_argument('--solo-verificar', action='store_true', help="No exportar; solo comprobar un modelo ya exportado.")
+    args = parser.parse_args()
+
+    if not args.solo_verificar:
+        exportar(args.modelo, args.salida, int8=not args.sin_int8)
+
+    # Se verifica sobre el texto limpio, que es lo que recibe el modelo; los textos que
+    # quedan vacíos tras la limpieza no llegan al modelo (el analizador los marca NEU).
+    crudos = pd.read_csv(NOMBRE_DATASET_CSV)['texto'].dropna().astype(str).tolist()
+    textos = [texto for texto in LimpiaTexto().limpiar_lote(crudos) if texto.strip()]
+    referencia = BackendPyTorch(args.modelo)
+
+    todo_correcto = verificar_paridad(referencia, BackendONNX(args.salida, 'onnx'), textos, args.tolerancia)
+    if os.path.exists(os.path.join(args.salida, BackendONNX.ARCHIVOS['onnx-int8'])):
+        # La cuantización cambia ligeramente los scores; se exige la tolerancia int8.
+        todo_correcto &= verificar_paridad(referencia, BackendONNX(args.salida, 'onnx-int8'), textos, args.tolerancia_int8)
+
+    sys.exit(0 if todo_correcto else 1)
@@ -1,7 +1,14 @@
 # main.py
-import uvicorn
-import sys
+import argparse
+import gc
 import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
 
 # --- INICIO DE LA SOLUCIÓN ---
 # Esto añade la carpeta raíz del proyecto (Sentiment+) a la lista de rutas de Python.
@@ -9,5 +16,162 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # --- FIN DE LA SOLUCIÓN ---
 
+# --- 1. CONFIGURACIÓN ---
+APLICACION = "src.api.endpoints:app"
+HOST = "127.0.0.1"
+PUERTO = 8000
+# Espera antes de relanzar un worker que terminó de forma inesperada.
+ESPERA_REINICIO_S = 1.0
+# Backends cuyo motor crea sus propios hilos al cargarse: no sobreviven a un fork,
+# así que cada worker carga su copia.
+BACKENDS_SIN_FORK = ('onnx', 'onnx-int8')
+
+
+def _fijar_hilos_torch(hilos: int) -> None:
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+
+
+def precargar_modelos() -> None:
+    """
+    Carga en el proceso padre el pipeline de spaCy y el modelo de sentimiento. Quedan
+    en las cachés de clase de LimpiaTexto y AnalizadorSentimiento, así que los workers
+    que se creen con fork los reutilizan (copy-on-write) en lugar de cargar cada uno el suyo.
+    """
+    from src.utils.preprocesamiento import LimpiaTexto
+    from src.analysis.analizador import AnalizadorSentimiento
+
+    inicio = time.perf_counter()
+    LimpiaTexto().cargar()
+    backend = os.getenv("ANALIZADOR_BACKEND", "pytorch")
+    if backend in BACKENDS_SIN_FORK:
+        print(f"ℹ️ El backend '{backend}' no se puede compartir entre procesos: cada worker cargará su modelo.")
+    else:
+        AnalizadorSentimiento(backend=backend).cargar()
+    print(f"Modelos precargados en {time.perf_counter() - inicio:.1f}s.")
+
+
+def _crear_socket(host: str, puerto: int) -> socket.socket:
+    """Socket de escucha compartido por todos los workers; el kernel reparte las conexiones."""
+    familia = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, puerto))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _lanzar_worker(sock: socket.socket, host: str, puerto: int, hilos_torch: int) -> int:
+    """Crea un worker con fork y devuelve su pid. El hijo sirve la API hasta recibir SIGTERM o SIGINT."""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    codigo = 0
+    try:
+        # uvicorn instala sus propios manejadores para el apagado ordenado.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        _fijar_hilos_torch(hilos_torch)
+        config = uvicorn.Config(APLICACION, host=host, port=puerto)
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        traceback.print_exc()
+        codigo = 1
+    finally:
+        os._exit(codigo)
+
+
+def servir_produccion(host: str, puerto: int, workers: int) -> None:
+    """
+    Modo producción: precarga los modelos una vez, congela el heap y crea `workers`
+    procesos con fork que comparten el socket de escucha y, copy-on-write, los pesos
+    del modelo. El padre solo supervisa: relanza los workers que mueren y, con
+    SIGTERM o SIGINT, apaga todos de forma ordenada.
+
+    Cada worker tiene su propio estado en memoria (caché LRU, planificador, control de
+    admisión, métricas de /metrics y trabajos en curso); los límites configurados por
+    variables de entorno se aplican por worker.
+    """
+    if not hasattr(os, 'fork'):
+        sys.exit("❌ El modo producción necesita fork (Linux o macOS).")
+
+    if os.getenv("INFERENCIA_MODO", "hilo") != "hilo":
+        # Los workers ya reparten la carga entre núcleos; las réplicas en procesos no se pueden heredar.
+        print("ℹ️ En modo producción la inferencia se ejecuta en cada worker: se ignora INFERENCIA_MODO.")
+        os.environ["INFERENCIA_MODO"] = "hilo"
+    # Los tokenizers de Hugging Face avisan (y se desactivan) si se usó su paralelismo antes de un fork.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    hilos_torch = int(os.getenv("INFERENCIA_HILOS_TORCH") or max(1, nucleos // workers))
+
+    # El padre carga el modelo con un solo hilo: un pool de OpenMP creado antes del
+    # fork puede bloquear a los hijos. Cada worker fija después sus propios hilos.
+    os.environ["INFERENCIA_HILOS_TORCH"] = "1"
+    precargar_modelos()
+    os.environ["INFERENCIA_HILOS_TORCH"] = str(hilos_torch)
+
+    # Los objetos ya cargados pasan a la generación permanente: el recolector de los
+    # workers no los recorre y no fuerza la copia de sus páginas de memoria.
+    gc.collect()
+    gc.freeze()
+
+    sock = _crear_socket(host, puerto)
+    print(f"Sirviendo {APLICACION} en http://{host}:{puerto} con {workers} workers "
+          f"({hilos_torch} hilos de torch cada uno).")
+
+    deteniendo = False
+    activos = set()
+
+    def detener(signum, frame):
+        nonlocal deteniendo
+        deteniendo = True
+        for pid in list(activos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, detener)
+    signal.signal(signal.SIGINT, detener)
+
+    # Los trabajos de un worker que muere los reclama otro cuando vence su latido (ver GestorTrabajos).
+    for _ in range(workers):
+        activos.add(_lanzar_worker(sock, host, puerto, hilos_torch))
+
+    while activos:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        activos.discard(pid)
+        if deteniendo:
+            continue
+        print(f"⚠️ El worker {pid} terminó (estado {estado}); relanzándolo.")
+        time.sleep(ESPERA_REINICIO_S)
+        if not deteniendo:
+            activos.add(_lanzar_worker(sock, host, puerto, hilos_torch))
+
+    sock.close()
+    print("Servidor detenido.")
+
+
 if __name__ == "__main__":
-    uvicorn.run("src.api.endpoints:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Arranca la API de análisis de sentimiento.")
+    parser.add_argument("--produccion", action="store_true",
+                        help="Precarga los modelos y sirve con varios workers creados con fork (sin recarga automática).")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "0")) or os.cpu_count() or 1,
+                        help="Número de workers en modo producción (por defecto, uno por núcleo).")
+    parser.add_argument("--host", default=os.getenv("HOST", HOST))
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("PUERTO", str(PUERTO))))
+    args = parser.parse_args()
+
+    if args.produccion:
+        servir_produccion(args.host, args.puerto, max(1, args.workers))
+    else:
+        uvicorn.run(APLICACION, host=args.host, port=args.puerto, reload=True)
@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 from src.connectors.twitter_api import TwitterConnector
 from src.utils.preprocesamiento import LimpiaTexto
-from src.analysis.analizador import AnalizadorSentimiento
+from src.analysis.cascada import crear_analizador
 import pandas as pd
 import asyncio
 
@@ -26,31 +26,40 @@ def ejecutar_analisis_batch(keyword: str, cantidad: int = 10):
 
     # Instanciar limpiador y analizador
     limpiador = LimpiaTexto()
-    analizador = AnalizadorSentimiento()
+    analizador = crear_analizador()
 
     resultados = []
 
     async def analizar_tweets():
-        for tweet in tweets:
-            texto_original = tweet['texto']
-            texto_limpio = limpiador.limpiar(texto_original)
-            try:
-                resultado = await analizador.analizar(texto_limpio)
-                tweet_resultado = {
-                    **tweet,
-                    'texto_limpio': texto_limpio,
-                    'sentimiento': resultado['sentimiento'],
-                    'confianza': resultado['confianza']
-                }
-            except Exception as e:
-                tweet_resultado = {
+        textos_limpios = limpiador.limpiar_lote([tweet['texto'] for tweet in tweets])
+        try:
+            analisis = await analizador.analizar_lote(textos_limpios)
+        except Exception:
+            # Si falla el lote, se analiza tweet a tweet para que un texto problemático
+            # no marque como ERROR a todos los demás.
+            analisis = []
+            for texto_limpio in textos_limpios:
+                try:
+                    analisis.append(await analizador.analizar(texto_limpio))
+                except Exception as e:
+                    analisis.append(e)
+
+        for tweet, texto_limpio, resultado in zip(tweets, textos_limpios, analisis):
+            if isinstance(resultado, Exception):
+                resultados.append({
                     **tweet,
                     'texto_limpio': texto_limpio,
                     'sentimiento': 'ERROR',
                     'confianza': 0.0,
-                    'error': str(e)
-                }
-            resultados.append(tweet_resultado)
+                    'error': str(resultado)
+                })
+            else:
+                resultados.append({
+                    **tweet,
+                    'texto_limpio': texto_limpio,
+                    'sentimiento': resultado['sentimiento'],
+                    'confianza': resultado['confianza']
+                })
 
     asyncio.run(analizar_tweets())
 
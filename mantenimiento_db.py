@@ -0,0 +1,110 @@
+# filename: mantenimiento_db.py
+
+import argparse
+import csv
+import os
+import time
+
+from src.core.archivo import ArchivoParquet
+from src.core.database import DatabaseManager
+
+# --- 1. CONFIGURACIÓN ---
+RUTA_BASE_DATOS = 'sentimientos.db'
+DIRECTORIO_ARCHIVO = 'archivo'
+DIAS_RETENCION = 90
+
+
+def reconstruir_resumenes(db: DatabaseManager) -> None:
+    """Recalcula los resúmenes por día y por hora a partir de la tabla 'analisis'."""
+    inicio = time.perf_counter()
+    db.reconstruir_resumenes()
+    with db.conexiones.sesion_lectura() as conn:
+        filas = conn.execute("SELECT COUNT(*) FROM resumen_sentimiento").fetchone()[0]
+    print(f"✅ Resúmenes reconstruidos: {filas} filas en {time.perf_counter() - inicio:.2f}s.")
+
+
+def reconstruir_indice_texto(db: DatabaseManager) -> None:
+    """Reconstruye el índice de búsqueda de texto completo."""
+    inicio = time.perf_counter()
+    db.reconstruir_indice_texto()
+    print(f"✅ Índice de texto reconstruido en {time.perf_counter() - inicio:.2f}s.")
+
+
+def exportar_csv(db: DatabaseManager, ruta_salida: str, columnas: list, tamano_bloque: int, **filtros) -> None:
+    """
+    Exporta los análisis a CSV bloque a bloque; la memoria usada no depende del tamaño de la tabla.
+    """
+    inicio = time.perf_counter()
+    filas = 0
+    with open(ruta_salida, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        for bloque in db.iterar_analisis(columnas=columnas, tamano_bloque=tamano_bloque, **filtros):
+            escritor.writerows(bloque)
+            filas += len(bloque)
+    print(f"✅ {filas} análisis exportados a '{ruta_salida}' en {time.perf_counter() - inicio:.2f}s.")
+
+
+def archivar(db: DatabaseManager, directorio: str, dias_retencion: int, tamano_bloque: int, vacuum: bool) -> None:
+    """Mueve a Parquet los análisis anteriores a la ventana de retención y compacta SQLite."""
+    inicio = time.perf_counter()
+    tamano_antes = os.path.getsize(db.db_name)
+    archivadas = ArchivoParquet(db, directorio).archivar(dias_retencion, tamano_bloque, vacuum)
+    print(f"✅ {archivadas} análisis archivados en '{directorio}' en {time.perf_counter() - inicio:.2f}s "
+          f"(base de datos: {tamano_antes / 1e6:.1f} MB -> {os.path.getsize(db.db_name) / 1e6:.1f} MB).")
+
+
+def mostrar_tendencia(db: DatabaseManager, directorio: str, **filtros) -> None:
+    """Muestra la tendencia diaria de sentimientos sobre la base de datos y el archivo."""
+    inicio = time.perf_counter()
+    tendencia = ArchivoParquet(db, directorio).tendencia_diaria(**filtros)
+    print(tendencia.to_string(index=False))
+    print(f"\n({len(tendencia)} filas en {time.perf_counter() - inicio:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la base de datos de sentimientos.")
+    parser.add_argument('--db', default=RUTA_BASE_DATOS, help="Archivo de la base de datos.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    subparsers.add_parser('reconstruir-resumenes', help="Recalcula la tabla de resúmenes por periodo.")
+    subparsers.add_parser('reconstruir-indice-texto', help="Reconstruye el índice de búsqueda de texto completo.")
+
+    exportar = subparsers.add_parser('exportar-csv', help="Exporta los análisis a CSV en bloques.")
+    exportar.add_argument('salida', help="Archivo CSV de salida.")
+    exportar.add_argument('--columnas', nargs='+', default=list(DatabaseManager.COLUMNAS_BASICAS),
+                          choices=DatabaseManager.COLUMNAS, help="Columnas a exportar.")
+    exportar.add_argument('--desde', help="fecha_analisis mínima, incluida (YYYY-MM-DD).")
+    exportar.add_argument('--hasta', help="fecha_analisis máxima, excluida (YYYY-MM-DD).")
+    exportar.add_argument('--fuente', help="Exportar solo esta fuente.")
+    exportar.add_argument('--sentimiento', help="Exportar solo este sentimiento.")
+    exportar.add_argument('--confianza-minima', type=float, help="Exportar solo análisis con al menos esta confianza.")
+    exportar.add_argument('--tamano-bloque', type=int, default=5000, help="Filas leídas por bloque.")
+
+    archivo = subparsers.add_parser('archivar', help="Mueve los análisis antiguos a Parquet particionado por día.")
+    archivo.add_argument('--directorio', default=DIRECTORIO_ARCHIVO, help="Raíz del archivo Parquet.")
+    archivo.add_argument('--dias-retencion', type=int, default=DIAS_RETENCION, help="Días que se conservan en SQLite.")
+    archivo.add_argument('--tamano-bloque', type=int, default=50000, help="Filas archivadas por bloque.")
+    archivo.add_argument('--sin-vacuum', action='store_true', help="No compactar SQLite al terminar.")
+
+    tendencia = subparsers.add_parser('tendencia', help="Tendencia diaria sobre la base de datos y el archivo (DuckDB).")
+    tendencia.add_argument('--directorio', default=DIRECTORIO_ARCHIVO, help="Raíz del archivo Parquet.")
+    tendencia.add_argument('--desde', help="Primer día incluido (YYYY-MM-DD).")
+    tendencia.add_argument('--hasta', help="Último día, excluido (YYYY-MM-DD).")
+    tendencia.add_argument('--fuente', help="Limitar a esta fuente.")
+
+    args = parser.parse_args()
+    # Abrir la base de datos ya aplica las migraciones pendientes.
+    with DatabaseManager(args.db) as db:
+        if args.comando == 'reconstruir-resumenes':
+            reconstruir_resumenes(db)
+        elif args.comando == 'reconstruir-indice-texto':
+            reconstruir_indice_texto(db)
+        elif args.comando == 'exportar-csv':
+            exportar_csv(db, args.salida, args.columnas, args.tamano_bloque,
+                         desde=args.desde, hasta=args.hasta, fuente=args.fuente,
+                         sentimiento=args.sentimiento, confianza_minima=args.confianza_minima)
+        elif args.comando == 'archivar':
+            archivar(db, args.directorio, args.dias_retencion, args.tamano_bloque, not args.sin_vacuum)
+        elif args.comando == 'tendencia':
+            mostrar_tendencia(db, args.directorio, desde=args.desde, hasta=args.hasta, fuente=args.fuente)
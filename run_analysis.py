@@ -2,36 +2,25 @@
 
 import os
 import asyncio
+import json
 from dotenv import load_dotenv
-from urllib.parse import urlparse
 
 # --- Importaciones de Conectores ---
-# Se importa el conector de inicio de sesión asistido
-from src.connectors.instagram_assisted_connector import InstagramAssistedConnector
+# El registro elige el conector por la URL y lo importa solo cuando se usa.
+from src.connectors.registro import detectar_fuente, obtener_conector
 
 # --- Importaciones del Núcleo del Sistema ---
-from src.analysis.analizador import AnalizadorSentimiento
+from src.analysis.cascada import crear_analizador
+from src.analysis.cache import CacheResultados
 from src.utils.preprocesamiento import LimpiaTexto
-from src.core.database import DatabaseManager
+from src.core.escritor import EscritorAsincrono, ErrorEscritura
+from src.utils.metricas import REGISTRO
 
 
-def obtener_conector(termino_o_url: str):
-    """
-    Discrimina la plataforma a partir de la URL y devuelve la instancia
-    del conector apropiado.
-    """
-    hostname = urlparse(termino_o_url).hostname
-    
-    if "instagram.com" in hostname:
-        print("Fuente detectada: Instagram (Modo Asistido)")
-        # Se invoca al conector asistido (no necesita credenciales)
-        return InstagramAssistedConnector()
-    
-    # Aquí puedes añadir la lógica para otros conectores si los necesitas
-    # if "youtube.com" in hostname:
-    #     return YouTubeConnector(...)
-
-    raise ValueError(f"No se encontró un conector para la URL: {termino_o_url}")
+# Comentarios que se limpian y analizan juntos antes de pasarlos al escritor.
+TAMANO_BLOQUE = 64
+# Resultados que el escritor no pudo guardar; se pueden reimportar con guardar_lote.
+ARCHIVO_NO_GUARDADOS = 'resultados_no_guardados.jsonl'
 
 async def main(termino_o_url: str, cantidad: int):
     """
@@ -40,34 +29,56 @@ async def main(termino_o_url: str, cantidad: int):
     # Para este método, ya no es necesario cargar credenciales de .env para Instagram
     
     limpiador = LimpiaTexto()
-    analizador = AnalizadorSentimiento()
-    db = DatabaseManager()
+    # La caché persistente evita reanalizar comentarios repetidos entre ejecuciones.
+    analizador = crear_analizador(cache=CacheResultados(ruta_db="cache_resultados.db"))
+    # El guardado corre en su propio hilo: mientras se escribe un bloque, se analiza el siguiente.
+    escritor = EscritorAsincrono()
     
     conector = None
+    calentamiento = None
     try:
+        # Los modelos se cargan en segundo plano mientras el conector extrae los comentarios.
+        calentamiento = asyncio.gather(asyncio.to_thread(limpiador.calentar), analizador.calentar())
+
         print("1. Inicializando conector...")
-        # Se llama al conector sin pasarle credenciales
-        conector = obtener_conector(termino_o_url)
-        fuente = "Instagram"
+        # Se llama al conector sin pasarle credenciales. Los conectores son bloqueantes,
+        # así que corren en un hilo para no frenar la carga de los modelos.
+        conector = await asyncio.to_thread(obtener_conector, termino_o_url)
+        fuente = detectar_fuente(termino_o_url)
         
         print(f"\n2. Extrayendo contenido de {fuente}...")
-        contenido = conector.buscar_comentarios(termino_o_url, cantidad=cantidad)
+        contenido = await asyncio.to_thread(conector.buscar_comentarios, termino_o_url, cantidad)
         
         if not contenido:
             print("No se encontró contenido o hubo un error en la extracción.")
             return
 
+        await calentamiento
+
         print(f"\n3. Se encontraron {len(contenido)} items. Analizando y guardando...")
-        for i, item in enumerate(contenido):
-            texto_original = item.get('texto', '')
-            if not texto_original or not isinstance(texto_original, str):
-                continue
-            
-            texto_limpio = limpiador.limpiar(texto_original)
-            resultado_analisis = await analizador.analizar(texto_limpio)
-            
-            db.guardar_analisis(texto_original, resultado_analisis, fuente=fuente)
-            print(f"   - Item {i+1}/{len(contenido)} de {fuente} analizado y guardado.")
+        items_validos = [
+            item for item in contenido
+            if item.get('texto') and isinstance(item.get('texto'), str)
+        ]
+        for inicio in range(0, len(items_validos), TAMANO_BLOQUE):
+            bloque = items_validos[inicio:inicio + TAMANO_BLOQUE]
+            textos_limpios = limpiador.limpiar_lote([item['texto'] for item in bloque])
+            resultados_analisis = await analizador.analizar_lote(textos_limpios)
+
+            # Si la cola de guardado está llena, se espera sin bloquear el bucle de eventos.
+            await escritor.encolar_lote_async([
+                {
+                    'texto_original': item['texto'], 'resultado': resultado_analisis, 'fuente': fuente,
+                    # Con el id del comentario, volver a analizar la publicación actualiza las filas en lugar de duplicarlas.
+                    'comentario_id': item.get('id'), 'usuario': item.get('usuario'),
+                    'fecha_comentario': item.get('fecha'),
+                }
+                for item, resultado_analisis in zip(bloque, resultados_analisis)
+            ])
+            print(f"   - Items {inicio+1}-{inicio+len(bloque)}/{len(items_validos)} de {fuente} analizados "
+                  f"(en cola de guardado: {escritor.estadisticas()['profundidad_cola']}).")
+
+        print(f"Caché de resultados: {analizador.cache.estadisticas()}")
             
         print(f"\n¡Análisis de {fuente} completado y guardado en la base de datos!")
     
@@ -75,6 +86,25 @@ async def main(termino_o_url: str, cantidad: int):
         print(f"Ha ocurrido un error inesperado en el flujo principal: {e}")
     
     finally:
+        if calentamiento is not None:
+            # Si se salió antes de usar los modelos (sin contenido o por un error), la carga
+            # en segundo plano se cancela y se recoge su resultado para no dejarla huérfana.
+            calentamiento.cancel()
+            await asyncio.gather(calentamiento, return_exceptions=True)
+        # Garantiza que todo lo encolado quede guardado antes de salir.
+        try:
+            escritor.detener()
+        except ErrorEscritura as e:
+            with open(ARCHIVO_NO_GUARDADOS, 'a', encoding='utf-8') as archivo:
+                archivo.writelines(json.dumps(registro, ensure_ascii=False) + '\n' for registro in e.registros)
+            print(f"❌ {e}. Se guardaron en '{ARCHIVO_NO_GUARDADOS}' para no perderlos.")
+        print(f"Escritor de base de datos: {escritor.estadisticas()}")
+        # Con METRICAS_TEXTFILE, las métricas de las etapas se vuelcan para el textfile
+        # collector de node_exporter (las mismas que expone la API en /metrics).
+        ruta_metricas = os.getenv("METRICAS_TEXTFILE")
+        if ruta_metricas:
+            REGISTRO.escribir_textfile(ruta_metricas)
+            print(f"Métricas guardadas en '{ruta_metricas}'.")
         if conector:
             print("Finalizando operación.")
 
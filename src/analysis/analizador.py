@@ -1,6 +1,14 @@
-from typing import Dict, Optional
-from transformers import pipeline
+from typing import Dict, List, Optional
+import numpy as np
 import asyncio
+import os
+import threading
+import time
+
+from src.analysis.cache import CacheResultados
+from src.analysis.ejecutor import EjecutorInferencia
+from src.utils.metricas import (ERRORES, INFERENCIAS_EN_CURSO, LATENCIA_INFERENCIA, PREDICCIONES,
+                                TAMANO_LOTE_INFERENCIA)
 
 class AnalizadorSentimiento:
     """
@@ -9,67 +17,207 @@ class AnalizadorSentimiento:
     """
 
     MODELO_PREENTRENADO: str = './modelo_fine_tuned'
-    _pipeline: Optional[pipeline] = None
+    DIRECTORIO_ONNX: str = './modelo_onnx'
+    DIRECTORIO_ESTUDIANTE: str = './modelo_estudiante'
+    TAMANO_LOTE: int = 32
+    UMBRAL_NEUTRO: float = 0.6
+    # Un ejecutor (con sus réplicas del modelo) por backend, compartido por todas las instancias.
+    _ejecutores: Dict[str, EjecutorInferencia] = {}
+    _lock_carga = threading.Lock()
+
+    def __init__(self, cache: Optional[CacheResultados] = None, backend: Optional[str] = None,
+                 ejecutor: Optional[EjecutorInferencia] = None) -> None:
+        """
+        Inicializa el motor de análisis de sentimiento.
+
+        Args:
+            cache (CacheResultados, opcional): Caché de resultados por texto limpio.
+                Si se indica, los textos ya analizados con el mismo modelo no
+                vuelven a pasar por el transformer.
+            backend (str, opcional): 'pytorch' (por defecto), 'onnx', 'onnx-int8' o
+                'estudiante' (modelo destilado con `destilar.py`).
+                Si no se indica, se lee de la variable de entorno ANALIZADOR_BACKEND.
+            ejecutor (EjecutorInferencia, opcional): Ejecutor dedicado de la inferencia.
+                Si no se indica, se crea uno compartido a partir de las variables
+                de entorno INFERENCIA_* (ver EjecutorInferencia.desde_entorno) con
+                `cargar()` o en el primer análisis, no al construir el analizador.
+        """
+        self.cache = cache
+        self.backend = ejecutor.backend if ejecutor is not None else backend or os.getenv("ANALIZADOR_BACKEND", "pytorch")
+        self._ejecutor = ejecutor
+        self.identidad_modelo = self._calcular_identidad_modelo()
 
-    def __init__(self) -> None:
+    def cargar(self) -> 'AnalizadorSentimiento':
         """
-        Inicializa el pipeline de análisis de sentimiento.
+        Carga el modelo del backend (si no está ya cargado en el proceso).
+        Es bloqueante y se puede llamar varias veces.
         """
-        if AnalizadorSentimiento._pipeline is None:
-            try:
-                AnalizadorSentimiento._pipeline = pipeline(
-                    "sentiment-analysis",
-                    model=self.MODELO_PREENTRENADO
-                )
-            except Exception as e:
-                raise RuntimeError(f"Error cargando el modelo de Transformers: {e}")
+        if self._ejecutor is not None:
+            return self
+        with AnalizadorSentimiento._lock_carga:
+            if self.backend not in AnalizadorSentimiento._ejecutores:
+                try:
+                    AnalizadorSentimiento._ejecutores[self.backend] = EjecutorInferencia.desde_entorno(
+                        self.backend, self._ruta_backend()
+                    )
+                except Exception as e:
+                    raise RuntimeError(f"Error cargando el modelo de Transformers: {e}")
+            self._ejecutor = AnalizadorSentimiento._ejecutores[self.backend]
+        return self
+
+    async def calentar(self) -> None:
+        """
+        Carga el modelo en un hilo y ejecuta una inferencia de prueba, fuera de la
+        caché y de las métricas, para que la primera petición real no pague la inicialización.
+        """
+        await asyncio.to_thread(self.cargar)
+        await self.ejecutor.ejecutar(['calentamiento'], 1)
+
+    @property
+    def cargado(self) -> bool:
+        return self._ejecutor is not None
+
+    @property
+    def ejecutor(self) -> EjecutorInferencia:
+        """Ejecutor de la inferencia; el modelo se carga en el primer uso."""
+        if self._ejecutor is None:
+            self.cargar()
+        return self._ejecutor
+
+    def _ruta_backend(self) -> str:
+        """Directorio del modelo que carga el backend seleccionado."""
+        if self.backend == 'pytorch':
+            return self.MODELO_PREENTRENADO
+        if self.backend == 'estudiante':
+            return self.DIRECTORIO_ESTUDIANTE
+        return self.DIRECTORIO_ONNX
+
+    def _calcular_identidad_modelo(self) -> str:
+        """
+        Identifica el modelo cargado para las claves de la caché: el backend, la ruta
+        absoluta y la fecha de modificación de su configuración, que cambia al reentrenar.
+        """
+        ruta = os.path.abspath(self._ruta_backend())
+        version = 0
+        for archivo in ('config.json', 'estudiante.joblib'):
+            if os.path.exists(os.path.join(ruta, archivo)):
+                version = int(os.path.getmtime(os.path.join(ruta, archivo)))
+                break
+        return f"{self.backend}:{ruta}@{version}"
 
     async def analizar(self, texto_limpio: str) -> Dict[str, any]:
         """
         Analiza el sentimiento de un texto y aplica la lógica de negocio.
         """
-        if not isinstance(texto_limpio, str) or not texto_limpio.strip():
-            # Si el texto está vacío después de la limpieza, lo marcamos como Neutro.
-            return {
-                'sentimiento': 'NEU',
-                'confianza': 1.0,
-                'scores_detallados': {'NEU': 1.0, 'POS': 0.0, 'NEG': 0.0}
-            }
+        resultados = await self.analizar_lote([texto_limpio], batch_size=1)
+        return resultados[0]
+
+    async def analizar_lote(self, textos: List[str], batch_size: Optional[int] = None) -> List[Dict[str, any]]:
+        """
+        Analiza una lista de textos limpios en lotes y devuelve los resultados
+        en el mismo orden de entrada.
+
+        Los textos se ordenan por longitud en tokens antes de agruparlos, de modo
+        que el relleno (padding) de cada lote sea mínimo.
+
+        Args:
+            textos (List[str]): Textos ya procesados por LimpiaTexto.
+            batch_size (int, opcional): Número de textos por pasada del modelo.
 
+        Returns:
+            List[Dict]: Un resultado por texto, con el mismo formato que `analizar`.
+        """
+        inicio = time.perf_counter()
         try:
-            loop = asyncio.get_event_loop()
-            # --- INICIO DE LA CORRECCIÓN ---
-            # Añadimos truncation=True para recortar textos largos automáticamente
-            resultados = await loop.run_in_executor(
-                None,
-                lambda: AnalizadorSentimiento._pipeline(texto_limpio, return_all_scores=True, truncation=True)
-            )
-            # --- FIN DE LA CORRECCIÓN ---
-
-            scores = {r['label'].upper(): r['score'] for r in resultados[0]}
-
-            etiqueta_principal = max(scores, key=scores.get)
-            confianza_principal = scores[etiqueta_principal]
-
-            if etiqueta_principal == 'NEU' and confianza_principal < 0.6:
-                pos_score = scores.get('POS', 0.0)
-                neg_score = scores.get('NEG', 0.0)
-                
-                if pos_score > neg_score:
-                    sentimiento_final = 'POS'
-                    confianza_final = pos_score
-                else:
-                    sentimiento_final = 'NEG'
-                    confianza_final = neg_score
+            with INFERENCIAS_EN_CURSO.en_curso():
+                resultados = await self._analizar_lote(textos, batch_size)
+        except Exception:
+            ERRORES.inc(etapa='inferencia')
+            raise
+        finally:
+            LATENCIA_INFERENCIA.observar(time.perf_counter() - inicio)
+        for resultado in resultados:
+            PREDICCIONES.inc(sentimiento=resultado['sentimiento'])
+        return resultados
+
+    async def _analizar_lote(self, textos: List[str], batch_size: Optional[int]) -> List[Dict[str, any]]:
+        """Pasos de `analizar_lote`, sin la instrumentación."""
+        batch_size = batch_size or self.TAMANO_LOTE
+        resultados: List[Optional[Dict[str, any]]] = [None] * len(textos)
+
+        # Los textos vacíos después de la limpieza se marcan como Neutro sin pasar por el modelo.
+        indices_validos = []
+        for i, texto in enumerate(textos):
+            if not isinstance(texto, str) or not texto.strip():
+                resultados[i] = {
+                    'sentimiento': 'NEU',
+                    'confianza': 1.0,
+                    'scores_detallados': {'NEU': 1.0, 'POS': 0.0, 'NEG': 0.0}
+                }
             else:
-                sentimiento_final = etiqueta_principal
-                confianza_final = confianza_principal
-            
-            return {
-                'sentimiento': sentimiento_final,
-                'confianza': confianza_final,
-                'scores_detallados': scores
-            }
+                indices_validos.append(i)
+
+        if not indices_validos:
+            return resultados
+
+        # Los textos idénticos dentro del lote se analizan una sola vez.
+        posiciones: Dict[str, List[int]] = {}
+        for i in indices_validos:
+            posiciones.setdefault(textos[i], []).append(i)
+
+        try:
+            pendientes = list(posiciones)
+            conocidos: Dict[str, Dict[str, any]] = {}
+            if self.cache is not None:
+                claves = {texto: CacheResultados.clave(texto, self.identidad_modelo) for texto in pendientes}
+                en_cache = self.cache.obtener_varios(claves.values())
+                conocidos = {texto: en_cache[clave] for texto, clave in claves.items() if clave in en_cache}
+                pendientes = [texto for texto in pendientes if texto not in conocidos]
+
+            if pendientes:
+                TAMANO_LOTE_INFERENCIA.observar(len(pendientes))
+                matriz, etiquetas = await self.ejecutor.ejecutar(pendientes, batch_size)
+                nuevos = dict(zip(pendientes, self.aplicar_reglas(matriz, etiquetas)))
+                if self.cache is not None:
+                    self.cache.guardar_varios({claves[texto]: resultado for texto, resultado in nuevos.items()})
+                conocidos.update(nuevos)
+
+            for texto, indices in posiciones.items():
+                for n, i in enumerate(indices):
+                    resultado = conocidos[texto]
+                    # Cada posición recibe su propia copia del resultado.
+                    resultados[i] = resultado if n == 0 else {**resultado, 'scores_detallados': dict(resultado['scores_detallados'])}
+            return resultados
 
         except Exception as e:
-            raise RuntimeError(f"Error durante el análisis de sentimiento: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Error durante el análisis de sentimiento: {e}")
+
+    def aplicar_reglas(self, matriz: np.ndarray, etiquetas: List[str]) -> List[Dict[str, any]]:
+        """
+        Aplica la lógica de negocio sobre la matriz de probabilidades completa:
+        si la etiqueta principal es NEU con confianza menor a 0.6, se reasigna
+        al mayor entre POS y NEG. Las etiquetas que el modelo no tenga cuentan con
+        probabilidad 0. También la usan la cascada (nivel léxico) y `exportar_onnx.py`.
+        """
+        columna = {etiqueta: j for j, etiqueta in enumerate(etiquetas)}
+        filas = np.arange(matriz.shape[0])
+
+        principal = matriz.argmax(axis=1)
+        confianza = matriz[filas, principal]
+
+        ceros = np.zeros(matriz.shape[0], dtype=matriz.dtype)
+        pos = matriz[:, columna['POS']] if 'POS' in columna else ceros
+        neg = matriz[:, columna['NEG']] if 'NEG' in columna else ceros
+        es_neu_debil = (principal == columna.get('NEU', -1)) & (confianza < self.UMBRAL_NEUTRO)
+
+        final = np.where(es_neu_debil, np.where(pos > neg, 'POS', 'NEG'), np.asarray(etiquetas)[principal])
+        confianza_final = np.where(es_neu_debil, np.maximum(pos, neg), confianza)
+
+        return [
+            {
+                'sentimiento': str(final[i]),
+                'confianza': float(confianza_final[i]),
+                'scores_detallados': {etiqueta: float(matriz[i, j]) for j, etiqueta in enumerate(etiquetas)}
+            }
+            for i in filas
+        ]
@@ -0,0 +1,167 @@
+from typing import Dict, List, Optional
+import numpy as np
+import os
+
+
+class BackendInferencia:
+    """
+    Clase base de los motores de inferencia de AnalizadorSentimiento.
+
+    Cada backend recibe textos limpios y devuelve la matriz de probabilidades
+    (una fila por texto, en el orden de entrada) junto con la lista de etiquetas.
+    """
+
+    nombre: str = ''
+
+    def __init__(self, ruta_modelo: str) -> None:
+        # transformers (y torch) se importan al crear el backend, no al importar el módulo.
+        from transformers import AutoTokenizer
+        self.ruta_modelo = ruta_modelo
+        self.tokenizer = AutoTokenizer.from_pretrained(ruta_modelo)
+        self.etiquetas: List[str] = []
+
+    def inferir(self, textos: List[str], batch_size: int) -> np.ndarray:
+        """
+        Ejecuta el modelo sobre los textos agrupándolos en lotes ordenados por
+        longitud en tokens, de modo que el relleno (padding) de cada lote sea mínimo.
+        """
+        # Tokenizamos sin relleno para conocer la longitud real de cada texto.
+        # truncation=True recorta los textos largos al máximo que admite el modelo.
+        codificados = self.tokenizer(textos, truncation=True)
+        longitudes = [len(ids) for ids in codificados['input_ids']]
+        orden = sorted(range(len(textos)), key=lambda i: longitudes[i])
+
+        matriz = np.zeros((len(textos), len(self.etiquetas)), dtype=np.float32)
+        for inicio in range(0, len(orden), batch_size):
+            indices = orden[inicio:inicio + batch_size]
+            lote = self.tokenizer.pad(
+                {clave: [codificados[clave][i] for i in indices] for clave in codificados.keys()},
+                return_tensors='np'
+            )
+            matriz[indices] = _softmax(self._logits(lote))
+        return matriz
+
+    def _logits(self, lote: Dict[str, np.ndarray]) -> np.ndarray:
+        """Devuelve los logits de un lote ya tokenizado y rellenado."""
+        raise NotImplementedError
+
+
+class BackendPyTorch(BackendInferencia):
+    """Inferencia con el modelo de Transformers en PyTorch (comportamiento original)."""
+
+    nombre = 'pytorch'
+
+    def __init__(self, ruta_modelo: str) -> None:
+        super().__init__(ruta_modelo)
+        import torch
+        from transformers import AutoModelForSequenceClassification
+        self._torch = torch
+        self.modelo = AutoModelForSequenceClassification.from_pretrained(ruta_modelo)
+        self.modelo.eval()
+        config = self.modelo.config
+        self.etiquetas = [config.id2label[i].upper() for i in range(config.num_labels)]
+
+    def _logits(self, lote: Dict[str, np.ndarray]) -> np.ndarray:
+        with self._torch.no_grad():
+            entradas = {clave: self._torch.from_numpy(valor).to(self.modelo.device) for clave, valor in lote.items()}
+            return self.modelo(**entradas).logits.cpu().numpy()
+
+
+class BackendONNX(BackendInferencia):
+    """
+    Inferencia en CPU con ONNX Runtime sobre el modelo exportado por `exportar_onnx.py`,
+    en precisión FP32 o con cuantización dinámica int8.
+    """
+
+    ARCHIVOS: Dict[str, str] = {'onnx': 'model.onnx', 'onnx-int8': 'model_int8.onnx'}
+
+    def __init__(self, ruta_modelo: str, nombre: str = 'onnx', hilos: Optional[int] = None) -> None:
+        super().__init__(ruta_modelo)
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError(
+                "El backend ONNX necesita onnxruntime. "
+                "Instálalo ejecutando: pip install onnxruntime"
+            )
+        from transformers import AutoConfig
+
+        self.nombre = nombre
+        ruta_onnx = os.path.join(ruta_modelo, self.ARCHIVOS[nombre])
+        if not os.path.exists(ruta_onnx):
+            raise FileNotFoundError(
+                f"No se encontró '{ruta_onnx}'. Genera el modelo ejecutando: python exportar_onnx.py"
+            )
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+        self.sesion = ort.InferenceSession(ruta_onnx, opciones, providers=['CPUExecutionProvider'])
+        self._entradas = [entrada.name for entrada in self.sesion.get_inputs()]
+
+        config = AutoConfig.from_pretrained(ruta_modelo)
+        self.etiquetas = [config.id2label[i].upper() for i in range(config.num_labels)]
+
+    def _logits(self, lote: Dict[str, np.ndarray]) -> np.ndarray:
+        entradas = {nombre: lote[nombre].astype(np.int64) for nombre in self._entradas}
+        return self.sesion.run(None, entradas)[0]
+
+
+class BackendEstudiante(BackendInferencia):
+    """
+    Modelo lineal destilado sobre n-gramas con hashing, entrenado con `destilar.py`
+    a partir de las probabilidades del modelo fine-tuned. No usa tokenizer ni torch.
+    """
+
+    nombre = 'estudiante'
+    ARCHIVO: str = 'estudiante.joblib'
+
+    def __init__(self, ruta_modelo: str) -> None:
+        import joblib
+        self.ruta_modelo = ruta_modelo
+        ruta = os.path.join(ruta_modelo, self.ARCHIVO)
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(
+                f"No se encontró '{ruta}'. Genera el modelo ejecutando: python destilar.py"
+            )
+        guardado = joblib.load(ruta)
+        self.vectorizador = guardado['vectorizador']
+        self.clasificador = guardado['clasificador']
+        self.etiquetas = guardado['etiquetas']
+        # Columnas de predict_proba reordenadas según self.etiquetas.
+        clases = [str(clase).upper() for clase in self.clasificador.classes_]
+        self._columnas = [clases.index(etiqueta) for etiqueta in self.etiquetas]
+
+    def inferir(self, textos: List[str], batch_size: int) -> np.ndarray:
+        # El modelo lineal no necesita relleno ni ordenar por longitud: se procesa todo de una vez.
+        proba = self.clasificador.predict_proba(self.vectorizador.transform(textos))
+        return proba[:, self._columnas].astype(np.float32)
+
+
+def crear_backend(nombre: str, ruta_modelo: str, hilos: Optional[int] = None) -> BackendInferencia:
+    """
+    Construye el backend indicado.
+
+    Args:
+        nombre (str): 'pytorch', 'onnx', 'onnx-int8' o 'estudiante'.
+        ruta_modelo (str): Directorio del modelo: el fine-tuned de Transformers para
+            'pytorch', el exportado a ONNX para 'onnx' y 'onnx-int8', y el destilado
+            para 'estudiante'.
+        hilos (int, opcional): Hilos intra-op de ONNX Runtime.
+    """
+    if nombre == 'pytorch':
+        return BackendPyTorch(ruta_modelo)
+    if nombre in BackendONNX.ARCHIVOS:
+        return BackendONNX(ruta_modelo, nombre, hilos=hilos)
+    if nombre == 'estudiante':
+        return BackendEstudiante(ruta_modelo)
+    raise ValueError(
+        f"Backend de inferencia desconocido: '{nombre}'. Usa 'pytorch', 'onnx', 'onnx-int8' o 'estudiante'."
+    )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    """Softmax por filas, numéricamente estable."""
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+class CacheResultados:
+    """
+    Caché de resultados de inferencia direccionada por contenido.
+
+    La clave es el hash del texto limpio junto con la identidad del modelo, de modo
+    que un cambio de modelo invalida los resultados anteriores. Tiene una capa en
+    memoria acotada con desalojo LRU y una capa opcional en SQLite que sobrevive
+    a los reinicios.
+    """
+
+    def __init__(self, capacidad: int = 10000, ruta_db: Optional[str] = None) -> None:
+        """
+        Args:
+            capacidad (int): Número máximo de resultados guardados en memoria.
+            ruta_db (str, opcional): Archivo SQLite para la capa persistente. Si es None,
+                la caché vive solo en memoria.
+        """
+        self.capacidad = capacidad
+        self.ruta_db = ruta_db
+        self._memoria: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+        self._conn = None
+        if ruta_db:
+            self._conn = sqlite3.connect(ruta_db, check_same_thread=False)
+            self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_resultados (
+                clave TEXT PRIMARY KEY,
+                resultado TEXT NOT NULL
+            )
+            """)
+            self._conn.commit()
+
+    @staticmethod
+    def clave(texto_limpio: str, identidad_modelo: str) -> str:
+        """Calcula la clave de un texto limpio para un modelo concreto."""
+        contenido = f"{identidad_modelo}\x00{texto_limpio}".encode('utf-8')
+        return hashlib.sha256(contenido).hexdigest()
+
+    def obtener_varios(self, claves: Iterable[str]) -> Dict[str, Dict[str, any]]:
+        """
+        Busca varias claves a la vez y devuelve solo las encontradas.
+        Los aciertos en disco se promueven a la capa en memoria.
+        """
+        encontrados = {}
+        pendientes = []
+        with self._lock:
+            for clave in claves:
+                if clave in self._memoria:
+                    self._memoria.move_to_end(clave)
+                    encontrados[clave] = self._memoria[clave]
+                    self.aciertos_memoria += 1
+                else:
+                    pendientes.append(clave)
+
+            if pendientes and self._conn is not None:
+                for inicio in range(0, len(pendientes), 500):
+                    bloque = pendientes[inicio:inicio + 500]
+                    filas = self._conn.execute(
+                        f"SELECT clave, resultado FROM cache_resultados WHERE clave IN ({','.join('?' * len(bloque))})",
+                        bloque
+                    ).fetchall()
+                    for clave, resultado in filas:
+                        encontrados[clave] = json.loads(resultado)
+                        self._insertar_en_memoria(clave, encontrados[clave])
+                        self.aciertos_disco += 1
+
+            self.fallos += sum(1 for clave in pendientes if clave not in encontrados)
+
+        return {clave: self._copiar(resultado) for clave, resultado in encontrados.items()}
+
+    def guardar_varios(self, resultados: Dict[str, Dict[str, any]]) -> None:
+        """Guarda varios resultados en memoria y, si está activa, en la capa de disco."""
+        with self._lock:
+            for clave, resultado in resultados.items():
+                self._insertar_en_memoria(clave, self._copiar(resultado))
+
+            if self._conn is not None and resultados:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache_resultados (clave, resultado) VALUES (?, ?)",
+                    [(clave, json.dumps(resultado)) for clave, resultado in resultados.items()]
+                )
+                self._conn.commit()
+
+    def _insertar_en_memoria(self, clave: str, resultado: Dict[str, any]) -> None:
+        """Inserta en la capa LRU y desaloja la entrada menos usada si se supera la capacidad."""
+        self._memoria[clave] = resultado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+
+    @staticmethod
+    def _copiar(resultado: Dict[str, any]) -> Dict[str, any]:
+        """Copia un resultado para que los llamantes no modifiquen la entrada guardada."""
+        return {**resultado, 'scores_detallados': dict(resultado.get('scores_detallados', {}))}
+
+    def estadisticas(self) -> Dict[str, any]:
+        """Devuelve los contadores de aciertos y fallos de la caché."""
+        consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+        return {
+            'capacidad': self.capacidad,
+            'en_memoria': len(self._memoria),
+            'persistente': self._conn is not None,
+            'aciertos_memoria': self.aciertos_memoria,
+            'aciertos_disco': self.aciertos_disco,
+            'fallos': self.fallos,
+            'tasa_aciertos': round((self.aciertos_memoria + self.aciertos_disco) / consultas, 4) if consultas else 0.0,
+        }
+
+    def cerrar(self) -> None:
+        """Cierra la conexión de la capa persistente."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,173 @@
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import asyncio
+import os
+import time
+
+from src.analysis.analizador import AnalizadorSentimiento
+from src.utils.metricas import ERRORES, INFERENCIAS_EN_CURSO, LATENCIA_INFERENCIA, PREDICCIONES
+
+
+class ClasificadorLexico:
+    """
+    Clasificador rápido TF-IDF + regresión logística sobre texto ya limpio.
+    Sirve como primer nivel de la cascada: resuelve los comentarios obvios
+    sin pasar por el transformer.
+    """
+
+    RUTA_MODELO: str = './modelo_lexico.joblib'
+
+    def __init__(self) -> None:
+        # scikit-learn se importa aquí: la API importa este módulo aunque la cascada esté desactivada.
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import FeatureUnion, Pipeline
+
+        self.modelo = Pipeline([
+            ('tfidf', FeatureUnion([
+                ('palabras', TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+                # Los n-gramas de caracteres cubren errores ortográficos y alargamientos ("buenísimoooo").
+                ('caracteres', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4), sublinear_tf=True)),
+            ])),
+            ('clasificador', LogisticRegression(max_iter=1000, class_weight='balanced')),
+        ])
+
+    @property
+    def etiquetas(self) -> List[str]:
+        return [str(etiqueta).upper() for etiqueta in self.modelo.classes_]
+
+    def entrenar(self, textos_limpios: List[str], etiquetas: List[str]) -> 'ClasificadorLexico':
+        """Entrena el clasificador con textos limpios y sus etiquetas (NEG, NEU, POS)."""
+        self.modelo.fit(textos_limpios, etiquetas)
+        return self
+
+    def predecir_proba(self, textos_limpios: List[str]) -> Tuple[np.ndarray, List[str]]:
+        """Devuelve la matriz de probabilidades (una fila por texto) y las etiquetas."""
+        return self.modelo.predict_proba(textos_limpios), self.etiquetas
+
+    def guardar(self, ruta: Optional[str] = None) -> None:
+        """Guarda el modelo entrenado en disco."""
+        import joblib
+        joblib.dump(self.modelo, ruta or self.RUTA_MODELO)
+
+    @classmethod
+    def cargar(cls, ruta: Optional[str] = None) -> 'ClasificadorLexico':
+        """Carga un modelo entrenado con `evaluar_cascada.py`."""
+        import joblib
+        ruta = ruta or cls.RUTA_MODELO
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(
+                f"No se encontró el modelo léxico '{ruta}'. Entrénalo ejecutando: python evaluar_cascada.py"
+            )
+        clasificador = cls()
+        clasificador.modelo = joblib.load(ruta)
+        return clasificador
+
+
+class AnalizadorCascada:
+    """
+    Cascada por confianza: el clasificador léxico puntúa todos los textos limpios y
+    solo los que quedan por debajo del umbral de confianza pasan al transformer de
+    AnalizadorSentimiento. Devuelve resultados con el mismo formato que `analizar`.
+
+    Sustituye al analizador allí donde se use: el resto de atributos (`cargar`,
+    `calentar`, `cargado`, `ejecutor`, `cache`...) son los del transformer.
+    Se activa con ANALIZADOR_CASCADA=1 (ver `crear_analizador`).
+    """
+
+    def __init__(self, analizador: AnalizadorSentimiento, clasificador: ClasificadorLexico,
+                 umbral: float = 0.85) -> None:
+        """
+        Args:
+            analizador (AnalizadorSentimiento): Segundo nivel (transformer).
+            clasificador (ClasificadorLexico): Primer nivel (léxico) ya entrenado.
+            umbral (float): Confianza mínima del clasificador léxico para aceptar su respuesta.
+        """
+        self.analizador = analizador
+        self.clasificador = clasificador
+        self.umbral = umbral
+        self.textos_lexico = 0
+        self.textos_transformer = 0
+
+    def __getattr__(self, nombre: str):
+        # Solo se llama para los atributos que la cascada no define.
+        if nombre == 'analizador':
+            raise AttributeError(nombre)
+        return getattr(self.analizador, nombre)
+
+    async def analizar(self, texto_limpio: str) -> Dict[str, any]:
+        """Analiza un único texto limpio a través de la cascada."""
+        resultados = await self.analizar_lote([texto_limpio], batch_size=1)
+        return resultados[0]
+
+    async def analizar_lote(self, textos: List[str], batch_size: Optional[int] = None) -> List[Dict[str, any]]:
+        """
+        Analiza una lista de textos limpios. Los textos vacíos y los que el clasificador
+        léxico no resuelve con suficiente confianza se delegan al transformer.
+        """
+        resultados: List[Optional[Dict[str, any]]] = [None] * len(textos)
+        candidatos = [i for i, texto in enumerate(textos) if isinstance(texto, str) and texto.strip()]
+
+        if candidatos:
+            # Se instrumenta como la inferencia del transformer, para que /metrics cuente todo el tráfico.
+            inicio = time.perf_counter()
+            try:
+                with INFERENCIAS_EN_CURSO.en_curso():
+                    # La predicción léxica es síncrona: en un hilo para no frenar el bucle de eventos.
+                    matriz, etiquetas = await asyncio.to_thread(
+                        self.clasificador.predecir_proba, [textos[i] for i in candidatos]
+                    )
+            except Exception:
+                ERRORES.inc(etapa='inferencia')
+                raise
+            finally:
+                LATENCIA_INFERENCIA.observar(time.perf_counter() - inicio)
+            confianza = matriz.max(axis=1)
+            # Las respuestas aceptadas pasan por las mismas reglas de negocio que las del
+            # transformer (p. ej. reasignar un NEU con confianza menor a UMBRAL_NEUTRO).
+            aceptados = self.analizador.aplicar_reglas(matriz, etiquetas)
+            for fila, i in enumerate(candidatos):
+                if confianza[fila] >= self.umbral:
+                    resultados[i] = aceptados[fila]
+                    PREDICCIONES.inc(sentimiento=aceptados[fila]['sentimiento'])
+
+        escalados = [i for i, resultado in enumerate(resultados) if resultado is None]
+        if escalados:
+            analisis = await self.analizador.analizar_lote([textos[i] for i in escalados], batch_size=batch_size)
+            for i, resultado in zip(escalados, analisis):
+                resultados[i] = resultado
+
+        self.textos_lexico += len(textos) - len(escalados)
+        self.textos_transformer += len(escalados)
+        return resultados
+
+    def estadisticas(self) -> Dict[str, any]:
+        """Devuelve la fracción del tráfico que resolvió cada nivel de la cascada."""
+        total = self.textos_lexico + self.textos_transformer
+        return {
+            'umbral': self.umbral,
+            'textos_lexico': self.textos_lexico,
+            'textos_transformer': self.textos_transformer,
+            'fraccion_lexico': round(self.textos_lexico / total, 4) if total else 0.0,
+            'fraccion_transformer': round(self.textos_transformer / total, 4) if total else 0.0,
+        }
+
+
+def crear_analizador(cache=None, backend: Optional[str] = None) -> Union[AnalizadorSentimiento, AnalizadorCascada]:
+    """
+    Crea el analizador según las variables de entorno: con ANALIZADOR_CASCADA=1 devuelve
+    un AnalizadorCascada con el modelo léxico de ANALIZADOR_CASCADA_MODELO (por defecto
+    './modelo_lexico.joblib') y el umbral ANALIZADOR_CASCADA_UMBRAL (por defecto 0.85);
+    si no, el AnalizadorSentimiento de siempre.
+
+    Args:
+        cache (CacheResultados, opcional): Caché de resultados del transformer.
+        backend (str, opcional): Backend del transformer (ver AnalizadorSentimiento).
+    """
+    analizador = AnalizadorSentimiento(cache=cache, backend=backend)
+    if os.getenv("ANALIZADOR_CASCADA", "0") == "0":
+        return analizador
+    clasificador = ClasificadorLexico.cargar(os.getenv("ANALIZADOR_CASCADA_MODELO") or None)
+    umbral = float(os.getenv("ANALIZADOR_CASCADA_UMBRAL", "0.85"))
+    print(f"ℹ️ Cascada léxico → transformer activada (umbral {umbral}).")
+    return AnalizadorCascada(analizador, clasificador, umbral)
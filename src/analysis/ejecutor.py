@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+from src.analysis.backends import BackendInferencia, crear_backend
+
+# Backend de la réplica cuando este módulo se ejecuta dentro de un proceso de inferencia.
+_backend_replica: Optional[BackendInferencia] = None
+
+
+def _configurar_hilos_torch(hilos: Optional[int]) -> None:
+    """Fija los hilos intra-op de torch para no competir con otros hilos por los núcleos."""
+    if not hilos:
+        return
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+
+
+def _inicializar_replica(backend: str, ruta_modelo: str,
+                         nucleos: Optional[List[int]], hilos: Optional[int]) -> None:
+    """Inicializador de cada proceso réplica: fija afinidad e hilos y carga el modelo."""
+    global _backend_replica
+    if nucleos and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, nucleos)
+    _configurar_hilos_torch(hilos)
+    _backend_replica = crear_backend(backend, ruta_modelo, hilos=hilos)
+
+
+def _etiquetas_replica() -> List[str]:
+    """Devuelve las etiquetas del modelo de la réplica (sirve también para calentarla)."""
+    return _backend_replica.etiquetas
+
+
+def _inferir_en_replica(textos: List[str], batch_size: int) -> np.ndarray:
+    """Ejecuta la inferencia dentro de un proceso réplica."""
+    return _backend_replica.inferir(textos, batch_size)
+
+
+class EjecutorInferencia:
+    """
+    Ejecutor dedicado para la inferencia de AnalizadorSentimiento.
+
+    Tiene dos modos:
+    - 'hilo': una única réplica del modelo atendida por un hilo propio, con los
+      hilos intra-op de torch ajustados para no competir con el pool por defecto de asyncio.
+    - 'procesos': N réplicas en procesos separados, cada una fijada a un subconjunto
+      de núcleos, con despacho 'round-robin' o 'menos-cargado'.
+    """
+
+    def __init__(self, backend: str, ruta_modelo: str, modo: str = 'hilo',
+                 replicas: Optional[int] = None, hilos_torch: Optional[int] = None,
+                 despacho: str = 'menos-cargado') -> None:
+        """
+        Args:
+            backend (str): Backend de inferencia (ver `crear_backend`).
+            ruta_modelo (str): Directorio del modelo que carga ese backend.
+            modo (str): 'hilo' o 'procesos'.
+            replicas (int, opcional): Número de procesos réplica (modo 'procesos').
+                Por defecto, uno por cada núcleo disponible.
+            hilos_torch (int, opcional): Hilos intra-op por réplica. Por defecto, en modo
+                'hilo' todos los núcleos y en modo 'procesos' los núcleos asignados a la réplica.
+            despacho (str): 'round-robin' o 'menos-cargado' (modo 'procesos').
+        """
+        if modo not in ('hilo', 'procesos'):
+            raise ValueError(f"Modo de ejecución desconocido: '{modo}'. Usa 'hilo' o 'procesos'.")
+        if despacho not in ('round-robin', 'menos-cargado'):
+            raise ValueError(f"Despacho desconocido: '{despacho}'. Usa 'round-robin' o 'menos-cargado'.")
+
+        self.backend = backend
+        self.modo = modo
+        self.despacho = despacho
+        self._lock = threading.Lock()
+
+        nucleos = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+
+        if modo == 'hilo':
+            hilos = hilos_torch or len(nucleos)
+            _configurar_hilos_torch(hilos)
+            self._motor = crear_backend(backend, ruta_modelo, hilos=hilos)
+            self.etiquetas = self._motor.etiquetas
+            self._pools = [ThreadPoolExecutor(max_workers=1, thread_name_prefix='inferencia')]
+        else:
+            replicas = max(1, min(replicas or len(nucleos), len(nucleos)))
+            por_replica = len(nucleos) // replicas
+            contexto = multiprocessing.get_context('spawn')
+            self._pools = []
+            for r in range(replicas):
+                asignados = nucleos[r * por_replica:(r + 1) * por_replica]
+                self._pools.append(ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=contexto,
+                    initializer=_inicializar_replica,
+                    initargs=(backend, ruta_modelo, asignados, hilos_torch or len(asignados)),
+                ))
+            # Se carga el modelo en todas las réplicas ahora para detectar errores al arrancar.
+            calentamiento = [pool.submit(_etiquetas_replica) for pool in self._pools]
+            self.etiquetas = [futuro.result() for futuro in calentamiento][0]
+
+        self._pendientes = [0] * len(self._pools)
+        self._turno = itertools.cycle(range(len(self._pools)))
+
+    @classmethod
+    def desde_entorno(cls, backend: str, ruta_modelo: str) -> 'EjecutorInferencia':
+        """
+        Construye el ejecutor a partir de las variables de entorno INFERENCIA_MODO,
+        INFERENCIA_REPLICAS, INFERENCIA_HILOS_TORCH e INFERENCIA_DESPACHO.
+        """
+        replicas = os.getenv("INFERENCIA_REPLICAS")
+        hilos = os.getenv("INFERENCIA_HILOS_TORCH")
+        return cls(
+            backend, ruta_modelo,
+            modo=os.getenv("INFERENCIA_MODO", "hilo"),
+            replicas=int(replicas) if replicas else None,
+            hilos_torch=int(hilos) if hilos else None,
+            despacho=os.getenv("INFERENCIA_DESPACHO", "menos-cargado"),
+        )
+
+    @property
+    def paralelismo(self) -> int:
+        """Número de lotes que pueden ejecutarse a la vez."""
+        return len(self._pools)
+
+    def _elegir_replica(self) -> int:
+        """Elige la réplica que atenderá el siguiente lote."""
+        with self._lock:
+            if self.despacho == 'round-robin':
+                indice = next(self._turno)
+            else:
+                indice = min(range(len(self._pools)), key=lambda i: self._pendientes[i])
+            self._pendientes[indice] += 1
+            return indice
+
+    async def _ejecutar_en_replica(self, textos: List[str], batch_size: int) -> np.ndarray:
+        indice = self._elegir_replica()
+        loop = asyncio.get_event_loop()
+        try:
+            if self.modo == 'hilo':
+                return await loop.run_in_executor(self._pools[indice], self._motor.inferir, textos, batch_size)
+            return await loop.run_in_executor(self._pools[indice], _inferir_en_replica, textos, batch_size)
+        finally:
+            with self._lock:
+                self._pendientes[indice] -= 1
+
+    async def ejecutar(self, textos: List[str], batch_size: int) -> Tuple[np.ndarray, List[str]]:
+        """
+        Ejecuta la inferencia y devuelve la matriz de probabilidades (en el orden de
+        entrada) y las etiquetas. En modo 'procesos', las listas grandes se reparten
+        entre las réplicas para aprovechar todos los núcleos.
+        """
+        if len(self._pools) == 1 or len(textos) <= batch_size:
+            return await self._ejecutar_en_replica(textos, batch_size), self.etiquetas
+
+        # Trozos múltiplos de batch_size, uno por réplica como máximo.
+        tamano = math.ceil(math.ceil(len(textos) / len(self._pools)) / batch_size) * batch_size
+        trozos = [textos[i:i + tamano] for i in range(0, len(textos), tamano)]
+        matrices = await asyncio.gather(*(self._ejecutar_en_replica(trozo, batch_size) for trozo in trozos))
+        return np.concatenate(matrices), self.etiquetas
+
+    def cerrar(self) -> None:
+        """Detiene los hilos o procesos de inferencia."""
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,182 @@
+from collections import Counter, deque
+from typing import Dict, List, Optional
+import asyncio
+import time
+
+from src.analysis.analizador import AnalizadorSentimiento
+
+
+class PlanificadorMicroLotes:
+    """
+    Agrupa las peticiones concurrentes de análisis en micro-lotes.
+
+    Cada llamada a `analizar` deja su texto en una cola y espera un futuro. Un bucle
+    en segundo plano toma el primer texto disponible, sigue recogiendo textos durante
+    una ventana corta (o hasta llenar el lote) y ejecuta una sola pasada del modelo
+    con `AnalizadorSentimiento.analizar_lote`, resolviendo el futuro de cada llamante.
+    """
+
+    def __init__(self, analizador: AnalizadorSentimiento, ventana_ms: float = 5.0,
+                 tamano_maximo: int = 32, muestras_espera: int = 10000) -> None:
+        """
+        Args:
+            analizador (AnalizadorSentimiento): Analizador que ejecuta los lotes.
+            ventana_ms (float): Tiempo máximo que se espera a más peticiones tras la primera.
+            tamano_maximo (int): Número máximo de textos por lote.
+            muestras_espera (int): Cantidad de tiempos de espera recientes usados en los percentiles.
+        """
+        self.analizador = analizador
+        self.ventana_ms = ventana_ms
+        self.tamano_maximo = tamano_maximo
+
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        # Con varias réplicas de inferencia se ejecutan tantos lotes a la vez como réplicas haya.
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._en_curso: set = set()
+
+        self._lotes_ejecutados = 0
+        self._textos_procesados = 0
+        self._tamanos_lote: Counter = Counter()
+        self._esperas_ms: deque = deque(maxlen=muestras_espera)
+
+    def iniciar(self) -> None:
+        """Arranca el bucle de agrupación en el event loop actual."""
+        if self._tarea is None or self._tarea.done():
+            self._cola = asyncio.Queue()
+            # El semáforo se crea con el primer lote: consultar el paralelismo carga el modelo.
+            self._semaforo = None
+            self._tarea = asyncio.get_event_loop().create_task(self._bucle())
+
+    async def detener(self) -> None:
+        """
+        Detiene el bucle de agrupación y los lotes en curso. Las peticiones que
+        no llegaron a resolverse reciben un RuntimeError en lugar de esperar para siempre.
+        """
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._tarea = None
+
+        en_curso = list(self._en_curso)
+        for tarea in en_curso:
+            tarea.cancel()
+        await asyncio.gather(*en_curso, return_exceptions=True)
+
+        pendientes = []
+        while self._cola is not None and not self._cola.empty():
+            pendientes.append(self._cola.get_nowait())
+        self._fallar(pendientes, RuntimeError("El planificador de micro-lotes se detuvo."))
+
+    @staticmethod
+    def _fallar(lote: List[tuple], error: BaseException) -> None:
+        """Resuelve con `error` los futuros del lote que siguen pendientes."""
+        for _, futuro, _ in lote:
+            if not futuro.done():
+                futuro.set_exception(error)
+
+    async def analizar(self, texto_limpio: str) -> Dict[str, any]:
+        """
+        Encola un texto limpio y espera su resultado, con el mismo formato que
+        `AnalizadorSentimiento.analizar`.
+        """
+        if self._tarea is None:
+            self.iniciar()
+        futuro = asyncio.get_event_loop().create_future()
+        await self._cola.put((texto_limpio, futuro, time.perf_counter()))
+        return await futuro
+
+    async def _bucle(self) -> None:
+        """Recoge peticiones en lotes y los lanza según el paralelismo del ejecutor."""
+        while True:
+            lote = []
+            try:
+                lote.append(await self._cola.get())
+                limite = time.perf_counter() + self.ventana_ms / 1000
+
+                while len(lote) < self.tamano_maximo:
+                    restante = limite - time.perf_counter()
+                    if restante <= 0:
+                        break
+                    try:
+                        lote.append(await asyncio.wait_for(self._cola.get(), timeout=restante))
+                    except asyncio.TimeoutError:
+                        break
+
+                if self._semaforo is None:
+                    # Consultar el paralelismo carga el modelo si aún no lo está: en un hilo.
+                    await asyncio.to_thread(self.analizador.cargar)
+                    self._semaforo = asyncio.Semaphore(self.analizador.ejecutor.paralelismo)
+                await self._semaforo.acquire()
+            except asyncio.CancelledError:
+                self._fallar(lote, RuntimeError("El planificador de micro-lotes se detuvo."))
+                raise
+            except Exception as e:
+                # P. ej. el modelo no se pudo cargar: fallan las peticiones de este lote,
+                # el bucle sigue vivo y el siguiente lote vuelve a intentarlo.
+                self._fallar(lote, e)
+                continue
+
+            tarea = asyncio.get_event_loop().create_task(self._ejecutar_lote(lote))
+            self._en_curso.add(tarea)
+            tarea.add_done_callback(self._lote_terminado)
+
+    def _lote_terminado(self, tarea: asyncio.Task) -> None:
+        """Libera el hueco de ejecución de un lote terminado."""
+        self._en_curso.discard(tarea)
+        self._semaforo.release()
+
+    async def _ejecutar_lote(self, lote: List[tuple]) -> None:
+        """Ejecuta un lote en una sola pasada y resuelve los futuros pendientes."""
+        inicio = time.perf_counter()
+        for _, _, encolado in lote:
+            self._esperas_ms.append((inicio - encolado) * 1000)
+        self._lotes_ejecutados += 1
+        self._textos_procesados += len(lote)
+        self._tamanos_lote[len(lote)] += 1
+
+        textos = [texto for texto, _, _ in lote]
+        try:
+            resultados = await self.analizador.analizar_lote(textos, batch_size=len(textos))
+        except asyncio.CancelledError:
+            self._fallar(lote, RuntimeError("El planificador de micro-lotes se detuvo."))
+            raise
+        except Exception as e:
+            self._fallar(lote, e)
+            return
+
+        for (_, futuro, _), resultado in zip(lote, resultados):
+            # El llamante pudo haberse cancelado mientras esperaba.
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    def estadisticas(self) -> Dict[str, any]:
+        """
+        Devuelve estadísticas de tamaño de lote y de tiempo de espera en cola,
+        útiles para ajustar la ventana frente a la latencia p99.
+        """
+        esperas = sorted(self._esperas_ms)
+
+        def percentil(p: float) -> float:
+            if not esperas:
+                return 0.0
+            return round(esperas[min(len(esperas) - 1, int(p / 100 * len(esperas)))], 3)
+
+        return {
+            'ventana_ms': self.ventana_ms,
+            'tamano_maximo': self.tamano_maximo,
+            'en_cola': self._cola.qsize() if self._cola is not None else 0,
+            'lotes_ejecutados': self._lotes_ejecutados,
+            'textos_procesados': self._textos_procesados,
+            'tamano_medio_lote': round(self._textos_procesados / self._lotes_ejecutados, 3) if self._lotes_ejecutados else 0.0,
+            'distribucion_tamano_lote': dict(sorted(self._tamanos_lote.items())),
+            'espera_cola_ms': {
+                'p50': percentil(50),
+                'p95': percentil(95),
+                'p99': percentil(99),
+                'max': round(esperas[-1], 3) if esperas else 0.0,
+            },
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from src.utils.metricas import REGISTRO
+
+RECHAZOS = REGISTRO.contador(
+    'sentimiento_admision_rechazos_total', 'Peticiones rechazadas por el control de admisión.',
+    etiquetas=('motivo', 'carril'))
+
+
+class ServicioSaturado(Exception):
+    """La cola del carril está llena; el cliente debe reintentar pasados `reintentar_en_s` segundos."""
+
+    def __init__(self, reintentar_en_s: int) -> None:
+        super().__init__(f"Servicio saturado; reintenta en {reintentar_en_s} s.")
+        self.reintentar_en_s = reintentar_en_s
+
+
+class PlazoVencido(Exception):
+    """La petición agotó su plazo esperando turno; se descarta sin procesarla."""
+
+
+class Turno:
+    """Plaza de ejecución concedida por `ControlAdmision`. `liberar` se puede llamar varias veces."""
+
+    def __init__(self, control: 'ControlAdmision') -> None:
+        self._control = control
+        self._inicio = time.monotonic()
+        self._liberado = False
+
+    def liberar(self) -> None:
+        if not self._liberado:
+            self._liberado = True
+            self._control._liberar(time.monotonic() - self._inicio)
+
+
+class ControlAdmision:
+    """
+    Control de admisión con contrapresión para la ruta de análisis.
+
+    Limita las peticiones en ejecución a `max_en_curso`. Las que llegan con todo
+    ocupado esperan en una cola acotada por carril; si la cola de su carril está
+    llena se rechazan de inmediato con `ServicioSaturado` (HTTP 429 con Retry-After)
+    en lugar de acumularse. El carril 'interactiva' se atiende siempre antes que
+    'masiva', y cada petición tiene un plazo: si vence esperando turno se descarta
+    con `PlazoVencido`, porque su cliente ya habrá desistido.
+
+    Se usa desde un único event loop, así que no necesita locks.
+    """
+
+    CARRILES = {'interactiva': 0, 'masiva': 1}
+
+    def __init__(self, max_en_curso: int = 64, max_cola_interactiva: int = 256,
+                 max_cola_masiva: int = 32, plazo_defecto_s: float = 30.0) -> None:
+        """
+        Args:
+            max_en_curso (int): Peticiones ejecutándose a la vez.
+            max_cola_interactiva (int): Peticiones interactivas que pueden esperar turno.
+            max_cola_masiva (int): Peticiones masivas que pueden esperar turno.
+            plazo_defecto_s (float): Plazo de una petición que no indica el suyo.
+        """
+        self.max_en_curso = max_en_curso
+        self.max_cola = {'interactiva': max_cola_interactiva, 'masiva': max_cola_masiva}
+        self.plazo_defecto_s = plazo_defecto_s
+
+        self.en_curso = 0
+        self._esperando: list = []
+        self._en_cola: Dict[str, int] = {carril: 0 for carril in self.CARRILES}
+        self._secuencia = itertools.count()
+        # Media móvil del tiempo de servicio, para estimar el Retry-After.
+        self._servicio_medio_s = 0.1
+
+        self.admitidas = 0
+        self.rechazadas = 0
+        self.vencidas = 0
+
+    async def solicitar(self, carril: str = 'interactiva', plazo_s: Optional[float] = None) -> Turno:
+        """
+        Espera un turno de ejecución. Hay que devolverlo con `Turno.liberar`
+        (o usar `admitir` en un bloque 'async with').
+
+        Raises:
+            ServicioSaturado: La cola del carril está llena.
+            PlazoVencido: El plazo venció antes de conseguir turno.
+        """
+        if carril not in self.CARRILES:
+            raise ValueError(f"Carril no soportado: '{carril}'. Usa uno de {tuple(self.CARRILES)}.")
+
+        if self.en_curso < self.max_en_curso and not self._hay_espera():
+            self.en_curso += 1
+            self.admitidas += 1
+            return Turno(self)
+
+        if self._en_cola[carril] >= self.max_cola[carril]:
+            self.rechazadas += 1
+            RECHAZOS.inc(motivo='cola_llena', carril=carril)
+            raise ServicioSaturado(self.estimar_espera_s())
+
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._esperando, (self.CARRILES[carril], next(self._secuencia), futuro))
+        self._en_cola[carril] += 1
+        plazo = self.plazo_defecto_s if plazo_s is None else plazo_s
+        try:
+            # Si vence el plazo, wait_for cancela el futuro y `_liberar` lo salta.
+            await asyncio.wait_for(futuro, timeout=max(0.0, plazo))
+        except asyncio.TimeoutError:
+            self.vencidas += 1
+            RECHAZOS.inc(motivo='plazo_vencido', carril=carril)
+            raise PlazoVencido(f"La petición esperó más de {plazo * 1000:.0f} ms por un turno.")
+        except asyncio.CancelledError:
+            # El cliente se fue justo cuando se le cedía el turno: se devuelve.
+            if futuro.done() and not futuro.cancelled():
+                self._liberar(0.0, medir=False)
+            raise
+        finally:
+            self._en_cola[carril] -= 1
+
+        self.admitidas += 1
+        return Turno(self)
+
+    @asynccontextmanager
+    async def admitir(self, carril: str = 'interactiva', plazo_s: Optional[float] = None) -> AsyncIterator[Turno]:
+        """Versión 'async with' de `solicitar`: el turno se libera al salir del bloque."""
+        turno = await self.solicitar(carril, plazo_s)
+        try:
+            yield turno
+        finally:
+            turno.liberar()
+
+    def _hay_espera(self) -> bool:
+        return any(self._en_cola.values())
+
+    def _liberar(self, duracion_s: float, medir: bool = True) -> None:
+        """Cede la plaza a la siguiente petición en espera (por carril y orden de llegada) o la libera."""
+        if medir:
+            self._servicio_medio_s = 0.9 * self._servicio_medio_s + 0.1 * duracion_s
+        while self._esperando:
+            _, _, futuro = heapq.heappop(self._esperando)
+            if not futuro.done():
+                futuro.set_result(None)
+                return
+        self.en_curso -= 1
+
+    def estimar_espera_s(self) -> int:
+        """Segundos estimados hasta que se vacíe la cola actual (mínimo 1), para Retry-After."""
+        en_cola = sum(self._en_cola.values()) + 1
+        return max(1, math.ceil(en_cola * self._servicio_medio_s / max(1, self.max_en_curso)))
+
+    def estadisticas(self) -> Dict[str, any]:
+        """Devuelve la ocupación, las colas por carril y los rechazos."""
+        return {
+            'en_curso': self.en_curso,
+            'max_en_curso': self.max_en_curso,
+            'en_cola': dict(self._en_cola),
+            'max_cola': dict(self.max_cola),
+            'admitidas': self.admitidas,
+            'rechazadas_cola_llena': self.rechazadas,
+            'descartadas_plazo_vencido': self.vencidas,
+            'servicio_medio_ms': round(self._servicio_medio_s * 1000, 3),
+        }
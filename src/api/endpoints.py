@@ -1,21 +1,73 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
 from pydantic import BaseModel, Field
 from src.utils.preprocesamiento import LimpiaTexto
-from src.analysis.analizador import AnalizadorSentimiento
+from src.utils.lexicon import LexiconLemas
+from src.analysis.cascada import crear_analizador
+from src.analysis.planificador import PlanificadorMicroLotes
+from src.analysis.cache import CacheResultados
+from src.api.admision import RECHAZOS, ControlAdmision, PlazoVencido, ServicioSaturado
+from src.api.trabajos import GestorTrabajos
+from src.core.database import DatabaseManager
+from src.utils.agregados import AgregadosDeslizantes
+from src.utils.metricas import ERRORES, REGISTRO
+import os
 import time
 import asyncio
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    JSONResponse que serializa con orjson cuando está instalado (bastante más rápido
+    que el módulo json en las respuestas por lotes). Sin orjson se comporta igual que JSONResponse.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _texto_json(dato: Any) -> str:
+    """Serializa un objeto como texto JSON (mensajes de WebSocket)."""
+    if orjson is None:
+        return json.dumps(dato, ensure_ascii=False)
+    return orjson.dumps(dato, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+
+def _linea_json(dato: Any) -> str:
+    """Serializa un objeto como una línea NDJSON."""
+    if orjson is None:
+        return json.dumps(dato, ensure_ascii=False) + "\n"
+    return orjson.dumps(dato, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE).decode('utf-8')
+
+
 app = FastAPI(
     title="API de Análisis de Sentimiento en Español",
     description="Servicio para analizar sentimiento de textos en español extraídos de redes sociales. Utiliza preprocesamiento avanzado y modelos de IA especializados.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=RespuestaJSON,
 )
 
 # --- INICIO DE LA CORRECCIÓN ---
 # Usamos un middleware de FastAPI, que es la forma correcta de ejecutar código
 # en cada petición (como medir el tiempo) sin interferir con los parámetros del endpoint.
 
+LATENCIA_PETICION = REGISTRO.histograma(
+    'sentimiento_api_peticion_segundos', 'Tiempo total de cada petición HTTP.', etiquetas=('ruta', 'metodo', 'estado'))
+PETICIONES_EN_CURSO = REGISTRO.medidor(
+    'sentimiento_api_peticiones_en_curso', 'Peticiones HTTP en curso.')
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     """
@@ -23,8 +75,17 @@ async def add_process_time_header(request: Request, call_next):
     a una cabecera personalizada en la respuesta.
     """
     start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    estado = 500
+    try:
+        with PETICIONES_EN_CURSO.en_curso():
+            response = await call_next(request)
+        estado = response.status_code
+    finally:
+        process_time = time.time() - start_time
+        # Se usa la plantilla de la ruta (p. ej. '/trabajos/{id}') para acotar las series.
+        ruta = request.scope.get("route")
+        LATENCIA_PETICION.observar(process_time, ruta=getattr(ruta, "path", "desconocida"),
+                                   metodo=request.method, estado=estado)
     response.headers["X-Response-Time-ms"] = str(int(process_time * 1000))
     return response
 
@@ -32,8 +93,200 @@ async def add_process_time_header(request: Request, call_next):
 
 
 # Instancias únicas de los componentes para que se carguen una sola vez
-limpiador = LimpiaTexto()
-analizador = AnalizadorSentimiento()
+# Léxico token → lema opcional: con LEXICON_RUTA se carga al arrancar y se guarda al apagar.
+ruta_lexicon = os.getenv("LEXICON_RUTA") or None
+lexicon = LexiconLemas.cargar(ruta_lexicon) if ruta_lexicon else None
+limpiador = LimpiaTexto(lexicon=lexicon)
+
+# Caché de resultados por texto limpio. CACHE_RUTA_DB activa la capa persistente en disco.
+cache_resultados = CacheResultados(
+    capacidad=int(os.getenv("CACHE_CAPACIDAD", "10000")),
+    ruta_db=os.getenv("CACHE_RUTA_DB") or None,
+)
+# ANALIZADOR_CASCADA=1 antepone el clasificador léxico al transformer (ver crear_analizador).
+analizador = crear_analizador(cache=cache_resultados)
+
+# Las peticiones concurrentes a /analizar se agrupan en micro-lotes: se espera como
+# máximo MICROLOTE_VENTANA_MS milisegundos o hasta reunir MICROLOTE_TAMANO_MAXIMO textos.
+planificador = PlanificadorMicroLotes(
+    analizador,
+    ventana_ms=float(os.getenv("MICROLOTE_VENTANA_MS", "5")),
+    tamano_maximo=int(os.getenv("MICROLOTE_TAMANO_MAXIMO", "32")),
+)
+
+
+# Base de datos de resultados para las consultas. Es segura entre hilos: cada hilo
+# del pool de FastAPI lee con su propia conexión de solo lectura.
+db = DatabaseManager(os.getenv("DB_RUTA", "sentimientos.db"))
+
+# Trabajos de extracción y análisis por URL en segundo plano. Como cada uno puede abrir
+# un navegador, se ejecutan como máximo TRABAJOS_CONCURRENTES a la vez.
+trabajos = GestorTrabajos(
+    db, limpiador, analizador,
+    max_concurrentes=int(os.getenv("TRABAJOS_CONCURRENTES", "1")),
+    # Un trabajo sin latido durante TRABAJOS_LATIDO_VENCIDO_S segundos (su worker murió
+    # o se apagó) lo reclama y relanza cualquier worker.
+    intervalo_latido=float(os.getenv("TRABAJOS_LATIDO_S", "10")),
+    latido_vencido=float(os.getenv("TRABAJOS_LATIDO_VENCIDO_S", "60")),
+)
+
+# Agregados en vivo de los resultados de la API (1, 5 y 60 minutos) para /agregados y /ws/agregados.
+agregados = AgregadosDeslizantes()
+
+
+# Control de admisión de la ruta de análisis: como máximo ADMISION_MAX_EN_CURSO peticiones
+# a la vez y colas acotadas por carril. Con todo lleno se responde 429 con Retry-After.
+admision = ControlAdmision(
+    max_en_curso=int(os.getenv("ADMISION_MAX_EN_CURSO", "64")),
+    max_cola_interactiva=int(os.getenv("ADMISION_COLA_INTERACTIVA", "256")),
+    max_cola_masiva=int(os.getenv("ADMISION_COLA_MASIVA", "32")),
+    plazo_defecto_s=float(os.getenv("ADMISION_PLAZO_MS", "30000")) / 1000,
+)
+
+
+@app.exception_handler(ServicioSaturado)
+async def responder_saturado(request: Request, e: ServicioSaturado):
+    """Cola llena: 429 con Retry-After para que el cliente reintente más tarde."""
+    return RespuestaJSON(
+        content={"error": str(e), "reintentar_en_s": e.reintentar_en_s},
+        status_code=429,
+        headers={"Retry-After": str(e.reintentar_en_s)},
+    )
+
+
+@app.exception_handler(PlazoVencido)
+async def responder_plazo_vencido(request: Request, e: PlazoVencido):
+    """El plazo de la petición venció en cola: se descarta sin analizarla."""
+    return RespuestaJSON(content={"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+
+
+class ModelosNoDisponibles(Exception):
+    """Los modelos no se pudieron cargar al arrancar."""
+
+
+@app.exception_handler(ModelosNoDisponibles)
+async def responder_modelos_no_disponibles(request: Request, e: ModelosNoDisponibles):
+    """Sin modelos no se puede analizar: 503 hasta que se corrija y se reinicie el servicio."""
+    return RespuestaJSON(content={"error": str(e)}, status_code=503)
+
+
+# Los modelos (spaCy y el de sentimiento) no se cargan al importar este módulo: el servidor
+# acepta conexiones al momento (/salud, /docs) y `calentar` los carga en segundo plano.
+# /listo responde 200 cuando han terminado de cargarse.
+estado_calentamiento: Dict[str, Any] = {"listo": False, "error": None, "segundos": None}
+_calentamiento: Optional[asyncio.Task] = None
+
+
+async def calentar() -> None:
+    """Carga spaCy y el modelo de sentimiento y ejecuta una pasada de prueba de cada uno."""
+    inicio = time.perf_counter()
+    try:
+        await asyncio.to_thread(limpiador.calentar)
+        await analizador.calentar()
+    except Exception as e:
+        ERRORES.inc(etapa='calentamiento')
+        estado_calentamiento["error"] = str(e)
+        print(f"❌ Error cargando los modelos: {e}")
+        return
+    estado_calentamiento["segundos"] = round(time.perf_counter() - inicio, 3)
+    estado_calentamiento["listo"] = True
+    print(f"Modelos listos en {estado_calentamiento['segundos']}s.")
+
+
+def _iniciar_calentamiento() -> asyncio.Task:
+    global _calentamiento
+    if _calentamiento is None:
+        _calentamiento = asyncio.get_running_loop().create_task(calentar())
+    return _calentamiento
+
+
+async def _esperar_componentes() -> None:
+    """
+    Espera a que terminen de cargarse los modelos: las peticiones que llegan durante el
+    arranque esperan (sin ocupar turno en el control de admisión) en lugar de fallar.
+    """
+    if not estado_calentamiento["listo"]:
+        await asyncio.shield(_iniciar_calentamiento())
+        if estado_calentamiento["error"] is not None:
+            raise ModelosNoDisponibles(f"Los modelos no están disponibles: {estado_calentamiento['error']}")
+
+
+def _carril(request: HTTPConnection, defecto: str) -> str:
+    """Carril pedido en la cabecera X-Prioridad ('interactiva' o 'masiva'); si no es válido, el por defecto."""
+    carril = request.headers.get("X-Prioridad", defecto).strip().lower()
+    return carril if carril in ControlAdmision.CARRILES else defecto
+
+
+def _plazo_s(request: HTTPConnection) -> Optional[float]:
+    """Plazo de la petición en segundos, desde la cabecera X-Plazo-Ms (presupuesto total del cliente)."""
+    try:
+        return float(request.headers["X-Plazo-Ms"]) / 1000
+    except (KeyError, ValueError):
+        return None
+
+
+CACHE_CONSULTAS = REGISTRO.medidor(
+    'sentimiento_cache_consultas', 'Consultas a la caché de resultados desde el arranque.', etiquetas=('resultado',))
+CACHE_ENTRADAS = REGISTRO.medidor(
+    'sentimiento_cache_entradas_memoria', 'Resultados guardados en la caché en memoria.')
+PLANIFICADOR_EN_COLA = REGISTRO.medidor(
+    'sentimiento_planificador_en_cola', 'Textos esperando a formar un micro-lote.')
+PLANIFICADOR_TAMANO_MEDIO = REGISTRO.medidor(
+    'sentimiento_planificador_tamano_medio_lote', 'Tamaño medio de los micro-lotes ejecutados.')
+PLANIFICADOR_ESPERA = REGISTRO.medidor(
+    'sentimiento_planificador_espera_cola_ms', 'Espera en cola de los micro-lotes recientes.', etiquetas=('percentil',))
+LEXICON_COBERTURA = REGISTRO.medidor(
+    'sentimiento_lexicon_cobertura_textos', 'Fracción de textos lematizados sin pasar por spaCy.')
+
+ADMISION_EN_CURSO = REGISTRO.medidor(
+    'sentimiento_admision_en_curso', 'Peticiones de análisis admitidas y en ejecución.')
+ADMISION_EN_COLA = REGISTRO.medidor(
+    'sentimiento_admision_en_cola', 'Peticiones de análisis esperando turno.', etiquetas=('carril',))
+
+
+def _actualizar_metricas_componentes():
+    """Copia a los medidores las estadísticas de la caché, el planificador y el léxico."""
+    estadisticas = cache_resultados.estadisticas()
+    CACHE_CONSULTAS.set(estadisticas['aciertos_memoria'], resultado='acierto_memoria')
+    CACHE_CONSULTAS.set(estadisticas['aciertos_disco'], resultado='acierto_disco')
+    CACHE_CONSULTAS.set(estadisticas['fallos'], resultado='fallo')
+    CACHE_ENTRADAS.set(estadisticas['en_memoria'])
+
+    estadisticas = planificador.estadisticas()
+    PLANIFICADOR_EN_COLA.set(estadisticas['en_cola'])
+    PLANIFICADOR_TAMANO_MEDIO.set(estadisticas['tamano_medio_lote'])
+    for percentil, valor in estadisticas['espera_cola_ms'].items():
+        PLANIFICADOR_ESPERA.set(valor, percentil=percentil)
+
+    if lexicon is not None:
+        LEXICON_COBERTURA.set(lexicon.estadisticas()['cobertura_textos'])
+
+    estadisticas = admision.estadisticas()
+    ADMISION_EN_CURSO.set(estadisticas['en_curso'])
+    for carril, en_cola in estadisticas['en_cola'].items():
+        ADMISION_EN_COLA.set(en_cola, carril=carril)
+
+
+REGISTRO.agregar_colector(_actualizar_metricas_componentes)
+
+
+@app.on_event("startup")
+async def iniciar_planificador():
+    """Arranca la carga de los modelos en segundo plano y el bucle de micro-lotes."""
+    _iniciar_calentamiento()
+    planificador.iniciar()
+    # Latido de los trabajos propios y reclamación de los abandonados (en cualquier worker).
+    trabajos.iniciar()
+
+
+@app.on_event("shutdown")
+async def detener_planificador():
+    """Detiene el bucle de micro-lotes y los trabajos en curso al apagar el servidor."""
+    await trabajos.detener()
+    await planificador.detener()
+    if lexicon is not None:
+        lexicon.guardar(ruta_lexicon)
+    db.cerrar()
 
 
 class TextoEntrada(BaseModel):
@@ -44,40 +297,590 @@ class TextoEntrada(BaseModel):
     texto: str = Field(..., example="¡Me encanta este producto ❤️, lo recomiendo totalmente!")
 
 
+class LoteEntrada(BaseModel):
+    """
+    Modelo de datos para analizar varios textos en una sola petición.
+    """
+    textos: List[Any] = Field(..., example=["¡Me encanta este producto!", "El envío tardó muchísimo."])
+
+
+class TrabajoEntrada(BaseModel):
+    """
+    Modelo de datos para crear un trabajo de extracción y análisis.
+    """
+    urls: List[str] = Field(..., min_items=1, example=["https://www.instagram.com/p/XXXXXXXXXXX/"])
+    cantidad: int = Field(100, ge=1, le=10000, description="Comentarios a extraer por URL.")
+
+
+# Límites de las rutas por lotes: textos por petición, caracteres por texto y tamaño
+# del cuerpo NDJSON. Los textos del flujo NDJSON se procesan en bloques de STREAM_TAMANO_BLOQUE.
+LOTE_TAMANO_MAXIMO = int(os.getenv("LOTE_TAMANO_MAXIMO", "1000"))
+LOTE_CARACTERES_MAXIMOS = int(os.getenv("LOTE_CARACTERES_MAXIMOS", "5000"))
+STREAM_BYTES_MAXIMO = int(os.getenv("STREAM_BYTES_MAXIMO", str(20 * 1024 * 1024)))
+STREAM_TAMANO_BLOQUE = int(os.getenv("STREAM_TAMANO_BLOQUE", "64"))
+# spaCy corre en el event loop, como en /analizar; entre bloques se cede el control
+# para que un lote grande no bloquee al resto de peticiones.
+BLOQUE_LIMPIEZA = 256
+
+
+async def _limpiar_textos(textos: List[str]) -> List[Any]:
+    """
+    Limpia los textos con `limpiar_lote` por bloques. Si un bloque falla, se limpia
+    texto a texto y los que fallan se devuelven como la excepción correspondiente.
+    """
+    limpios: List[Any] = []
+    for inicio in range(0, len(textos), BLOQUE_LIMPIEZA):
+        bloque = textos[inicio:inicio + BLOQUE_LIMPIEZA]
+        try:
+            limpios.extend(limpiador.limpiar_lote(bloque))
+        except Exception:
+            for texto in bloque:
+                try:
+                    limpios.append(limpiador.limpiar(texto))
+                except Exception as e:
+                    limpios.append(e)
+        await asyncio.sleep(0)
+    return limpios
+
+
+async def _analizar_textos(entradas: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Limpia y analiza una lista de textos con las rutas por lotes y devuelve un
+    resultado por entrada, en el mismo orden. Los errores se informan por elemento
+    ('error') sin que fallen los demás: si el lote del modelo falla, se reintenta
+    texto a texto para aislar al culpable.
+    """
+    salidas: List[Dict[str, Any]] = [{"indice": i} for i in range(len(entradas))]
+
+    validos = []
+    for i, texto in enumerate(entradas):
+        if not isinstance(texto, str):
+            salidas[i]["error"] = "El texto debe ser una cadena."
+            ERRORES.inc(etapa='validacion')
+        elif len(texto) > LOTE_CARACTERES_MAXIMOS:
+            salidas[i]["error"] = f"El texto supera el máximo de {LOTE_CARACTERES_MAXIMOS} caracteres."
+            ERRORES.inc(etapa='validacion')
+        else:
+            validos.append(i)
+        salidas[i]["texto_original"] = texto
+
+    limpios = await _limpiar_textos([entradas[i] for i in validos])
+    pendientes = []
+    for i, limpio in zip(validos, limpios):
+        if isinstance(limpio, Exception):
+            salidas[i]["error"] = f"Error limpiando el texto: {limpio}"
+        else:
+            salidas[i]["texto_limpio"] = limpio
+            pendientes.append(i)
+
+    textos_limpios = [salidas[i]["texto_limpio"] for i in pendientes]
+    try:
+        resultados = await analizador.analizar_lote(textos_limpios)
+    except Exception:
+        resultados = []
+        for texto_limpio in textos_limpios:
+            try:
+                resultados.append(await analizador.analizar(texto_limpio))
+            except Exception as e:
+                resultados.append(e)
+
+    for i, resultado in zip(pendientes, resultados):
+        if isinstance(resultado, Exception):
+            salidas[i]["error"] = str(resultado)
+        else:
+            salidas[i]["resultado"] = resultado
+    # Todo el lote se suma a los agregados tomando su lock una sola vez.
+    agregados.registrar_resultados(r for r in resultados if not isinstance(r, Exception))
+    return salidas
+
+
+def _leer_linea_ndjson(numero: int, linea: bytes) -> Dict[str, Any]:
+    """
+    Interpreta una línea NDJSON: un objeto con 'texto' (y opcionalmente 'id') o una
+    cadena JSON. Devuelve {'linea', 'id', 'texto'} o {'linea', 'error'}.
+    """
+    try:
+        dato = json.loads(linea)
+    except ValueError as e:
+        return {"linea": numero, "error": f"JSON no válido: {e}"}
+    if isinstance(dato, str):
+        return {"linea": numero, "id": None, "texto": dato}
+    if isinstance(dato, dict) and "texto" in dato:
+        return {"linea": numero, "id": dato.get("id"), "texto": dato["texto"]}
+    return {"linea": numero, "error": "Cada línea debe ser una cadena o un objeto con la clave 'texto'."}
+
+
 @app.post(
     "/analizar",
     summary="Analiza el sentimiento de un texto en español",
     response_description="Resultados del análisis de sentimiento",
     tags=["Sentimiento"],
 )
-async def analizar_sentimiento(entrada: TextoEntrada):
+async def analizar_sentimiento(entrada: TextoEntrada, request: Request):
     """
     Este endpoint recibe un texto en español y devuelve un análisis de sentimiento completo.
 
     - **Procesa el texto** para limpiarlo (quita URLs, emojis, stopwords, etc.).
     - **Analiza el texto limpio** usando un modelo de IA para determinar el sentimiento.
     - **Retorna un JSON** con el texto original, el texto limpio y el resultado del análisis.
+
+    Va por el carril interactivo salvo que `X-Prioridad: masiva` indique lo contrario.
+    Con el servicio saturado responde 429 con `Retry-After`.
     """
-    texto_original = entrada.texto
-    try:
-        # 1. Limpiar el texto de entrada
-        texto_limpio = limpiador.limpiar(texto_original)
+    await _esperar_componentes()
+    carril = _carril(request, 'interactiva')
+    async with admision.admitir(carril, _plazo_s(request)):
+        if await _cliente_desconectado(request, carril):
+            return Response(status_code=204)
+        return await _analizar_uno(entrada.texto)
 
-        # 2. Analizar el texto limpio
-        resultado = await analizador.analizar(texto_limpio)
 
-        # 3. Preparar y devolver la respuesta exitosa
-        response_content = {
-            "texto_original": texto_original,
-            "texto_limpio": texto_limpio,
-            "resultado": resultado
-        }
-        return JSONResponse(content=response_content)
+async def _cliente_desconectado(request: Request, carril: str) -> bool:
+    """
+    Indica si el cliente se fue mientras esperaba turno. En ese caso no hay a quién
+    responder: la petición se descarta sin analizarla y se cuenta en los rechazos.
+    """
+    if not await request.is_disconnected():
+        return False
+    RECHAZOS.inc(motivo='cliente_desconectado', carril=carril)
+    return True
+
+
+async def _analizar_uno(texto_original: str) -> RespuestaJSON:
+    """Limpia y analiza un texto para /analizar."""
+    try:
+        response_content = await _resultado_uno(texto_original)
+        return RespuestaJSON(content=response_content)
 
     except Exception as e:
         # Manejo de errores por si algo falla durante el proceso
+        ERRORES.inc(etapa='api')
         error_content = {
             "error": str(e),
             "texto_original": texto_original
         }
-        return JSONResponse(content=error_content, status_code=500)
\ No newline at end of file
+        return RespuestaJSON(content=error_content, status_code=500)
+
+
+async def _resultado_uno(texto_original: str) -> Dict[str, Any]:
+    """Limpia y analiza un texto y lo suma a los agregados en vivo. Lo usan /analizar y /ws/sentimiento."""
+    # 1. Limpiar el texto de entrada
+    texto_limpio = limpiador.limpiar(texto_original)
+
+    # 2. Analizar el texto limpio (agrupado con otras peticiones concurrentes)
+    resultado = await planificador.analizar(texto_limpio)
+    agregados.registrar(resultado["sentimiento"], resultado["confianza"])
+
+    # 3. Preparar la respuesta
+    return {
+        "texto_original": texto_original,
+        "texto_limpio": texto_limpio,
+        "resultado": resultado
+    }
+
+
+@app.post(
+    "/analizar/lote",
+    summary="Analiza el sentimiento de una lista de textos",
+    response_description="Un resultado por texto, en el orden de entrada",
+    tags=["Sentimiento"],
+)
+async def analizar_lote(entrada: LoteEntrada, request: Request):
+    """
+    Analiza muchos textos en una sola petición, con preprocesamiento e inferencia por lotes.
+
+    - Admite como máximo `LOTE_TAMANO_MAXIMO` textos por petición (413 si se supera).
+    - Cada elemento de `resultados` lleva su `indice`; los que fallan llevan `error`
+      en lugar de `resultado`, sin que falle el resto de la petición.
+    - Va por el carril masivo salvo que `X-Prioridad: interactiva` indique lo contrario.
+    """
+    if len(entrada.textos) > LOTE_TAMANO_MAXIMO:
+        return RespuestaJSON(
+            content={"error": f"La petición tiene {len(entrada.textos)} textos; el máximo es {LOTE_TAMANO_MAXIMO}. "
+                              "Divide el lote o usa /analizar/stream."},
+            status_code=413,
+        )
+    await _esperar_componentes()
+    carril = _carril(request, 'masiva')
+    async with admision.admitir(carril, _plazo_s(request)):
+        if await _cliente_desconectado(request, carril):
+            return Response(status_code=204)
+        salidas = await _analizar_textos(entrada.textos)
+    return RespuestaJSON(content={
+        "total": len(salidas),
+        "errores": sum(1 for salida in salidas if "error" in salida),
+        "resultados": salidas,
+    })
+
+
+@app.post(
+    "/analizar/stream",
+    summary="Analiza textos en NDJSON y devuelve los resultados en streaming",
+    response_description="Un objeto JSON por línea a medida que termina cada bloque",
+    tags=["Sentimiento"],
+)
+async def analizar_stream(request: Request):
+    """
+    Recibe un cuerpo NDJSON (una línea por texto: `{"id": ..., "texto": "..."}` o una
+    cadena JSON) y devuelve NDJSON con un resultado por línea, en el mismo orden,
+    enviando cada bloque de `STREAM_TAMANO_BLOQUE` textos en cuanto termina.
+
+    El cuerpo se lee entero (hasta `STREAM_BYTES_MAXIMO` bytes) antes de empezar a
+    responder: leer la petición mientras se envía la respuesta no es fiable en todos
+    los servidores ASGI. Va por el carril masivo y ocupa su turno hasta terminar de responder.
+    """
+    cuerpo = bytearray()
+    async for fragmento in request.stream():
+        cuerpo.extend(fragmento)
+        if len(cuerpo) > STREAM_BYTES_MAXIMO:
+            return RespuestaJSON(
+                content={"error": f"El cuerpo supera el máximo de {STREAM_BYTES_MAXIMO} bytes."},
+                status_code=413,
+            )
+
+    await _esperar_componentes()
+    turno = await admision.solicitar(_carril(request, 'masiva'), _plazo_s(request))
+
+    async def generar():
+        try:
+            lineas = (linea for linea in bytes(cuerpo).splitlines() if linea.strip())
+            bloque: List[Dict[str, Any]] = []
+            for numero, linea in enumerate(lineas, start=1):
+                bloque.append(_leer_linea_ndjson(numero, linea))
+                if len(bloque) >= STREAM_TAMANO_BLOQUE:
+                    yield await _procesar_bloque_stream(bloque)
+                    bloque = []
+            if bloque:
+                yield await _procesar_bloque_stream(bloque)
+        finally:
+            turno.liberar()
+
+    # La tarea de fondo libera el turno también si la respuesta no llega a iterarse.
+    return StreamingResponse(generar(), media_type="application/x-ndjson", background=BackgroundTask(turno.liberar))
+
+
+async def _procesar_bloque_stream(bloque: List[Dict[str, Any]]) -> str:
+    """Analiza un bloque de líneas NDJSON ya interpretadas y lo serializa como NDJSON."""
+    validas = [item for item in bloque if "error" not in item]
+    salidas = await _analizar_textos([item["texto"] for item in validas])
+    for item, salida in zip(validas, salidas):
+        salida.pop("indice")
+        item.pop("texto")
+        item.update(salida)
+    return "".join(_linea_json(item) for item in bloque)
+
+
+# Mensajes de /ws/sentimiento en proceso a la vez por conexión: con el tope alcanzado
+# no se leen más mensajes hasta que termine alguno (contrapresión sobre el cliente).
+WS_MAX_EN_CURSO = int(os.getenv("WS_MAX_EN_CURSO", "256"))
+
+WS_CONEXIONES = REGISTRO.medidor(
+    'sentimiento_ws_conexiones', 'Conexiones WebSocket abiertas.', etiquetas=('canal',))
+
+
+@app.websocket("/ws/sentimiento")
+async def ws_sentimiento(websocket: WebSocket):
+    """
+    Análisis en tiempo real por WebSocket. Cada mensaje del cliente es un texto: un
+    objeto `{"id": ..., "texto": "..."}` o una cadena JSON. Por cada mensaje se envía
+    un resultado en cuanto está listo (no necesariamente en orden), con el `id` y el
+    número de `mensaje` para emparejarlos, o un `error`.
+
+    Los textos se agrupan en micro-lotes con los de /analizar y pasan por el control de
+    admisión (carril de `X-Prioridad`, interactivo por defecto); si el servicio está
+    saturado el resultado lleva `error` y `reintentar_en_s`. Cada resultado se suma a
+    los agregados que publica /ws/agregados.
+    """
+    await websocket.accept()
+    try:
+        await _esperar_componentes()
+    except ModelosNoDisponibles as e:
+        await websocket.send_text(_texto_json({"error": str(e)}))
+        await websocket.close(code=1011)
+        return
+
+    WS_CONEXIONES.inc(canal='sentimiento')
+    carril, plazo = _carril(websocket, 'interactiva'), _plazo_s(websocket)
+    huecos = asyncio.Semaphore(WS_MAX_EN_CURSO)
+    envio = asyncio.Lock()
+    tareas: set = set()
+
+    async def procesar(item: Dict[str, Any]) -> None:
+        try:
+            item["mensaje"] = item.pop("linea")
+            texto = item.pop("texto", None)
+            if "error" in item:
+                ERRORES.inc(etapa='validacion')
+            elif not isinstance(texto, str):
+                item["error"] = "El texto debe ser una cadena."
+                ERRORES.inc(etapa='validacion')
+            elif len(texto) > LOTE_CARACTERES_MAXIMOS:
+                item["error"] = f"El texto supera el máximo de {LOTE_CARACTERES_MAXIMOS} caracteres."
+                ERRORES.inc(etapa='validacion')
+            else:
+                try:
+                    async with admision.admitir(carril, plazo):
+                        item.update(await _resultado_uno(texto))
+                except ServicioSaturado as e:
+                    item.update({"error": str(e), "reintentar_en_s": e.reintentar_en_s})
+                except PlazoVencido as e:
+                    item["error"] = str(e)
+                except Exception as e:
+                    ERRORES.inc(etapa='api')
+                    item.update({"error": str(e), "texto_original": texto})
+            async with envio:
+                await websocket.send_text(_texto_json(item))
+        except Exception:
+            # El cliente se desconectó; el bucle de recepción cierra la conexión.
+            pass
+        finally:
+            huecos.release()
+
+    numero = 0
+    try:
+        while True:
+            mensaje = await websocket.receive()
+            if mensaje["type"] == "websocket.disconnect":
+                break
+            numero += 1
+            await huecos.acquire()
+            tarea = asyncio.get_running_loop().create_task(
+                procesar(_leer_linea_ndjson(numero, mensaje.get("text") or mensaje.get("bytes") or b""))
+            )
+            tareas.add(tarea)
+            tarea.add_done_callback(tareas.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for tarea in list(tareas):
+            tarea.cancel()
+        WS_CONEXIONES.dec(canal='sentimiento')
+
+
+@app.websocket("/ws/agregados")
+async def ws_agregados(websocket: WebSocket, intervalo_ms: int = Query(1000, ge=100, le=60000)):
+    """
+    Suscripción a los agregados en vivo: envía la misma instantánea que GET /agregados
+    cada `intervalo_ms` milisegundos hasta que el cliente cierra la conexión.
+    """
+    await websocket.accept()
+    WS_CONEXIONES.inc(canal='agregados')
+    # Se escucha al cliente mientras se espera, para enterarse enseguida de que se desconectó.
+    recepcion = asyncio.get_running_loop().create_task(websocket.receive())
+    try:
+        while True:
+            await websocket.send_text(_texto_json(agregados.instantanea()))
+            terminadas, _ = await asyncio.wait({recepcion}, timeout=intervalo_ms / 1000)
+            if terminadas:
+                if recepcion.result()["type"] == "websocket.disconnect":
+                    break
+                # Los mensajes del cliente se ignoran.
+                recepcion = asyncio.get_running_loop().create_task(websocket.receive())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        recepcion.cancel()
+        WS_CONEXIONES.dec(canal='agregados')
+
+
+@app.get(
+    "/agregados",
+    summary="Sentimiento en vivo en los últimos 1, 5 y 60 minutos",
+    tags=["Consultas"],
+)
+async def obtener_agregados():
+    """
+    Devuelve, para las ventanas de 1, 5 y 60 minutos, la cantidad, la proporción y la
+    confianza media de cada sentimiento entre los textos analizados por esta API.
+    Se lee de memoria en tiempo constante, sin consultar la base de datos.
+    """
+    return RespuestaJSON(content=agregados.instantanea())
+
+
+@app.get(
+    "/buscar",
+    summary="Busca comentarios analizados por texto",
+    response_description="Comentarios que contienen las palabras buscadas, por relevancia",
+    tags=["Consultas"],
+)
+def buscar_comentarios(
+    q: str = Query(..., min_length=1, description="Palabras a buscar (sin importar tildes). 'envi*' busca por prefijo."),
+    sentimiento: Optional[str] = Query(None, description="POS, NEG o NEU."),
+    desde: Optional[str] = Query(None, description="Fecha de análisis mínima, incluida (YYYY-MM-DD)."),
+    hasta: Optional[str] = Query(None, description="Fecha de análisis máxima, excluida (YYYY-MM-DD)."),
+    fuente: Optional[str] = Query(None, description="Fuente de los comentarios, p. ej. Instagram."),
+    limite: int = Query(50, ge=1, le=500, description="Resultados por página."),
+    desplazamiento: int = Query(0, ge=0, description="Resultados que se saltan."),
+):
+    """
+    Busca en los comentarios ya analizados con el índice de texto completo, por ejemplo
+    todos los comentarios negativos que mencionan 'envío' en la última semana.
+    Se declara síncrono para que FastAPI lo ejecute en su pool de hilos sin bloquear el event loop.
+    """
+    try:
+        resultados = db.buscar(q, sentimiento=sentimiento, desde=desde, hasta=hasta, fuente=fuente,
+                               limite=limite, desplazamiento=desplazamiento)
+        return RespuestaJSON(content={
+            "consulta": q,
+            "limite": limite,
+            "desplazamiento": desplazamiento,
+            "resultados": resultados,
+        })
+    except Exception as e:
+        return RespuestaJSON(content={"error": str(e), "consulta": q}, status_code=500)
+
+
+@app.post(
+    "/trabajos",
+    summary="Crea un trabajo de extracción y análisis",
+    response_description="Id del trabajo creado",
+    status_code=202,
+    tags=["Trabajos"],
+)
+async def crear_trabajo(entrada: TrabajoEntrada):
+    """
+    Registra un trabajo que extrae los comentarios de cada URL, los analiza y los guarda
+    en la base de datos. Responde enseguida con el id del trabajo; el progreso se
+    consulta en GET /trabajos/{id_trabajo}.
+    """
+    try:
+        id_trabajo = await trabajos.crear(entrada.urls, entrada.cantidad)
+    except ValueError as e:
+        return RespuestaJSON(content={"error": str(e)}, status_code=422)
+    return RespuestaJSON(
+        content={"id": id_trabajo, "estado": "pendiente"},
+        status_code=202,
+        headers={"Location": f"/trabajos/{id_trabajo}"},
+    )
+
+
+@app.get(
+    "/trabajos/{id_trabajo}",
+    summary="Estado y progreso de un trabajo",
+    tags=["Trabajos"],
+)
+async def obtener_trabajo(id_trabajo: str):
+    """
+    Devuelve el estado del trabajo (pendiente, en_curso, completado o fallido), la URL
+    en curso, los comentarios extraídos, analizados, guardados y fallidos, y el
+    rendimiento en comentarios por segundo.
+    """
+    trabajo = await trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return RespuestaJSON(content={"error": f"No existe el trabajo '{id_trabajo}'."}, status_code=404)
+    return RespuestaJSON(content=trabajo)
+
+
+@app.get(
+    "/trabajos",
+    summary="Lista los trabajos más recientes",
+    tags=["Trabajos"],
+)
+async def listar_trabajos(
+    estado: Optional[List[str]] = Query(None, description="Filtra por estado; se puede repetir."),
+    limite: int = Query(50, ge=1, le=500, description="Trabajos a devolver."),
+):
+    """Devuelve los trabajos más recientes con su progreso."""
+    return RespuestaJSON(content={"trabajos": await trabajos.listar(estados=estado, limite=limite)})
+
+
+@app.get(
+    "/salud",
+    summary="Comprueba que el proceso responde",
+    tags=["Monitoreo"],
+)
+async def salud():
+    """
+    Liveness: responde mientras el servidor esté vivo, aunque los modelos sigan
+    cargándose. No toca los modelos ni la base de datos.
+    """
+    return RespuestaJSON(content={"estado": "ok"})
+
+
+@app.get(
+    "/listo",
+    summary="Comprueba que el servicio puede analizar",
+    tags=["Monitoreo"],
+)
+async def listo():
+    """
+    Readiness: 200 cuando spaCy y el modelo de sentimiento están cargados y calientes;
+    503 mientras se cargan o si la carga falló (con el error).
+    """
+    contenido = {
+        "listo": estado_calentamiento["listo"],
+        "componentes": {"limpiador": limpiador.cargado, "analizador": analizador.cargado},
+        "segundos_calentamiento": estado_calentamiento["segundos"],
+    }
+    if estado_calentamiento["error"] is not None:
+        contenido["error"] = estado_calentamiento["error"]
+    return RespuestaJSON(content=contenido, status_code=200 if estado_calentamiento["listo"] else 503)
+
+
+@app.get(
+    "/metrics",
+    summary="Métricas en formato Prometheus",
+    response_class=PlainTextResponse,
+    tags=["Monitoreo"],
+)
+async def metricas():
+    """
+    Expone histogramas de latencia por etapa (preprocesamiento, inferencia y petición
+    completa), predicciones por sentimiento, errores por etapa, trabajo en curso y las
+    estadísticas de la caché, el planificador y el léxico, en el formato de texto de Prometheus.
+    """
+    return PlainTextResponse(REGISTRO.exponer(), media_type="text/plain; version=0.0.4")
+
+
+@app.get(
+    "/admision/estadisticas",
+    summary="Estadísticas del control de admisión",
+    tags=["Monitoreo"],
+)
+async def estadisticas_admision():
+    """
+    Devuelve las peticiones en curso, las colas por carril y los rechazos (cola llena)
+    y descartes (plazo vencido) del control de admisión.
+    """
+    return RespuestaJSON(content=admision.estadisticas())
+
+
+@app.get(
+    "/planificador/estadisticas",
+    summary="Estadísticas del planificador de micro-lotes",
+    tags=["Monitoreo"],
+)
+async def estadisticas_planificador():
+    """
+    Devuelve el tamaño medio y la distribución de los lotes ejecutados, junto con
+    los percentiles del tiempo de espera en cola, para ajustar la ventana de agrupación.
+    """
+    return RespuestaJSON(content=planificador.estadisticas())
+
+
+@app.get(
+    "/cache/estadisticas",
+    summary="Estadísticas de la caché de resultados",
+    tags=["Monitoreo"],
+)
+async def estadisticas_cache():
+    """
+    Devuelve los aciertos (en memoria y en disco), los fallos y la tasa de aciertos
+    de la caché de resultados de inferencia.
+    """
+    return RespuestaJSON(content=cache_resultados.estadisticas())
+
+
+@app.get(
+    "/lexicon/estadisticas",
+    summary="Estadísticas del léxico de lemas",
+    tags=["Monitoreo"],
+)
+async def estadisticas_lexicon():
+    """
+    Devuelve la cobertura (textos resueltos sin spaCy) y la tasa de aciertos por token
+    del léxico de lemas, si está activo.
+    """
+    if lexicon is None:
+        return RespuestaJSON(content={"activo": False})
+    return RespuestaJSON(content={"activo": True, **lexicon.estadisticas()})
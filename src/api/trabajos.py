@@ -0,0 +1,217 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from src.analysis.analizador import AnalizadorSentimiento
+from src.connectors.registro import detectar_fuente, obtener_conector
+from src.core.database import DatabaseManager
+from src.utils.preprocesamiento import LimpiaTexto
+
+
+def _ahora() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class GestorTrabajos:
+    """
+    Trabajos de extracción y análisis en segundo plano para la API.
+
+    Cada trabajo recorre el flujo de `run_analysis.py` (conector → LimpiaTexto →
+    AnalizadorSentimiento → DatabaseManager) para una o varias URLs, sin bloquear
+    la petición que lo crea. Como mucho se ejecutan `max_concurrentes` trabajos a la
+    vez; el resto espera su turno. El estado y los contadores se guardan en la tabla
+    'trabajos', así que el progreso sobrevive a un reinicio.
+
+    Mientras un proceso tiene trabajos (en cola o en curso) renueva su latido cada
+    `intervalo_latido` segundos. Todos los procesos reclaman periódicamente los
+    trabajos activos cuyo latido venció (su worker murió o se apagó) y los relanzan.
+    Relanzar es seguro porque los resultados se guardan con upsert por
+    (fuente, comentario_id). Las operaciones con la base de datos y la limpieza con
+    spaCy van en un hilo para no bloquear el bucle de eventos.
+    """
+
+    ESTADOS_ACTIVOS = DatabaseManager.ESTADOS_TRABAJO_ACTIVOS
+
+    def __init__(self, db: DatabaseManager, limpiador: LimpiaTexto, analizador: AnalizadorSentimiento,
+                 max_concurrentes: int = 1, tamano_bloque: int = 64, intervalo_latido: float = 10.0,
+                 latido_vencido: float = 60.0) -> None:
+        """
+        Args:
+            db (DatabaseManager): Base de datos de resultados y de trabajos.
+            limpiador (LimpiaTexto): Preprocesador compartido con la API.
+            analizador (AnalizadorSentimiento): Analizador compartido con la API.
+            max_concurrentes (int): Trabajos ejecutándose a la vez. Cada uno puede
+                abrir un navegador, así que conviene un número pequeño.
+            tamano_bloque (int): Comentarios que se limpian, analizan y guardan juntos.
+            intervalo_latido (float): Segundos entre latidos y entre reclamaciones.
+            latido_vencido (float): Segundos sin latido tras los que un trabajo activo
+                se considera abandonado. Debe ser varias veces `intervalo_latido`.
+        """
+        self.db = db
+        self.limpiador = limpiador
+        self.analizador = analizador
+        self.tamano_bloque = tamano_bloque
+        self.intervalo_latido = intervalo_latido
+        self.latido_vencido = latido_vencido
+        self._semaforo = asyncio.Semaphore(max_concurrentes)
+        self._tareas: Set[asyncio.Task] = set()
+        # Trabajos de este proceso (en cola o en curso), cuyo latido se renueva.
+        self._propios: Set[str] = set()
+        self._tarea_latido: Optional[asyncio.Task] = None
+
+    def iniciar(self) -> None:
+        """Arranca el bucle de latido y reclamación. Se llama desde el bucle de eventos."""
+        if self._tarea_latido is None:
+            self._tarea_latido = asyncio.get_running_loop().create_task(self._bucle_latido())
+
+    async def _bucle_latido(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.db.registrar_latido, list(self._propios), _ahora())
+                await self.reclamar_vencidos()
+            except Exception as e:
+                print(f"⚠️ Error en el latido de los trabajos: {e}")
+            await asyncio.sleep(self.intervalo_latido)
+
+    async def reclamar_vencidos(self) -> int:
+        """Relanza en este proceso los trabajos activos con el latido vencido. Devuelve cuántos."""
+        limite = (datetime.now() - timedelta(seconds=self.latido_vencido)).strftime('%Y-%m-%d %H:%M:%S')
+        reclamados = await asyncio.to_thread(self.db.reclamar_trabajos, limite, _ahora())
+        for id_trabajo in reclamados:
+            self._lanzar(id_trabajo)
+        if reclamados:
+            print(f"Reanudando {len(reclamados)} trabajos de análisis abandonados.")
+        return len(reclamados)
+
+    async def crear(self, urls: List[str], cantidad: int) -> str:
+        """
+        Registra un trabajo y lo pone en cola. Devuelve su id.
+
+        Raises:
+            ValueError: Si alguna URL no tiene conector.
+        """
+        for url in urls:
+            detectar_fuente(url)
+        id_trabajo = uuid.uuid4().hex
+        await asyncio.to_thread(self.db.crear_trabajo, id_trabajo, urls, cantidad)
+        self._lanzar(id_trabajo)
+        return id_trabajo
+
+    def _lanzar(self, id_trabajo: str) -> None:
+        tarea = asyncio.get_running_loop().create_task(self._ejecutar(id_trabajo))
+        self._tareas.add(tarea)
+        self._propios.add(id_trabajo)
+        tarea.add_done_callback(self._tareas.discard)
+        tarea.add_done_callback(lambda _: self._propios.discard(id_trabajo))
+
+    async def _actualizar(self, id_trabajo: str, **campos) -> None:
+        await asyncio.to_thread(self.db.actualizar_trabajo, id_trabajo, **campos)
+
+    async def _ejecutar(self, id_trabajo: str) -> None:
+        async with self._semaforo:
+            trabajo = await asyncio.to_thread(self.db.obtener_trabajo, id_trabajo)
+            if trabajo is None or trabajo['estado'] not in self.ESTADOS_ACTIVOS:
+                return
+            # Un reintento empieza de cero: los upserts evitan duplicar lo ya guardado.
+            await self._actualizar(
+                id_trabajo, estado='en_curso', iniciado=_ahora(), latido=_ahora(), terminado=None, error=None,
+                intentos=trabajo['intentos'] + 1, items_extraidos=0, items_analizados=0,
+                items_guardados=0, items_fallidos=0,
+            )
+            contadores = {'items_extraidos': 0, 'items_analizados': 0, 'items_guardados': 0, 'items_fallidos': 0}
+            conector, fuente_conector = None, None
+            try:
+                # Los modelos se cargan en un hilo si aún no lo están (p. ej. durante el arranque).
+                await asyncio.to_thread(self.limpiador.cargar)
+                await asyncio.to_thread(self.analizador.cargar)
+                for url in trabajo['urls']:
+                    await self._actualizar(id_trabajo, url_actual=url)
+                    fuente = detectar_fuente(url)
+                    # Los conectores son bloqueantes (Selenium, login asistido): van en un hilo.
+                    # Un mismo conector (y su sesión) sirve para todas las URLs de la misma fuente.
+                    if fuente != fuente_conector:
+                        conector = await asyncio.to_thread(obtener_conector, url)
+                        fuente_conector = fuente
+                    contenido = await asyncio.to_thread(conector.buscar_comentarios, url, trabajo['cantidad'])
+                    items = [item for item in contenido or [] if isinstance(item.get('texto'), str) and item['texto']]
+                    contadores['items_extraidos'] += len(items)
+                    contadores['items_fallidos'] += len(contenido or []) - len(items)
+                    await self._actualizar(id_trabajo, **contadores)
+
+                    for inicio in range(0, len(items), self.tamano_bloque):
+                        await self._procesar_bloque(items[inicio:inicio + self.tamano_bloque], fuente, contadores)
+                        await self._actualizar(id_trabajo, **contadores)
+
+                await self._actualizar(id_trabajo, estado='completado', terminado=_ahora(), url_actual=None)
+            except asyncio.CancelledError:
+                # Apagado del servidor: el trabajo queda 'en_curso' y, cuando su latido
+                # vence, lo reclama otro worker o este mismo al volver a arrancar.
+                raise
+            except Exception as e:
+                print(f"❌ Error en el trabajo {id_trabajo}: {e}")
+                await self._actualizar(id_trabajo, estado='fallido', terminado=_ahora(), error=str(e))
+            finally:
+                # Los conectores cierran su navegador en __del__.
+                conector = None
+
+    async def _procesar_bloque(self, bloque: List[Dict], fuente: str, contadores: Dict[str, int]) -> None:
+        """Limpia, analiza y guarda un bloque de comentarios, actualizando los contadores."""
+        try:
+            # spaCy es bloqueante: en un hilo, para no frenar /analizar ni el WebSocket.
+            textos_limpios = await asyncio.to_thread(self.limpiador.limpiar_lote, [item['texto'] for item in bloque])
+            resultados = await self.analizador.analizar_lote(textos_limpios)
+        except Exception as e:
+            print(f"⚠️ Error analizando un bloque de {len(bloque)} comentarios: {e}")
+            contadores['items_fallidos'] += len(bloque)
+            return
+        contadores['items_analizados'] += len(bloque)
+
+        registros = [
+            {
+                'texto_original': item['texto'], 'resultado': resultado, 'fuente': fuente,
+                'comentario_id': item.get('id'), 'usuario': item.get('usuario'),
+                'fecha_comentario': item.get('fecha'),
+            }
+            for item, resultado in zip(bloque, resultados)
+        ]
+        try:
+            await asyncio.to_thread(self.db.guardar_lote, registros)
+            contadores['items_guardados'] += len(registros)
+        except Exception as e:
+            print(f"⚠️ Error guardando un bloque de {len(registros)} resultados: {e}")
+            contadores['items_fallidos'] += len(registros)
+
+    async def obtener(self, id_trabajo: str) -> Optional[Dict]:
+        """Devuelve el estado y el progreso de un trabajo, con su rendimiento en comentarios/s."""
+        trabajo = await asyncio.to_thread(self.db.obtener_trabajo, id_trabajo)
+        if trabajo is not None:
+            trabajo['comentarios_por_segundo'] = self._rendimiento(trabajo)
+        return trabajo
+
+    async def listar(self, estados: Optional[List[str]] = None, limite: int = 50) -> List[Dict]:
+        """Devuelve los trabajos más recientes."""
+        trabajos = await asyncio.to_thread(self.db.listar_trabajos, estados=estados, limite=limite)
+        for trabajo in trabajos:
+            trabajo['comentarios_por_segundo'] = self._rendimiento(trabajo)
+        return trabajos
+
+    @staticmethod
+    def _rendimiento(trabajo: Dict) -> float:
+        if not trabajo['iniciado']:
+            return 0.0
+        inicio = datetime.strptime(trabajo['iniciado'], '%Y-%m-%d %H:%M:%S').timestamp()
+        fin = (datetime.strptime(trabajo['terminado'], '%Y-%m-%d %H:%M:%S').timestamp()
+               if trabajo['terminado'] else time.time())
+        return round(trabajo['items_analizados'] / max(fin - inicio, 1.0), 3)
+
+    async def detener(self) -> None:
+        """Cancela el latido y los trabajos en ejecución; quedan en la tabla para reclamarse después."""
+        tareas = list(self._tareas)
+        if self._tarea_latido is not None:
+            tareas.append(self._tarea_latido)
+            self._tarea_latido = None
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
@@ -1,5 +1,6 @@
 # filename: src/connectors/instagram_assisted_connector.py
 
+import hashlib
 import time
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -57,7 +58,7 @@ class InstagramAssistedConnector:
             # ... (Lógica de scroll y extracción) ...
             
             print("Recolección finalizada.")
-            comentarios = [{'id': str(hash(t)), 'texto': t, 'usuario': 'desconocido', 'fecha': None, 'fuente': 'Instagram'} for t in list(comentarios_encontrados)]
+            comentarios = [{'id': hashlib.sha1(t.encode('utf-8')).hexdigest(), 'texto': t, 'usuario': 'desconocido', 'fecha': None, 'fuente': 'Instagram'} for t in list(comentarios_encontrados)]
             return comentarios[:cantidad]
 
         except TimeoutException:
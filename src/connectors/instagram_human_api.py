@@ -1,5 +1,6 @@
 # filename: src/connectors/instagram_human_api.py
 
+import hashlib
 import os
 import time
 from selenium import webdriver
@@ -44,7 +45,7 @@ class InstagramHumanConnector:
             # ... (La lógica para hacer scroll y extraer comentarios va aquí) ...
 
             print("Recolección finalizada.")
-            comentarios = [{'id': str(hash(t)), 'texto': t, 'usuario': 'desconocido', 'fecha': None, 'fuente': 'Instagram'} for t in list(comentarios_encontrados)]
+            comentarios = [{'id': hashlib.sha1(t.encode('utf-8')).hexdigest(), 'texto': t, 'usuario': 'desconocido', 'fecha': None, 'fuente': 'Instagram'} for t in list(comentarios_encontrados)]
             return comentarios[:cantidad]
 
         except TimeoutException:
@@ -0,0 +1,35 @@
+# filename: src/connectors/registro.py
+
+import importlib
+from urllib.parse import urlparse
+
+# Dominio -> (fuente, módulo, clase). Los conectores se importan solo al usarse:
+# Selenium y los clientes de cada plataforma no se cargan si no hacen falta.
+CONECTORES = {
+    "instagram.com": ("Instagram", "src.connectors.instagram_assisted_connector", "InstagramAssistedConnector"),
+    # Aquí puedes añadir otros conectores si los necesitas, p. ej.:
+    # "youtube.com": ("YouTube", "src.connectors.youtube_api", "YouTubeConnector"),
+}
+
+
+def _buscar(termino_o_url: str) -> tuple:
+    hostname = urlparse(termino_o_url).hostname or ""
+    for dominio, datos in CONECTORES.items():
+        if hostname == dominio or hostname.endswith("." + dominio):
+            return datos
+    raise ValueError(f"No se encontró un conector para la URL: {termino_o_url}")
+
+
+def detectar_fuente(termino_o_url: str) -> str:
+    """Devuelve el nombre de la fuente ('Instagram', ...) que corresponde a la URL."""
+    return _buscar(termino_o_url)[0]
+
+
+def obtener_conector(termino_o_url: str):
+    """
+    Discrimina la plataforma a partir de la URL y devuelve la instancia
+    del conector apropiado.
+    """
+    fuente, modulo, clase = _buscar(termino_o_url)
+    print(f"Fuente detectada: {fuente}")
+    return getattr(importlib.import_module(modulo), clase)()
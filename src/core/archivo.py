@@ -0,0 +1,265 @@
+import glob
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from src.core.database import DatabaseManager
+
+
+class ArchivoParquet:
+    """
+    Archivo histórico en Parquet para la tabla 'analisis'.
+
+    Las filas más antiguas que la ventana de retención se mueven a archivos Parquet
+    particionados por día (`<directorio>/fecha=YYYY-MM-DD/`) y se borran de SQLite,
+    que así se mantiene pequeña. Los resúmenes de 'resumen_sentimiento' no se tocan.
+    Las claves (fuente, comentario_id) archivadas quedan en 'analisis_archivados', así
+    que un comentario archivado que se vuelve a extraer no se cuenta dos veces.
+    Las consultas sobre todo el histórico se hacen con DuckDB, que une la tabla viva
+    con el archivo y recorre solo las columnas que usa cada consulta.
+    """
+
+    # Tipos de las columnas en Parquet; todos los archivos comparten este esquema.
+    TIPOS = {
+        'id': 'int64', 'fuente': 'string', 'texto_original': 'string', 'sentimiento': 'string',
+        'confianza': 'float64', 'fecha_analisis': 'string', 'comentario_id': 'string',
+        'usuario': 'string', 'fecha_comentario': 'string', 'scores_detallados': 'string',
+    }
+
+    def __init__(self, db: DatabaseManager, directorio: str = "archivo") -> None:
+        """
+        Args:
+            db (DatabaseManager): Base de datos con la tabla 'analisis'.
+            directorio (str): Raíz del archivo Parquet.
+        """
+        self.db = db
+        self.directorio = directorio
+        # None hasta el primer intento de adjuntar SQLite desde DuckDB.
+        self._sqlite_disponible: Optional[bool] = None
+
+    def _esquema(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(
+                "El archivo Parquet necesita pyarrow. "
+                "Instálalo ejecutando: pip install pyarrow"
+            )
+        return pa.schema([(columna, getattr(pa, tipo)()) for columna, tipo in self.TIPOS.items()])
+
+    def archivar(self, dias_retencion: int = 90, tamano_bloque: int = 50000, vacuum: bool = True) -> int:
+        """
+        Mueve al archivo las filas con fecha_analisis anterior a la ventana de retención.
+
+        Se procesa bloque a bloque: cada bloque se escribe en Parquet y solo después se
+        borra de SQLite, así que una interrupción nunca pierde filas. Si se interrumpe
+        entre ambos pasos, el último bloque puede quedar también en el archivo; basta
+        con volver a ejecutarlo.
+
+        Args:
+            dias_retencion (int): Días que se conservan en SQLite.
+            tamano_bloque (int): Filas leídas, escritas y borradas por bloque.
+            vacuum (bool): Compactar SQLite al terminar para devolver el espacio al disco.
+
+        Returns:
+            int: Número de filas archivadas.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = self._esquema()
+        columnas = list(self.TIPOS)
+        corte = (datetime.now() - timedelta(days=dias_retencion)).strftime('%Y-%m-%d')
+        archivadas = 0
+        self._registrar_archivo_existente()
+
+        for bloque in self.db.iterar_analisis(columnas=columnas, hasta=corte, tamano_bloque=tamano_bloque):
+            # Un comentario que ya estaba en el archivo (guardado de nuevo antes de que
+            # existiera 'analisis_archivados') se borra sin escribirlo otra vez.
+            ya_archivadas = self._claves_archivadas([(fila[1], fila[6]) for fila in bloque if fila[6] is not None])
+            por_dia: Dict[str, List[tuple]] = {}
+            for fila in bloque:
+                if (fila[1], fila[6]) not in ya_archivadas:
+                    por_dia.setdefault(fila[5][:10], []).append(fila)
+
+            for dia, filas in por_dia.items():
+                particion = os.path.join(self.directorio, f"fecha={dia}")
+                os.makedirs(particion, exist_ok=True)
+                # El nombre depende de los ids, así que repetir un bloque sobrescribe su archivo.
+                ruta = os.path.join(particion, f"parte-{filas[0][0]}-{filas[-1][0]}.parquet")
+                tabla = pa.Table.from_pylist([dict(zip(columnas, fila)) for fila in filas], schema=esquema)
+                pq.write_table(tabla, ruta, compression='zstd')
+
+            # El borrado y el registro de las claves van en la misma transacción.
+            with self.db.conexiones.sesion_escritura() as conn:
+                conn.executemany("DELETE FROM analisis WHERE id = ?", [(fila[0],) for fila in bloque])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO analisis_archivados (fuente, comentario_id) VALUES (?, ?)",
+                    [(fila[1], fila[6]) for fila in bloque if fila[6] is not None],
+                )
+            archivadas += len(bloque)
+            print(f"   - {archivadas} filas archivadas (hasta {bloque[-1][5]}).")
+
+        if archivadas and vacuum:
+            with self.db.conexiones.sesion_escritura() as conn:
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return archivadas
+
+    def _claves_archivadas(self, claves: List[tuple]) -> set:
+        """Devuelve cuáles de las claves (fuente, comentario_id) están ya en 'analisis_archivados'."""
+        encontradas = set()
+        with self.db.conexiones.sesion_lectura() as conn:
+            # 400 pares por consulta: por debajo del límite de parámetros de SQLite.
+            for inicio in range(0, len(claves), 400):
+                parte = claves[inicio:inicio + 400]
+                valores = ', '.join(['(?, ?)'] * len(parte))
+                encontradas.update(conn.execute(
+                    f"SELECT fuente, comentario_id FROM analisis_archivados "
+                    f"WHERE (fuente, comentario_id) IN (VALUES {valores})",
+                    [valor for clave in parte for valor in clave],
+                ).fetchall())
+        return encontradas
+
+    def _registrar_archivo_existente(self) -> None:
+        """
+        Registra en 'analisis_archivados' las claves de un archivo escrito antes de que
+        existiera esa tabla, para que no se vuelvan a guardar en la tabla viva.
+        """
+        import pyarrow.dataset as ds
+
+        with self.db.conexiones.sesion_lectura() as conn:
+            if conn.execute("SELECT 1 FROM analisis_archivados LIMIT 1").fetchone():
+                return
+        archivos = glob.glob(os.path.join(self.directorio, 'fecha=*', '*.parquet'))
+        if not archivos:
+            return
+        claves = ds.dataset(archivos, format='parquet').to_table(
+            columns=['fuente', 'comentario_id'], filter=ds.field('comentario_id').is_valid()
+        )
+        with self.db.conexiones.sesion_escritura() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO analisis_archivados (fuente, comentario_id) VALUES (?, ?)",
+                zip(claves.column('fuente').to_pylist(), claves.column('comentario_id').to_pylist()),
+            )
+        print(f"   - {claves.num_rows} claves del archivo existente registradas.")
+
+    # Tipos de DuckDB equivalentes a TIPOS, para leer la tabla viva con el mismo esquema que el archivo.
+    TIPOS_DUCKDB = {'int64': 'BIGINT', 'string': 'VARCHAR', 'float64': 'DOUBLE'}
+
+    def _adjuntar_sqlite(self, con) -> bool:
+        """
+        Adjunta la base de datos viva a DuckDB con su extensión sqlite, que la lee
+        directamente (solo las columnas y filas que pide cada consulta). Devuelve False
+        si la extensión no está disponible (p. ej. sin red para instalarla); el
+        resultado se recuerda para no reintentarlo en cada consulta.
+        """
+        import duckdb
+
+        if self._sqlite_disponible is False or self.db.conexiones._en_memoria:
+            return False
+        ruta = os.path.abspath(self.db.db_name).replace("'", "''")
+        try:
+            con.execute(f"ATTACH '{ruta}' AS vivo (TYPE sqlite, READ_ONLY)")
+        except duckdb.Error as e:
+            if self._sqlite_disponible is None:
+                print(f"ℹ️ Extensión sqlite de DuckDB no disponible ({str(e).splitlines()[0]}); se copian a Arrow las filas vivas filtradas.")
+            self._sqlite_disponible = False
+            return False
+        self._sqlite_disponible = True
+        return True
+
+    def _conectar_duckdb(self, columnas: List[str], desde: Optional[str] = None, hasta: Optional[str] = None,
+                         fuente: Optional[str] = None):
+        """
+        Abre DuckDB con la vista 'analisis_completo': la tabla viva de SQLite más el archivo,
+        limitada a las columnas pedidas y, si se indican, al rango de fechas y a la fuente.
+        """
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError(
+                "Las consultas sobre el archivo necesitan duckdb. "
+                "Instálalo ejecutando: pip install duckdb"
+            )
+
+        # La vista no admite parámetros: los valores se incrustan como literales escapados.
+        filtros = [
+            f"{condicion} " + "'" + str(valor).replace("'", "''") + "'"
+            for condicion, valor in (("fecha_analisis >=", desde), ("fecha_analisis <", hasta), ("fuente =", fuente))
+            if valor is not None
+        ]
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+        con = duckdb.connect()
+        if self._adjuntar_sqlite(con):
+            seleccion_viva = ', '.join(
+                f"CAST({columna} AS {self.TIPOS_DUCKDB[self.TIPOS[columna]]}) AS {columna}" for columna in columnas
+            )
+            origen_vivo = f"SELECT {seleccion_viva} FROM vivo.analisis {where}"
+        else:
+            import pyarrow as pa
+
+            # Sin la extensión, se copian a Arrow solo las columnas y filas que cubre la vista.
+            esquema = pa.schema([campo for campo in self._esquema() if campo.name in columnas])
+            lotes = [
+                pa.RecordBatch.from_pylist([dict(zip(columnas, fila)) for fila in bloque], schema=esquema)
+                for bloque in self.db.iterar_analisis(columnas=columnas, desde=desde, hasta=hasta,
+                                                      fuente=fuente, tamano_bloque=50000)
+            ]
+            con.register('analisis_vivo', pa.Table.from_batches(lotes, schema=esquema))
+            origen_vivo = f"SELECT {', '.join(columnas)} FROM analisis_vivo"
+
+        seleccion = ', '.join(columnas)
+        if glob.glob(os.path.join(self.directorio, 'fecha=*', '*.parquet')):
+            patron = os.path.join(self.directorio, '*', '*.parquet').replace("'", "''")
+            con.execute(f"""
+                CREATE VIEW analisis_completo AS
+                {origen_vivo}
+                UNION ALL
+                SELECT {seleccion} FROM read_parquet('{patron}', hive_partitioning = true) {where}
+            """)
+        else:
+            con.execute(f"CREATE VIEW analisis_completo AS {origen_vivo}")
+        return con
+
+    def consultar(self, sql: str, parametros: Optional[list] = None,
+                  columnas: Optional[List[str]] = None, desde: Optional[str] = None,
+                  hasta: Optional[str] = None, fuente: Optional[str] = None):
+        """
+        Ejecuta una consulta DuckDB sobre la vista 'analisis_completo' y devuelve un DataFrame.
+
+        Args:
+            sql (str): Consulta que usa la vista 'analisis_completo'.
+            parametros (list, optional): Parámetros '?' de la consulta.
+            columnas (List[str], optional): Columnas expuestas en la vista. Por defecto
+                todas salvo el texto y los scores, que son las más pesadas.
+            desde (str, optional): La vista solo incluye filas con fecha_analisis >= desde.
+            hasta (str, optional): La vista solo incluye filas con fecha_analisis < hasta.
+            fuente (str, optional): La vista solo incluye filas de esta fuente.
+        """
+        columnas = columnas or [c for c in self.TIPOS if c not in ('texto_original', 'scores_detallados')]
+        con = self._conectar_duckdb(columnas, desde=desde, hasta=hasta, fuente=fuente)
+        try:
+            return con.execute(sql, parametros or []).df()
+        finally:
+            con.close()
+
+    def tendencia_diaria(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                         fuente: Optional[str] = None):
+        """
+        Comentarios y confianza media por día y sentimiento en todo el histórico.
+
+        Args:
+            desde (str, optional): Primer día incluido ('YYYY-MM-DD').
+            hasta (str, optional): Último día, excluido.
+            fuente (str, optional): Limita la consulta a una fuente.
+        """
+        # Los filtros limitan la vista, así que se aplican también al leer la tabla viva.
+        return self.consultar("""
+            SELECT substr(fecha_analisis, 1, 10) AS dia, sentimiento,
+                   COUNT(*) AS cantidad, AVG(confianza) AS confianza_media
+            FROM analisis_completo
+            GROUP BY dia, sentimiento
+            ORDER BY dia, sentimiento
+        """, columnas=['sentimiento', 'confianza', 'fecha_analisis'], desde=desde, hasta=hasta, fuente=fuente)
@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+class _TitularConexion:
+    """Contenedor de la conexión de lectura de un hilo, al que se ata su cierre."""
+
+    __slots__ = ('conexion', '__weakref__')
+
+    def __init__(self, conexion: sqlite3.Connection) -> None:
+        self.conexion = conexion
+
+
+class GestorConexiones:
+    """
+    Conexiones SQLite seguras entre hilos para DatabaseManager.
+
+    Mantiene una única conexión de escritura, protegida por un lock, y una conexión
+    de solo lectura por hilo. En modo WAL los lectores no bloquean al escritor ni
+    entre sí, así que las peticiones de la API (que FastAPI atiende en su pool de
+    hilos) y las recargas de Streamlit pueden consultar en paralelo mientras se
+    escribe. `busy_timeout` hace que una operación espere a que se libere un bloqueo
+    en lugar de fallar con "database is locked".
+
+    La conexión de lectura de un hilo se cierra cuando el hilo termina, así que los
+    hilos de corta vida (Streamlit crea uno por recarga) no acumulan conexiones.
+    """
+
+    def __init__(self, db_name: str, journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 cache_size_kb: int = 20000, busy_timeout_ms: int = 5000) -> None:
+        """
+        Args:
+            db_name (str): Archivo de la base de datos.
+            journal_mode (str): Modo de journal de SQLite.
+            synchronous (str): Nivel de PRAGMA synchronous.
+            cache_size_kb (int): Tamaño de la caché de páginas por conexión, en KiB.
+            busy_timeout_ms (int): Espera máxima ante un bloqueo antes de fallar.
+        """
+        self.db_name = db_name
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout_ms = busy_timeout_ms
+        # Una base de datos en memoria solo existe dentro de su conexión: las lecturas
+        # se hacen sobre la conexión de escritura.
+        self._en_memoria = db_name == ":memory:" or db_name.startswith("file::memory:")
+
+        self._lock_escritura = threading.RLock()
+        self._conexion_escritura = sqlite3.connect(db_name, check_same_thread=False,
+                                                   timeout=busy_timeout_ms / 1000)
+        self._configurar(self._conexion_escritura)
+        self._conexion_escritura.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conexion_escritura.execute(f"PRAGMA synchronous={synchronous}")
+
+        self._locales = threading.local()
+        self._conexiones_lectura: List[sqlite3.Connection] = []
+        self._lock_registro = threading.Lock()
+        self._cerrado = False
+
+    def _configurar(self, conexion: sqlite3.Connection) -> None:
+        """Aplica los PRAGMAs comunes a una conexión nueva."""
+        conexion.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # Un valor negativo indica el tamaño en KiB en lugar de en páginas.
+        conexion.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conexion.execute("PRAGMA temp_store=MEMORY")
+
+    @property
+    def escritura(self) -> sqlite3.Connection:
+        """Conexión de escritura. Fuera de `sesion_escritura` no está protegida por el lock."""
+        return self._conexion_escritura
+
+    @contextmanager
+    def sesion_escritura(self) -> Iterator[sqlite3.Connection]:
+        """
+        Da acceso exclusivo a la conexión de escritura. Al salir del bloque se hace
+        commit, o rollback si hubo una excepción.
+        """
+        if self._cerrado:
+            raise RuntimeError(f"Las conexiones a '{self.db_name}' están cerradas.")
+        with self._lock_escritura:
+            try:
+                yield self._conexion_escritura
+            except BaseException:
+                self._conexion_escritura.rollback()
+                raise
+            else:
+                self._conexion_escritura.commit()
+
+    def _conexion_lectura(self) -> sqlite3.Connection:
+        titular = getattr(self._locales, 'titular', None)
+        if titular is None:
+            conexion = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True,
+                                       check_same_thread=False, timeout=self.busy_timeout_ms / 1000)
+            self._configurar(conexion)
+            titular = _TitularConexion(conexion)
+            # Se registran para poder cerrarlas todas desde `cerrar`, en cualquier hilo.
+            with self._lock_registro:
+                self._conexiones_lectura.append(conexion)
+            # El titular solo vive en el almacenamiento local del hilo: cuando el hilo
+            # termina se libera y la conexión se cierra y se quita del registro.
+            weakref.finalize(titular, self._liberar_conexion, self._conexiones_lectura,
+                             self._lock_registro, conexion)
+            self._locales.titular = titular
+        return titular.conexion
+
+    @staticmethod
+    def _liberar_conexion(registro: List[sqlite3.Connection], lock: threading.Lock,
+                          conexion: sqlite3.Connection) -> None:
+        with lock:
+            if conexion in registro:
+                registro.remove(conexion)
+        conexion.close()
+
+    @contextmanager
+    def sesion_lectura(self) -> Iterator[sqlite3.Connection]:
+        """Da la conexión de solo lectura del hilo actual."""
+        if self._cerrado:
+            raise RuntimeError(f"Las conexiones a '{self.db_name}' están cerradas.")
+        if self._en_memoria:
+            with self._lock_escritura:
+                yield self._conexion_escritura
+            return
+        yield self._conexion_lectura()
+
+    def cerrar(self) -> None:
+        """Cierra la conexión de escritura y todas las de lectura. Se puede llamar varias veces."""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        with self._lock_registro:
+            for conexion in self._conexiones_lectura:
+                conexion.close()
+            self._conexiones_lectura.clear()
+        with self._lock_escritura:
+            self._conexion_escritura.close()
+
+    def __enter__(self) -> 'GestorConexiones':
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
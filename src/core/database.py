@@ -1,52 +1,723 @@
+import json
 import sqlite3
+import threading
+import time
 from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.core.conexiones import GestorConexiones
 
 class DatabaseManager:
     """
     Gestiona la conexión y las operaciones con la base de datos SQLite.
+
+    Se puede compartir entre hilos: las escrituras se serializan sobre una única
+    conexión y cada hilo lee con su propia conexión de solo lectura (ver
+    `GestorConexiones`). Ciérralo con `cerrar()` o úsalo en un bloque 'with'.
     """
-    def __init__(self, db_name="sentimientos.db"):
+
+    # Migraciones del esquema en orden. Cada una se aplica en su propia transacción
+    # y deja PRAGMA user_version en su número, así que solo corren las pendientes.
+    MIGRACIONES = [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS analisis (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fuente TEXT NOT NULL,
+                texto_original TEXT NOT NULL,
+                sentimiento TEXT NOT NULL,
+                confianza REAL NOT NULL,
+                fecha_analisis TEXT NOT NULL
+            )
+            """,
+        ]),
+        (2, [
+            "ALTER TABLE analisis ADD COLUMN comentario_id TEXT",
+            "ALTER TABLE analisis ADD COLUMN usuario TEXT",
+            "ALTER TABLE analisis ADD COLUMN fecha_comentario TEXT",
+            "ALTER TABLE analisis ADD COLUMN scores_detallados TEXT",
+            # Las filas antiguas tienen comentario_id NULL; SQLite trata los NULL como
+            # distintos, así que no chocan entre sí con el índice único.
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_analisis_fuente_comentario ON analisis (fuente, comentario_id)",
+            "CREATE INDEX IF NOT EXISTS ix_analisis_fecha ON analisis (fecha_analisis)",
+            "CREATE INDEX IF NOT EXISTS ix_analisis_fuente_fecha ON analisis (fuente, fecha_analisis)",
+            "CREATE INDEX IF NOT EXISTS ix_analisis_sentimiento_fecha ON analisis (sentimiento, fecha_analisis)",
+        ]),
+        (3, [
+            # Resúmenes precalculados por periodo × fuente × sentimiento. Los triggers
+            # los actualizan en la misma transacción que cada INSERT o UPDATE de
+            # 'analisis'; al borrar filas (archivado) el histórico agregado se conserva.
+            """
+            CREATE TABLE IF NOT EXISTS resumen_sentimiento (
+                granularidad TEXT NOT NULL,
+                periodo TEXT NOT NULL,
+                fuente TEXT NOT NULL,
+                sentimiento TEXT NOT NULL,
+                cantidad INTEGER NOT NULL,
+                suma_confianza REAL NOT NULL,
+                PRIMARY KEY (granularidad, periodo, fuente, sentimiento)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_resumen_insertar AFTER INSERT ON analisis
+            BEGIN
+                INSERT INTO resumen_sentimiento (granularidad, periodo, fuente, sentimiento, cantidad, suma_confianza)
+                VALUES ('dia', substr(NEW.fecha_analisis, 1, 10), NEW.fuente, NEW.sentimiento, 1, NEW.confianza),
+                       ('hora', substr(NEW.fecha_analisis, 1, 13) || ':00', NEW.fuente, NEW.sentimiento, 1, NEW.confianza)
+                ON CONFLICT (granularidad, periodo, fuente, sentimiento) DO UPDATE SET
+                    cantidad = cantidad + excluded.cantidad,
+                    suma_confianza = suma_confianza + excluded.suma_confianza;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_resumen_actualizar
+            AFTER UPDATE OF fuente, sentimiento, confianza, fecha_analisis ON analisis
+            BEGIN
+                INSERT INTO resumen_sentimiento (granularidad, periodo, fuente, sentimiento, cantidad, suma_confianza)
+                VALUES ('dia', substr(OLD.fecha_analisis, 1, 10), OLD.fuente, OLD.sentimiento, -1, -OLD.confianza),
+                       ('hora', substr(OLD.fecha_analisis, 1, 13) || ':00', OLD.fuente, OLD.sentimiento, -1, -OLD.confianza),
+                       ('dia', substr(NEW.fecha_analisis, 1, 10), NEW.fuente, NEW.sentimiento, 1, NEW.confianza),
+                       ('hora', substr(NEW.fecha_analisis, 1, 13) || ':00', NEW.fuente, NEW.sentimiento, 1, NEW.confianza)
+                ON CONFLICT (granularidad, periodo, fuente, sentimiento) DO UPDATE SET
+                    cantidad = cantidad + excluded.cantidad,
+                    suma_confianza = suma_confianza + excluded.suma_confianza;
+                DELETE FROM resumen_sentimiento
+                WHERE fuente = OLD.fuente AND sentimiento = OLD.sentimiento AND cantidad <= 0
+                  AND ((granularidad = 'dia' AND periodo = substr(OLD.fecha_analisis, 1, 10))
+                    OR (granularidad = 'hora' AND periodo = substr(OLD.fecha_analisis, 1, 13) || ':00'));
+            END
+            """,
+        ]),
+        (4, [
+            # Índice de texto completo sobre texto_original. Es una tabla de contenido
+            # externo: no duplica el texto, solo guarda el índice invertido, y los
+            # triggers lo mantienen al día con cada escritura, borrado o archivado.
+            # remove_diacritics hace que 'envio' encuentre 'envío'.
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS analisis_fts USING fts5(
+                texto_original,
+                content='analisis',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_fts_insertar AFTER INSERT ON analisis
+            BEGIN
+                INSERT INTO analisis_fts (rowid, texto_original) VALUES (NEW.id, NEW.texto_original);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_fts_borrar AFTER DELETE ON analisis
+            BEGIN
+                INSERT INTO analisis_fts (analisis_fts, rowid, texto_original)
+                VALUES ('delete', OLD.id, OLD.texto_original);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_fts_actualizar AFTER UPDATE OF texto_original ON analisis
+            BEGIN
+                INSERT INTO analisis_fts (analisis_fts, rowid, texto_original)
+                VALUES ('delete', OLD.id, OLD.texto_original);
+                INSERT INTO analisis_fts (rowid, texto_original) VALUES (NEW.id, NEW.texto_original);
+            END
+            """,
+            # Indexa las filas que ya existían.
+            "INSERT INTO analisis_fts (analisis_fts) VALUES ('rebuild')",
+        ]),
+        (5, [
+            # Trabajos de extracción y análisis lanzados desde la API (ver src/api/trabajos.py).
+            """
+            CREATE TABLE IF NOT EXISTS trabajos (
+                id TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                cantidad INTEGER NOT NULL,
+                creado TEXT NOT NULL,
+                iniciado TEXT,
+                terminado TEXT,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                items_extraidos INTEGER NOT NULL DEFAULT 0,
+                items_analizados INTEGER NOT NULL DEFAULT 0,
+                items_guardados INTEGER NOT NULL DEFAULT 0,
+                items_fallidos INTEGER NOT NULL DEFAULT 0,
+                url_actual TEXT,
+                error TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_trabajos_estado ON trabajos (estado, creado)",
+        ]),
+        (6, [
+            # Claves de los comentarios movidos al archivo Parquet (ver src/core/archivo.py).
+            # Al borrarlos de 'analisis' su (fuente, comentario_id) queda libre en el índice
+            # único: el trigger descarta en silencio los que se vuelvan a extraer, que si no
+            # contarían dos veces en los resúmenes y en las consultas sobre todo el histórico.
+            """
+            CREATE TABLE IF NOT EXISTS analisis_archivados (
+                fuente TEXT NOT NULL,
+                comentario_id TEXT NOT NULL,
+                PRIMARY KEY (fuente, comentario_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_analisis_archivados_insertar BEFORE INSERT ON analisis
+            WHEN NEW.comentario_id IS NOT NULL
+            BEGIN
+                SELECT RAISE(IGNORE) WHERE EXISTS (
+                    SELECT 1 FROM analisis_archivados
+                    WHERE fuente = NEW.fuente AND comentario_id = NEW.comentario_id
+                );
+            END
+            """,
+        ]),
+        (7, [
+            # Última señal de vida del worker que tiene el trabajo (ver GestorTrabajos):
+            # cualquier worker reclama los trabajos activos cuyo latido ha vencido.
+            "ALTER TABLE trabajos ADD COLUMN latido TEXT",
+            "UPDATE trabajos SET latido = COALESCE(iniciado, creado)",
+        ]),
+    ]
+
+    # Recalcula los resúmenes a partir de las filas de 'analisis'.
+    _SQL_RESUMEN_DESDE_ANALISIS = """
+        INSERT INTO resumen_sentimiento (granularidad, periodo, fuente, sentimiento, cantidad, suma_confianza)
+        SELECT 'dia', substr(fecha_analisis, 1, 10), fuente, sentimiento, COUNT(*), SUM(confianza)
+        FROM analisis GROUP BY 2, 3, 4
+        UNION ALL
+        SELECT 'hora', substr(fecha_analisis, 1, 13) || ':00', fuente, sentimiento, COUNT(*), SUM(confianza)
+        FROM analisis GROUP BY 2, 3, 4
+        """
+
+    GRANULARIDADES = ('dia', 'hora')
+
+    # Columnas que se pueden pedir en las lecturas; evita interpolar nombres arbitrarios en el SQL.
+    COLUMNAS = ('id', 'fuente', 'texto_original', 'sentimiento', 'confianza', 'fecha_analisis',
+                'comentario_id', 'usuario', 'fecha_comentario', 'scores_detallados')
+    COLUMNAS_BASICAS = ('id', 'fuente', 'texto_original', 'sentimiento', 'confianza', 'fecha_analisis')
+
+    # Upsert: un comentario ya guardado de la misma fuente se actualiza en lugar de
+    # duplicarse. Si el resultado no ha cambiado, la fila no se reescribe.
+    _SQL_INSERTAR = """
+        INSERT INTO analisis (fuente, texto_original, sentimiento, confianza, fecha_analisis,
+                              comentario_id, usuario, fecha_comentario, scores_detallados)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (fuente, comentario_id) DO UPDATE SET
+            texto_original = excluded.texto_original,
+            sentimiento = excluded.sentimiento,
+            confianza = excluded.confianza,
+            fecha_analisis = excluded.fecha_analisis,
+            usuario = excluded.usuario,
+            fecha_comentario = excluded.fecha_comentario,
+            scores_detallados = excluded.scores_detallados
+        WHERE analisis.texto_original IS NOT excluded.texto_original
+            OR analisis.sentimiento IS NOT excluded.sentimiento
+            OR analisis.confianza IS NOT excluded.confianza
+            OR analisis.usuario IS NOT excluded.usuario
+            OR analisis.fecha_comentario IS NOT excluded.fecha_comentario
+        """
+
+    def __init__(self, db_name="sentimientos.db", journal_mode: str = "WAL",
+                 synchronous: str = "NORMAL", cache_size_kb: int = 20000,
+                 busy_timeout_ms: int = 5000):
+        """
+        Args:
+            db_name (str): Archivo de la base de datos.
+            journal_mode (str): Modo de journal de SQLite. WAL permite lecturas
+                concurrentes con la escritura y commits más baratos.
+            synchronous (str): Nivel de PRAGMA synchronous. Con WAL, NORMAL solo
+                hace fsync en los checkpoints y sigue siendo seguro ante caídas del proceso.
+            cache_size_kb (int): Tamaño de la caché de páginas en KiB.
+            busy_timeout_ms (int): Espera máxima ante un bloqueo antes de fallar.
+        """
         self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+        self.conexiones = GestorConexiones(db_name, journal_mode=journal_mode, synchronous=synchronous,
+                                           cache_size_kb=cache_size_kb, busy_timeout_ms=busy_timeout_ms)
         self.inicializar_tabla()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión de escritura, para código que necesita acceso directo."""
+        return self.conexiones.escritura
+
     def inicializar_tabla(self):
         """
-        Crea la tabla 'analisis' si no existe.
+        Crea la tabla 'analisis' si no existe y aplica las migraciones pendientes.
         """
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS analisis (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fuente TEXT NOT NULL,
-            texto_original TEXT NOT NULL,
-            sentimiento TEXT NOT NULL,
-            confianza REAL NOT NULL,
-            fecha_analisis TEXT NOT NULL
-        )
-        """)
-        self.conn.commit()
+        with self.conexiones.sesion_escritura() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for numero, sentencias in self.MIGRACIONES:
+                if numero <= version:
+                    continue
+                # Las sentencias DDL no abren transacción implícita en sqlite3, así que se
+                # abre a mano para que cada migración se aplique entera o no se aplique.
+                # IMMEDIATE toma el bloqueo de escritura al empezar: si varios procesos
+                # (los workers de la API) abren a la vez una base de datos sin migrar,
+                # solo uno aplica cada migración y el resto ve la versión ya actualizada.
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= numero:
+                    conn.rollback()
+                    continue
+                try:
+                    for sentencia in sentencias:
+                        conn.execute(sentencia)
+                    if numero == 3:
+                        # Las bases de datos existentes parten con los resúmenes ya calculados.
+                        conn.execute(self._SQL_RESUMEN_DESDE_ANALISIS)
+                    conn.execute(f"PRAGMA user_version={numero}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                if version:
+                    # Solo se informa al actualizar una base de datos existente, no al crearla.
+                    print(f"Base de datos '{self.db_name}' migrada a la versión {numero} del esquema.")
+
+    @staticmethod
+    def _fecha_texto(fecha) -> Optional[str]:
+        """
+        Normaliza la fecha de un comentario (datetime, timestamp o texto) al formato de la tabla.
+        """
+        if fecha is None or fecha == '':
+            return None
+        if isinstance(fecha, (int, float)):
+            fecha = datetime.fromtimestamp(fecha)
+        if isinstance(fecha, datetime):
+            return fecha.strftime('%Y-%m-%d %H:%M:%S')
+        return str(fecha)
 
-    def guardar_analisis(self, texto_original: str, resultado_analisis: dict, fuente: str):
+    def _fila(self, texto_original: str, resultado_analisis: dict, fuente: str, fecha: str,
+              comentario_id: Optional[str] = None, usuario: Optional[str] = None,
+              fecha_comentario=None) -> tuple:
         """
-        Guarda un único resultado de análisis en la base de datos.
+        Convierte un resultado de análisis en la tupla de parámetros del INSERT.
         """
         sentimiento = resultado_analisis.get('sentimiento', 'ERROR')
         confianza = resultado_analisis.get('confianza', 0.0)
+        scores = resultado_analisis.get('scores_detallados')
+        return (
+            fuente, texto_original, sentimiento, confianza, fecha,
+            str(comentario_id) if comentario_id not in (None, '') else None,
+            usuario,
+            self._fecha_texto(fecha_comentario),
+            json.dumps(scores) if scores is not None else None,
+        )
+
+    def guardar_analisis(self, texto_original: str, resultado_analisis: dict, fuente: str,
+                         comentario_id: Optional[str] = None, usuario: Optional[str] = None,
+                         fecha_comentario=None):
+        """
+        Guarda un único resultado de análisis en la base de datos. Si se indica el
+        `comentario_id` del conector y ya existe para esa fuente, se actualiza.
+        """
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        fila = self._fila(texto_original, resultado_analisis, fuente, fecha,
+                          comentario_id, usuario, fecha_comentario)
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute(self._SQL_INSERTAR, fila)
+
+    def guardar_lote(self, registros: Iterable[Dict]):
+        """
+        Guarda muchos resultados de análisis en una sola transacción con executemany.
+
+        Args:
+            registros: Diccionarios con las claves 'texto_original', 'resultado' y 'fuente',
+                y opcionalmente 'comentario_id', 'usuario' y 'fecha_comentario'.
+        """
         fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        filas = [
+            self._fila(registro['texto_original'], registro['resultado'], registro['fuente'], fecha,
+                       registro.get('comentario_id'), registro.get('usuario'), registro.get('fecha_comentario'))
+            for registro in registros
+        ]
+        if not filas:
+            return
+        # La sesión hace commit al final o rollback si algo falla.
+        with self.conexiones.sesion_escritura() as conn:
+            conn.executemany(self._SQL_INSERTAR, filas)
+
+    def sesion_masiva(self, filas_por_flush: int = 500, segundos_por_flush: float = 2.0) -> 'SesionMasiva':
+        """
+        Devuelve una sesión de escritura masiva para usar con 'with'. Los resultados se
+        acumulan en memoria y se escriben con `guardar_lote` cada `filas_por_flush`
+        filas o cada `segundos_por_flush` segundos (aunque no lleguen más), y siempre
+        al salir del bloque.
+        """
+        return SesionMasiva(self, filas_por_flush, segundos_por_flush)
+
+    def reconstruir_resumenes(self):
+        """
+        Recalcula la tabla 'resumen_sentimiento' desde cero a partir de 'analisis'.
+        Las filas ya archivadas fuera de 'analisis' dejan de contar en los resúmenes.
+        """
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute("DELETE FROM resumen_sentimiento")
+            conn.execute(self._SQL_RESUMEN_DESDE_ANALISIS)
+
+    def resumen_por_periodo(self, granularidad: str = 'dia', desde: Optional[str] = None,
+                            hasta: Optional[str] = None, fuente: Optional[str] = None) -> List[tuple]:
+        """
+        Cantidad de comentarios y confianza media por periodo y sentimiento, leídas
+        solo de los resúmenes precalculados.
+
+        Args:
+            granularidad (str): 'dia' (periodo 'YYYY-MM-DD') u 'hora' (periodo 'YYYY-MM-DD HH:00').
+            desde (str, optional): Primer periodo incluido, con el mismo formato.
+            hasta (str, optional): Último periodo incluido, con el mismo formato.
+            fuente (str, optional): Limita el resumen a una fuente.
+
+        Returns:
+            Tuplas (periodo, sentimiento, cantidad, confianza_media) ordenadas por periodo.
+        """
+        if granularidad not in self.GRANULARIDADES:
+            raise ValueError(f"Granularidad no soportada: '{granularidad}'. Usa una de {self.GRANULARIDADES}.")
+        condiciones, parametros = ["granularidad = ?"], [granularidad]
+        if desde is not None:
+            condiciones.append("periodo >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("periodo <= ?")
+            parametros.append(hasta)
+        if fuente is not None:
+            condiciones.append("fuente = ?")
+            parametros.append(fuente)
+        with self.conexiones.sesion_lectura() as conn:
+            return conn.execute(f"""
+                SELECT periodo, sentimiento, SUM(cantidad), SUM(suma_confianza) / SUM(cantidad)
+                FROM resumen_sentimiento
+                WHERE {' AND '.join(condiciones)}
+                GROUP BY periodo, sentimiento
+                ORDER BY periodo, sentimiento
+            """, parametros).fetchall()
+
+    def totales_por_sentimiento(self, fuente: Optional[str] = None) -> Dict[str, int]:
+        """
+        Número total de comentarios por sentimiento, sumando los resúmenes diarios.
+        """
+        consulta = "SELECT sentimiento, SUM(cantidad) FROM resumen_sentimiento WHERE granularidad = 'dia'"
+        parametros = []
+        if fuente is not None:
+            consulta += " AND fuente = ?"
+            parametros.append(fuente)
+        with self.conexiones.sesion_lectura() as conn:
+            return dict(conn.execute(consulta + " GROUP BY sentimiento", parametros).fetchall())
+
+    def reconstruir_indice_texto(self):
+        """
+        Reconstruye el índice de texto completo a partir de 'analisis'.
+        """
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute("INSERT INTO analisis_fts (analisis_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO analisis_fts (analisis_fts) VALUES ('optimize')")
+
+    @staticmethod
+    def _consulta_fts(texto: str) -> str:
+        """
+        Convierte el texto de búsqueda en una consulta FTS5 segura: cada palabra se busca
+        literal (entre comillas) y deben aparecer todas. Un '*' final busca por prefijo.
+        """
+        terminos = []
+        for palabra in texto.split():
+            prefijo = palabra.endswith('*') and len(palabra) > 1
+            palabra = palabra.rstrip('*').replace('"', '""')
+            if palabra:
+                terminos.append(f'"{palabra}"' + ('*' if prefijo else ''))
+        return ' '.join(terminos)
+
+    def buscar(self, texto: str, sentimiento: Optional[str] = None, desde: Optional[str] = None,
+               hasta: Optional[str] = None, fuente: Optional[str] = None,
+               limite: int = 50, desplazamiento: int = 0) -> List[Dict]:
+        """
+        Busca comentarios por texto con el índice FTS5, ordenados por relevancia (BM25).
+
+        Args:
+            texto (str): Palabras a buscar; deben aparecer todas, sin importar tildes
+                ni mayúsculas. 'envi*' busca por prefijo.
+            sentimiento (str, optional): Solo comentarios con este sentimiento.
+            desde (str, optional): fecha_analisis mínima, incluida ('YYYY-MM-DD[ HH:MM:SS]').
+            hasta (str, optional): fecha_analisis máxima, excluida.
+            fuente (str, optional): Solo comentarios de esta fuente.
+            limite (int): Resultados por página.
+            desplazamiento (int): Resultados que se saltan (paginación).
+
+        Returns:
+            List[Dict]: Comentarios con su análisis, un fragmento con las coincidencias
+            marcadas entre corchetes y la relevancia (más negativa = más relevante).
+        """
+        consulta = self._consulta_fts(texto)
+        if not consulta:
+            return []
+        condiciones, parametros = ["analisis_fts MATCH ?"], [consulta]
+        for condicion, valor in (("a.sentimiento = ?", sentimiento), ("a.fecha_analisis >= ?", desde),
+                                 ("a.fecha_analisis < ?", hasta), ("a.fuente = ?", fuente)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
 
-        self.cursor.execute("""
-        INSERT INTO analisis (fuente, texto_original, sentimiento, confianza, fecha_analisis)
-        VALUES (?, ?, ?, ?, ?)
-        """, (fuente, texto_original, sentimiento, confianza, fecha))
-        self.conn.commit()
+        with self.conexiones.sesion_lectura() as conn:
+            filas = conn.execute(f"""
+                SELECT a.id, a.fuente, a.texto_original, a.sentimiento, a.confianza, a.fecha_analisis,
+                       snippet(analisis_fts, 0, '[', ']', '…', 16), bm25(analisis_fts) AS relevancia
+                FROM analisis_fts
+                JOIN analisis AS a ON a.id = analisis_fts.rowid
+                WHERE {' AND '.join(condiciones)}
+                ORDER BY relevancia
+                LIMIT ? OFFSET ?
+            """, parametros + [limite, desplazamiento]).fetchall()
+
+        claves = ('id', 'fuente', 'texto_original', 'sentimiento', 'confianza', 'fecha_analisis',
+                  'fragmento', 'relevancia')
+        return [dict(zip(claves, fila)) for fila in filas]
+
+    def iterar_analisis(self, columnas: Optional[Sequence[str]] = None, desde: Optional[str] = None,
+                        hasta: Optional[str] = None, fuente: Optional[str] = None,
+                        sentimiento: Optional[str] = None, confianza_minima: Optional[float] = None,
+                        tamano_bloque: int = 1000, descendente: bool = False) -> Iterator[List[tuple]]:
+        """
+        Recorre la tabla 'analisis' en bloques acotados, sin cargarla entera en memoria.
+
+        Usa paginación por clave sobre (fecha_analisis, id): cada bloque es una consulta
+        nueva que continúa tras la última fila del anterior, así que el coste por bloque
+        no crece con la posición y no queda ningún cursor abierto entre bloques.
+
+        Args:
+            columnas (Sequence[str], optional): Columnas a devolver, de `COLUMNAS`.
+                Por defecto, las de `COLUMNAS_BASICAS`.
+            desde (str, optional): fecha_analisis mínima, incluida ('YYYY-MM-DD[ HH:MM:SS]').
+            hasta (str, optional): fecha_analisis máxima, excluida.
+            fuente (str, optional): Solo filas de esta fuente.
+            sentimiento (str, optional): Solo filas con este sentimiento.
+            confianza_minima (float, optional): Solo filas con al menos esta confianza.
+            tamano_bloque (int): Filas por bloque.
+            descendente (bool): Si es True, empieza por los análisis más recientes.
+
+        Yields:
+            Listas de tuplas con las columnas pedidas, en orden de (fecha_analisis, id).
+        """
+        columnas = list(columnas or self.COLUMNAS_BASICAS)
+        no_validas = [columna for columna in columnas if columna not in self.COLUMNAS]
+        if no_validas:
+            raise ValueError(f"Columnas no válidas: {no_validas}. Usa columnas de {self.COLUMNAS}.")
+
+        condiciones, parametros = [], []
+        for condicion, valor in (("fecha_analisis >= ?", desde), ("fecha_analisis < ?", hasta),
+                                 ("fuente = ?", fuente), ("sentimiento = ?", sentimiento),
+                                 ("confianza >= ?", confianza_minima)):
+            if valor is not None:
+                condiciones.append(condicion)
+                parametros.append(valor)
+
+        comparador, orden = ('<', 'DESC') if descendente else ('>', 'ASC')
+        # La clave de paginación va al final de cada fila y se quita antes de devolverla.
+        seleccion = ', '.join(columnas + ['fecha_analisis', 'id'])
+        ultima_clave = None
+        while True:
+            filtros = list(condiciones)
+            valores = list(parametros)
+            if ultima_clave is not None:
+                filtros.append(f"(fecha_analisis, id) {comparador} (?, ?)")
+                valores.extend(ultima_clave)
+            where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+            with self.conexiones.sesion_lectura() as conn:
+                filas = conn.execute(f"""
+                    SELECT {seleccion} FROM analisis {where}
+                    ORDER BY fecha_analisis {orden}, id {orden}
+                    LIMIT ?
+                """, valores + [tamano_bloque]).fetchall()
+            if not filas:
+                return
+            ultima_clave = filas[-1][-2:]
+            yield [fila[:-2] for fila in filas]
+            if len(filas) < tamano_bloque:
+                return
 
     def obtener_todos_los_analisis(self):
         """
-        Obtiene todos los registros de la tabla de análisis.
+        Obtiene todos los registros de la tabla de análisis con las columnas
+        (id, fuente, texto_original, sentimiento, confianza, fecha_analisis),
+        del más reciente al más antiguo. Carga toda la tabla en memoria; para
+        recorridos grandes usa `iterar_analisis`.
+        """
+        return [fila for bloque in self.iterar_analisis(descendente=True) for fila in bloque]
+
+    # --- Trabajos de análisis ---
+
+    CAMPOS_TRABAJO = ('id', 'estado', 'urls', 'cantidad', 'creado', 'iniciado', 'terminado', 'intentos',
+                      'items_extraidos', 'items_analizados', 'items_guardados', 'items_fallidos',
+                      'url_actual', 'error', 'latido')
+    ESTADOS_TRABAJO_ACTIVOS = ('pendiente', 'en_curso')
+
+    def crear_trabajo(self, id_trabajo: str, urls: List[str], cantidad: int):
+        """
+        Registra un trabajo nuevo en estado 'pendiente'.
+        """
+        creado = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute(
+                "INSERT INTO trabajos (id, estado, urls, cantidad, creado, latido) VALUES (?, 'pendiente', ?, ?, ?, ?)",
+                (id_trabajo, json.dumps(urls), cantidad, creado, creado),
+            )
+
+    def registrar_latido(self, ids_trabajos: Sequence[str], latido: str):
+        """
+        Marca como vivos los trabajos activos indicados (los que tiene este proceso).
+        """
+        if not ids_trabajos:
+            return
+        marcadores = ', '.join('?' for _ in ids_trabajos)
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute(
+                f"UPDATE trabajos SET latido = ? WHERE id IN ({marcadores}) AND estado IN (?, ?)",
+                [latido, *ids_trabajos, *self.ESTADOS_TRABAJO_ACTIVOS],
+            )
+
+    def reclamar_trabajos(self, latido_anterior_a: str, latido: str) -> List[str]:
+        """
+        Reclama los trabajos activos cuyo latido es anterior a `latido_anterior_a`
+        (su proceso murió o se apagó): los deja 'pendiente' con un latido nuevo y
+        devuelve sus ids en orden de creación. La transacción IMMEDIATE hace que,
+        entre varios procesos, cada trabajo lo reclame uno solo.
+        """
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ids = [fila[0] for fila in conn.execute(
+                "SELECT id FROM trabajos WHERE estado IN (?, ?) AND (latido IS NULL OR latido < ?) "
+                "ORDER BY creado, rowid",
+                [*self.ESTADOS_TRABAJO_ACTIVOS, latido_anterior_a],
+            )]
+            conn.executemany("UPDATE trabajos SET estado = 'pendiente', latido = ? WHERE id = ?",
+                             [(latido, id_trabajo) for id_trabajo in ids])
+        return ids
+
+    def actualizar_trabajo(self, id_trabajo: str, **campos):
+        """
+        Actualiza campos de un trabajo (estado, contadores, fechas, error...).
+        """
+        no_validos = [campo for campo in campos if campo not in self.CAMPOS_TRABAJO or campo == 'id']
+        if no_validos:
+            raise ValueError(f"Campos de trabajo no válidos: {no_validos}")
+        asignaciones = ', '.join(f"{campo} = ?" for campo in campos)
+        with self.conexiones.sesion_escritura() as conn:
+            conn.execute(f"UPDATE trabajos SET {asignaciones} WHERE id = ?", list(campos.values()) + [id_trabajo])
+
+    def _trabajo_a_dict(self, fila: tuple) -> Dict:
+        trabajo = dict(zip(self.CAMPOS_TRABAJO, fila))
+        trabajo['urls'] = json.loads(trabajo['urls'])
+        return trabajo
+
+    def obtener_trabajo(self, id_trabajo: str) -> Optional[Dict]:
+        """
+        Devuelve un trabajo como diccionario, o None si no existe.
+        """
+        with self.conexiones.sesion_lectura() as conn:
+            fila = conn.execute(f"SELECT {', '.join(self.CAMPOS_TRABAJO)} FROM trabajos WHERE id = ?",
+                                (id_trabajo,)).fetchone()
+        return self._trabajo_a_dict(fila) if fila else None
+
+    def listar_trabajos(self, estados: Optional[Sequence[str]] = None, limite: int = 50) -> List[Dict]:
+        """
+        Devuelve los trabajos más recientes, opcionalmente filtrados por estado.
+        """
+        consulta = f"SELECT {', '.join(self.CAMPOS_TRABAJO)} FROM trabajos"
+        parametros: list = []
+        if estados:
+            consulta += f" WHERE estado IN ({', '.join('?' for _ in estados)})"
+            parametros.extend(estados)
+        with self.conexiones.sesion_lectura() as conn:
+            filas = conn.execute(consulta + " ORDER BY creado DESC, rowid DESC LIMIT ?", parametros + [limite]).fetchall()
+        return [self._trabajo_a_dict(fila) for fila in filas]
+
+    def cerrar(self):
         """
-        self.cursor.execute("SELECT * FROM analisis ORDER BY fecha_analisis DESC")
-        return self.cursor.fetchall()
+        Cierra todas las conexiones a la base de datos.
+        """
+        self.conexiones.cerrar()
+
+    def __enter__(self) -> 'DatabaseManager':
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+class SesionMasiva:
+    """
+    Acumula resultados de análisis y los escribe en bloques transaccionales.
+    Se obtiene con `DatabaseManager.sesion_masiva()`.
+
+    Dentro de un bloque 'with', un hilo vigila el límite de tiempo: el último bloque
+    parcial se escribe a los `segundos_por_flush` aunque no lleguen más resultados.
+    """
+    def __init__(self, db: DatabaseManager, filas_por_flush: int, segundos_por_flush: float):
+        self.db = db
+        self.filas_por_flush = filas_por_flush
+        self.segundos_por_flush = segundos_por_flush
+        self.filas_escritas = 0
+        self._pendientes: List[Dict] = []
+        self._ultimo_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._detenido = threading.Event()
+        self._vigilante: Optional[threading.Thread] = None
+
+    def agregar(self, texto_original: str, resultado_analisis: dict, fuente: str,
+                comentario_id: Optional[str] = None, usuario: Optional[str] = None,
+                fecha_comentario=None):
+        """
+        Añade un resultado a la sesión; escribe el bloque si se alcanza el límite
+        de filas o de tiempo. Con `comentario_id`, un comentario ya guardado de la
+        misma fuente se actualiza (ver `guardar_analisis`).
+        """
+        self.agregar_lote([{
+            'texto_original': texto_original, 'resultado': resultado_analisis, 'fuente': fuente,
+            'comentario_id': comentario_id, 'usuario': usuario, 'fecha_comentario': fecha_comentario,
+        }])
+
+    def agregar_lote(self, registros: Iterable[Dict]):
+        """Añade varios registros con el formato de `guardar_lote`."""
+        with self._lock:
+            self._pendientes.extend(registros)
+            if (len(self._pendientes) >= self.filas_por_flush
+                    or time.monotonic() - self._ultimo_flush >= self.segundos_por_flush):
+                self._flush()
+
+    def flush(self):
+        """
+        Escribe en una transacción todos los resultados pendientes.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pendientes:
+            self.db.guardar_lote(self._pendientes)
+            self.filas_escritas += len(self._pendientes)
+            self._pendientes = []
+        self._ultimo_flush = time.monotonic()
+
+    def _vigilar(self):
+        """Hilo vigilante: escribe lo pendiente cuando vence el límite de tiempo."""
+        while not self._detenido.wait(max(0.0, self._ultimo_flush + self.segundos_por_flush - time.monotonic())):
+            with self._lock:
+                if time.monotonic() - self._ultimo_flush < self.segundos_por_flush:
+                    continue
+                try:
+                    self._flush()
+                except Exception as e:
+                    # Los resultados siguen pendientes y se reintentan en el próximo flush.
+                    print(f"❌ Error guardando {len(self._pendientes)} resultados pendientes: {e}")
+                    self._ultimo_flush = time.monotonic()
+
+    def __enter__(self) -> 'SesionMasiva':
+        self._detenido.clear()
+        self._vigilante = threading.Thread(target=self._vigilar, name="sesion-masiva", daemon=True)
+        self._vigilante.start()
+        return self
 
-    def __del__(self):
-        self.conn.close()
\ No newline at end of file
+    def __exit__(self, tipo, valor, traza):
+        self._detenido.set()
+        if self._vigilante is not None:
+            self._vigilante.join()
+            self._vigilante = None
+        # Si el bloque falló, se guarda igualmente lo ya analizado.
+        self.flush()
+        return False
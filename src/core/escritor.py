@@ -0,0 +1,249 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from src.core.database import DatabaseManager
+
+
+class ErrorEscritura(Exception):
+    """Algunos registros no se pudieron guardar ni tras los reintentos; van en `registros`."""
+
+    def __init__(self, registros: List[Dict], error: Exception) -> None:
+        super().__init__(f"No se pudieron guardar {len(registros)} resultados en la base de datos: {error}")
+        self.registros = registros
+        self.error = error
+
+
+class EscritorAsincrono:
+    """
+    Escritor en segundo plano para DatabaseManager.
+
+    Los productores encolan resultados sin esperar al disco; un hilo propio los
+    agrupa en transacciones con `guardar_lote`. Al detenerlo se vacía la cola, de
+    modo que todo lo encolado queda guardado. La conexión SQLite se crea dentro
+    del hilo escritor, que es el único que la usa.
+
+    Una transacción que falla se reintenta con espera creciente (p. ej. si otra
+    conexión tiene la base bloqueada); si sigue fallando, se guarda fila a fila
+    para aislar los registros problemáticos. Los que no se pudieron guardar se
+    conservan y `detener` los devuelve en un ErrorEscritura.
+    """
+
+    _FIN = object()
+
+    def __init__(self, db_name: str = "sentimientos.db", capacidad_cola: int = 10000,
+                 filas_por_transaccion: int = 500, espera_max_s: float = 0.5,
+                 muestras_latencia: int = 1000, reintentos: int = 3, espera_reintento_s: float = 0.5) -> None:
+        """
+        Args:
+            db_name (str): Archivo de la base de datos.
+            capacidad_cola (int): Resultados que pueden esperar en cola. Si se llena,
+                los productores esperan (contrapresión) en lugar de crecer sin límite:
+                los hilos se bloquean y las corrutinas, con `encolar_lote_async`, ceden
+                el bucle de eventos mientras esperan.
+            filas_por_transaccion (int): Máximo de filas por transacción.
+            espera_max_s (float): Tiempo máximo que un resultado espera a completar su transacción.
+            muestras_latencia (int): Mediciones recientes usadas para los percentiles.
+            reintentos (int): Reintentos de una transacción fallida antes de guardar fila a fila.
+            espera_reintento_s (float): Espera antes del primer reintento; se duplica en cada uno.
+        """
+        self.db_name = db_name
+        self.filas_por_transaccion = filas_por_transaccion
+        self.espera_max_s = espera_max_s
+        self.reintentos = reintentos
+        self.espera_reintento_s = espera_reintento_s
+        self._cola: queue.Queue = queue.Queue(maxsize=capacidad_cola)
+
+        self.filas_escritas = 0
+        self.filas_fallidas = 0
+        self.transacciones = 0
+        self.esperas_cola_llena = 0
+        self.reintentos_realizados = 0
+        self._no_guardados: List[Dict] = []
+        self._ultimo_error: Optional[Exception] = None
+        self._latencias_transaccion_ms: deque = deque(maxlen=muestras_latencia)
+        self._latencias_extremo_ms: deque = deque(maxlen=muestras_latencia)
+        self._lock_metricas = threading.Lock()
+
+        self._listo = threading.Event()
+        self._error_inicio: Optional[Exception] = None
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-db", daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+        if self._error_inicio is not None:
+            raise self._error_inicio
+
+    def encolar(self, texto_original: str, resultado_analisis: dict, fuente: str) -> None:
+        """Encola un resultado para guardarlo en segundo plano."""
+        self._poner({'texto_original': texto_original, 'resultado': resultado_analisis, 'fuente': fuente})
+
+    def encolar_lote(self, registros: Iterable[Dict]) -> None:
+        """
+        Encola varios registros con el formato de `DatabaseManager.guardar_lote`.
+        Bloquea mientras la cola está llena: desde una corrutina usa `encolar_lote_async`.
+        """
+        for registro in registros:
+            self._poner(registro)
+
+    async def encolar_lote_async(self, registros: Iterable[Dict]) -> None:
+        """
+        Como `encolar_lote`, pero si la cola está llena la espera ocurre en un hilo
+        y el bucle de eventos sigue atendiendo otras tareas.
+        """
+        for registro in registros:
+            elemento = self._elemento(registro)
+            try:
+                self._cola.put_nowait(elemento)
+            except queue.Full:
+                self.esperas_cola_llena += 1
+                await asyncio.to_thread(self._cola.put, elemento)
+
+    def _elemento(self, registro: Dict) -> tuple:
+        if not self._hilo.is_alive():
+            raise RuntimeError("El escritor de la base de datos está detenido.")
+        return (registro, time.perf_counter())
+
+    def _poner(self, registro: Dict) -> None:
+        elemento = self._elemento(registro)
+        try:
+            self._cola.put_nowait(elemento)
+        except queue.Full:
+            self.esperas_cola_llena += 1
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self._cola.put(elemento)
+            else:
+                # Bloquear aquí congelaría el bucle de eventos (y con él al propio productor).
+                raise RuntimeError("La cola del escritor está llena: desde una corrutina usa encolar_lote_async.")
+
+    def _bucle(self) -> None:
+        """Hilo escritor: agrupa lo encolado en transacciones hasta recibir la señal de fin."""
+        try:
+            db = DatabaseManager(self.db_name)
+        except Exception as e:
+            self._error_inicio = e
+            self._listo.set()
+            return
+        self._listo.set()
+
+        terminar = False
+        while not terminar:
+            primero = self._cola.get()
+            if primero is self._FIN:
+                break
+            lote = [primero]
+            limite = time.perf_counter() + self.espera_max_s
+
+            while len(lote) < self.filas_por_transaccion:
+                try:
+                    elemento = self._cola.get(timeout=max(0.0, limite - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if elemento is self._FIN:
+                    terminar = True
+                    break
+                lote.append(elemento)
+
+            self._escribir(db, lote)
+
+        db.cerrar()
+
+    def _escribir(self, db: DatabaseManager, lote: List[tuple]) -> None:
+        """Escribe un grupo de registros en una transacción, con reintentos, y registra las latencias."""
+        espera = self.espera_reintento_s
+        for intento in range(self.reintentos + 1):
+            if self._guardar(db, lote):
+                return
+            if intento < self.reintentos:
+                self.reintentos_realizados += 1
+                time.sleep(espera)
+                espera *= 2
+
+        if len(lote) == 1:
+            self._marcar_fallido(lote[0][0])
+            return
+        # Un registro problemático hace fallar toda la transacción: se aísla guardando fila a fila.
+        print(f"⚠️ No se pudieron guardar {len(lote)} resultados juntos ({self._ultimo_error}); "
+              "se reintenta fila a fila.")
+        for elemento in lote:
+            if not self._guardar(db, [elemento]):
+                self._marcar_fallido(elemento[0])
+
+    def _guardar(self, db: DatabaseManager, lote: List[tuple]) -> bool:
+        inicio = time.perf_counter()
+        try:
+            db.guardar_lote([registro for registro, _ in lote])
+        except Exception as e:
+            self._ultimo_error = e
+            return False
+        fin = time.perf_counter()
+
+        with self._lock_metricas:
+            self.transacciones += 1
+            self.filas_escritas += len(lote)
+            self._latencias_transaccion_ms.append((fin - inicio) * 1000)
+            self._latencias_extremo_ms.extend((fin - encolado) * 1000 for _, encolado in lote)
+        return True
+
+    def _marcar_fallido(self, registro: Dict) -> None:
+        with self._lock_metricas:
+            self.filas_fallidas += 1
+            self._no_guardados.append(registro)
+        print(f"❌ Error guardando un resultado en la base de datos: {self._ultimo_error}")
+
+    def detener(self) -> None:
+        """
+        Escribe todo lo pendiente y detiene el hilo escritor.
+
+        Raises:
+            ErrorEscritura: Si algún registro no se pudo guardar; los lleva en `registros`.
+        """
+        if self._hilo.is_alive():
+            self._cola.put(self._FIN)
+            self._hilo.join()
+        with self._lock_metricas:
+            no_guardados, self._no_guardados = self._no_guardados, []
+        if no_guardados:
+            raise ErrorEscritura(no_guardados, self._ultimo_error)
+
+    def __enter__(self) -> 'EscritorAsincrono':
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            self.detener()
+        except ErrorEscritura as e:
+            if tipo is None:
+                raise
+            # No se tapa la excepción original, pero tampoco se pierde el aviso.
+            print(f"❌ {e}")
+        return False
+
+    def estadisticas(self) -> Dict[str, any]:
+        """Devuelve la profundidad de la cola y las latencias de escritura."""
+        def percentiles(muestras: deque) -> Dict[str, float]:
+            with self._lock_metricas:
+                valores = sorted(muestras)
+            if not valores:
+                return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+            return {
+                'p50': round(valores[len(valores) // 2], 3),
+                'p99': round(valores[min(len(valores) - 1, int(0.99 * len(valores)))], 3),
+                'max': round(valores[-1], 3),
+            }
+
+        return {
+            'profundidad_cola': self._cola.qsize(),
+            'capacidad_cola': self._cola.maxsize,
+            'filas_escritas': self.filas_escritas,
+            'filas_fallidas': self.filas_fallidas,
+            'transacciones': self.transacciones,
+            'esperas_cola_llena': self.esperas_cola_llena,
+            'reintentos': self.reintentos_realizados,
+            'latencia_transaccion_ms': percentiles(self._latencias_transaccion_ms),
+            'latencia_encolado_a_commit_ms': percentiles(self._latencias_extremo_ms),
+        }
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Callable, Dict, List, Sequence
+
+
+class AgregadosDeslizantes:
+    """
+    Agregados de sentimiento en ventanas deslizantes (por defecto 1, 5 y 60 minutos).
+
+    Las observaciones se acumulan en un buffer circular de tamaño fijo con una cubeta
+    por segundo (cantidad y suma de confianza por sentimiento). Cada ventana mantiene
+    además sus totales acumulados: al avanzar el reloj se restan las cubetas que salen
+    de ella, así que registrar y leer una instantánea cuestan O(1) (amortizado) sin
+    importar el tráfico, y la memoria no crece con el número de comentarios.
+    """
+
+    VENTANAS_DEFECTO = {'1m': 60, '5m': 300, '60m': 3600}
+
+    def __init__(self, ventanas: Dict[str, int] = None, sentimientos: Sequence[str] = ('POS', 'NEU', 'NEG'),
+                 reloj: Callable[[], float] = time.time) -> None:
+        """
+        Args:
+            ventanas (dict): Nombre de cada ventana → duración en segundos.
+            sentimientos (Sequence[str]): Etiquetas que se agregan; las demás se ignoran.
+            reloj (callable): Fuente del tiempo en segundos (se puede sustituir en pruebas).
+        """
+        self.ventanas = dict(ventanas or self.VENTANAS_DEFECTO)
+        self.sentimientos = tuple(sentimientos)
+        self._indice = {sentimiento: i for i, sentimiento in enumerate(self.sentimientos)}
+        self._reloj = reloj
+        self.capacidad = max(self.ventanas.values())
+
+        # Buffer circular: la cubeta del segundo s está en la posición s % capacidad.
+        self._conteos: List[List[int]] = [[0] * len(self.sentimientos) for _ in range(self.capacidad)]
+        self._sumas: List[List[float]] = [[0.0] * len(self.sentimientos) for _ in range(self.capacidad)]
+        # Totales de cada ventana sobre los segundos (ahora - duración, ahora].
+        self._totales = {nombre: ([0] * len(self.sentimientos), [0.0] * len(self.sentimientos))
+                         for nombre in self.ventanas}
+        self._segundo = int(self._reloj())
+        self._lock = threading.Lock()
+
+    def _avanzar(self, ahora: int) -> None:
+        """Mueve el reloj hasta `ahora`: resta de cada ventana los segundos que salen y vacía las cubetas reutilizadas."""
+        anterior = self._segundo
+        if ahora <= anterior:
+            return
+        self._segundo = ahora
+
+        if ahora - anterior >= self.capacidad:
+            # Pasó más tiempo que la ventana más larga: no queda nada vigente.
+            for fila in self._conteos:
+                fila[:] = [0] * len(fila)
+            for fila in self._sumas:
+                fila[:] = [0.0] * len(fila)
+            for conteos, sumas in self._totales.values():
+                conteos[:] = [0] * len(conteos)
+                sumas[:] = [0.0] * len(sumas)
+            return
+
+        for nombre, duracion in self.ventanas.items():
+            conteos, sumas = self._totales[nombre]
+            # Salen los segundos (anterior - duración, ahora - duración]; los posteriores
+            # a `anterior` no tienen datos todavía.
+            for segundo in range(anterior - duracion + 1, min(ahora - duracion, anterior) + 1):
+                posicion = segundo % self.capacidad
+                for i, cantidad in enumerate(self._conteos[posicion]):
+                    if cantidad:
+                        conteos[i] -= cantidad
+                        # Las restas de coma flotante pueden dejar residuos: una ventana vacía suma cero.
+                        sumas[i] = sumas[i] - self._sumas[posicion][i] if conteos[i] else 0.0
+
+        # Las cubetas de los segundos nuevos quedaron fuera de todas las ventanas: se vacían.
+        for segundo in range(anterior + 1, ahora + 1):
+            posicion = segundo % self.capacidad
+            self._conteos[posicion] = [0] * len(self.sentimientos)
+            self._sumas[posicion] = [0.0] * len(self.sentimientos)
+
+    def registrar(self, sentimiento: str, confianza: float) -> None:
+        """Suma un resultado de análisis al segundo actual."""
+        with self._lock:
+            self._avanzar(int(self._reloj()))
+            self._sumar(sentimiento, confianza)
+
+    def registrar_resultados(self, resultados) -> None:
+        """
+        Suma varios resultados con el formato de `AnalizadorSentimiento.analizar`
+        (p. ej. los de un lote) al segundo actual, tomando el lock una sola vez.
+        """
+        with self._lock:
+            self._avanzar(int(self._reloj()))
+            for resultado in resultados:
+                self._sumar(resultado['sentimiento'], resultado['confianza'])
+
+    def _sumar(self, sentimiento: str, confianza: float) -> None:
+        """Suma una observación a la cubeta actual y a los totales. Se llama con el lock tomado."""
+        i = self._indice.get(sentimiento)
+        if i is None:
+            return
+        posicion = self._segundo % self.capacidad
+        self._conteos[posicion][i] += 1
+        self._sumas[posicion][i] += confianza
+        for conteos, sumas in self._totales.values():
+            conteos[i] += 1
+            sumas[i] += confianza
+
+    def instantanea(self) -> Dict[str, any]:
+        """
+        Devuelve, por ventana, la cantidad, la proporción y la confianza media de cada
+        sentimiento, y el total de comentarios.
+        """
+        with self._lock:
+            self._avanzar(int(self._reloj()))
+            ventanas = {}
+            for nombre, (conteos, sumas) in self._totales.items():
+                total = sum(conteos)
+                ventanas[nombre] = {
+                    'segundos': self.ventanas[nombre],
+                    'total': total,
+                    'sentimientos': {
+                        sentimiento: {
+                            'cantidad': conteos[i],
+                            'proporcion': round(conteos[i] / total, 4) if total else 0.0,
+                            'confianza_media': round(sumas[i] / conteos[i], 4) if conteos[i] else None,
+                        }
+                        for i, sentimiento in enumerate(self.sentimientos)
+                    },
+                }
+            return {'instante': self._segundo, 'ventanas': ventanas}
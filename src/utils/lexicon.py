@@ -0,0 +1,122 @@
+import heapq
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class LexiconLemas:
+    """
+    Léxico memoizado token → lema, calentado con la salida de spaCy.
+
+    El vocabulario de redes sociales es muy repetitivo, así que la mayoría de los
+    tokens ya se han visto antes. Un token solo se sirve desde el léxico cuando se ha
+    observado un número mínimo de veces y siempre con el mismo lema; si spaCy le
+    asigna lemas distintos según el contexto, se marca como ambiguo y sigue pasando
+    por el modelo. El tamaño está acotado y se desalojan los tokens menos frecuentes.
+    """
+
+    def __init__(self, capacidad: int = 50000, min_frecuencia: int = 3) -> None:
+        """
+        Args:
+            capacidad (int): Número máximo de tokens guardados.
+            min_frecuencia (int): Observaciones necesarias antes de servir un token.
+        """
+        self.capacidad = capacidad
+        self.min_frecuencia = min_frecuencia
+        # token -> [lema (None si es ambiguo), frecuencia]
+        self._entradas: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+        self.aciertos_tokens = 0
+        self.fallos_tokens = 0
+        self.textos_sin_spacy = 0
+        self.textos_con_spacy = 0
+
+    def buscar(self, tokens: List[str]) -> Optional[List[str]]:
+        """
+        Devuelve los lemas de todos los tokens si todos están en el léxico,
+        o None si alguno necesita pasar por spaCy.
+        """
+        lemas = []
+        for token in tokens:
+            entrada = self._entradas.get(token)
+            if entrada is not None and entrada[0] is not None and entrada[1] >= self.min_frecuencia:
+                lemas.append(entrada[0])
+
+        # Se consulta desde varios hilos: los contadores se actualizan con el lock, una vez por texto.
+        completo = len(lemas) == len(tokens)
+        with self._lock:
+            self.aciertos_tokens += len(lemas)
+            self.fallos_tokens += len(tokens) - len(lemas)
+            if completo:
+                self.textos_sin_spacy += 1
+            else:
+                self.textos_con_spacy += 1
+        return lemas if completo else None
+
+    def aprender(self, pares: List[Tuple[str, str]]) -> None:
+        """Registra pares (token, lema) producidos por spaCy."""
+        with self._lock:
+            for token, lema in pares:
+                entrada = self._entradas.get(token)
+                if entrada is None:
+                    self._entradas[token] = [lema, 1]
+                else:
+                    if entrada[0] is not None and entrada[0] != lema:
+                        entrada[0] = None
+                    entrada[1] += 1
+
+            if len(self._entradas) > self.capacidad:
+                self._desalojar()
+
+    def _desalojar(self) -> None:
+        """Elimina los tokens menos frecuentes hasta dejar un 10% de margen bajo la capacidad."""
+        sobrantes = len(self._entradas) - int(self.capacidad * 0.9)
+        menos_frecuentes = heapq.nsmallest(sobrantes, self._entradas.items(), key=lambda item: item[1][1])
+        for token, _ in menos_frecuentes:
+            del self._entradas[token]
+
+    def guardar(self, ruta: str) -> None:
+        """Guarda el léxico en un archivo JSON."""
+        with self._lock:
+            datos = {
+                'min_frecuencia': self.min_frecuencia,
+                'entradas': self._entradas,
+            }
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo, ensure_ascii=False)
+            os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, capacidad: int = 50000) -> 'LexiconLemas':
+        """Carga un léxico guardado; si el archivo no existe, devuelve uno vacío."""
+        if not os.path.exists(ruta):
+            return cls(capacidad=capacidad)
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        lexicon = cls(capacidad=capacidad, min_frecuencia=datos.get('min_frecuencia', 3))
+        lexicon._entradas = datos['entradas']
+        if len(lexicon._entradas) > capacidad:
+            lexicon._desalojar()
+        return lexicon
+
+    def estadisticas(self) -> Dict[str, any]:
+        """Devuelve la cobertura de textos y la tasa de aciertos por token."""
+        with self._lock:
+            tokens_en_lexicon = len(self._entradas)
+            tokens_ambiguos = sum(1 for lema, _ in self._entradas.values() if lema is None)
+        consultas_tokens = self.aciertos_tokens + self.fallos_tokens
+        textos = self.textos_sin_spacy + self.textos_con_spacy
+        return {
+            'tokens_en_lexicon': tokens_en_lexicon,
+            'tokens_ambiguos': tokens_ambiguos,
+            'capacidad': self.capacidad,
+            'aciertos_tokens': self.aciertos_tokens,
+            'fallos_tokens': self.fallos_tokens,
+            'tasa_aciertos_tokens': round(self.aciertos_tokens / consultas_tokens, 4) if consultas_tokens else 0.0,
+            'textos_sin_spacy': self.textos_sin_spacy,
+            'textos_con_spacy': self.textos_con_spacy,
+            'cobertura_textos': round(self.textos_sin_spacy / textos, 4) if textos else 0.0,
+        }
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Tuple, extra: str = '') -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+class _Metrica:
+    """Base de las métricas: nombre, ayuda, etiquetas y una serie por combinación de valores."""
+
+    TIPO = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> None:
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: Dict[Tuple, any] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple:
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"La métrica '{self.nombre}' espera las etiquetas {self.etiquetas}, no {tuple(etiquetas)}.")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def _lineas(self) -> List[str]:
+        raise NotImplementedError
+
+    def exponer(self) -> str:
+        with self._lock:
+            lineas = self._lineas()
+        cabecera = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.TIPO}"]
+        return '\n'.join(cabecera + lineas)
+
+
+class Contador(_Metrica):
+    """Valor que solo crece (peticiones, errores, predicciones)."""
+
+    TIPO = 'counter'
+
+    def inc(self, valor: float = 1.0, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0.0) + valor
+
+    def _lineas(self) -> List[str]:
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {valor}"
+                for clave, valor in sorted(self._series.items())]
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja (trabajo en curso, tamaño de una cola o de la caché)."""
+
+    TIPO = 'gauge'
+
+    def set(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = float(valor)
+
+    def inc(self, valor: float = 1.0, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0.0) + valor
+
+    def dec(self, valor: float = 1.0, **etiquetas) -> None:
+        self.inc(-valor, **etiquetas)
+
+    @contextmanager
+    def en_curso(self, **etiquetas) -> Iterator[None]:
+        """Suma uno mientras dura el bloque 'with'."""
+        self.inc(**etiquetas)
+        try:
+            yield
+        finally:
+            self.dec(**etiquetas)
+
+    def _lineas(self) -> List[str]:
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {valor}"
+                for clave, valor in sorted(self._series.items())]
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en cubetas acumuladas (latencias, tamaños de lote)."""
+
+    TIPO = 'histogram'
+    LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_LATENCIA) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                # [conteos por cubeta (sin acumular)..., conteo en +Inf], suma, total
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            else:
+                serie[0][-1] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas) -> Iterator[None]:
+        """Observa la duración en segundos del bloque 'with'."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def _lineas(self) -> List[str]:
+        lineas = []
+        for clave, (cubetas, suma, total) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.limites, cubetas):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.etiquetas, clave, 'le="%s"' % limite)
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {total}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas con exposición en el formato de texto de Prometheus.
+
+    La API lo sirve en /metrics; los scripts por lotes lo vuelcan a un archivo para
+    el textfile collector de node_exporter, así que ambos publican las mismas métricas.
+    """
+
+    def __init__(self) -> None:
+        self._metricas: Dict[str, _Metrica] = {}
+        self._colectores: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                # Registrar dos veces la misma métrica (p. ej. al recargar un módulo) devuelve la existente.
+                if type(existente) is not type(metrica) or existente.etiquetas != metrica.etiquetas:
+                    raise ValueError(f"La métrica '{metrica.nombre}' ya está registrada con otra definición.")
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   limites: Sequence[float] = Histograma.LIMITES_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def agregar_colector(self, colector: Callable[[], None]) -> None:
+        """Registra una función que actualiza medidores justo antes de cada exposición."""
+        self._colectores.append(colector)
+
+    def exponer(self) -> str:
+        """Devuelve todas las métricas en el formato de texto de Prometheus."""
+        for colector in self._colectores:
+            try:
+                colector()
+            except Exception as e:
+                print(f"⚠️ Error actualizando métricas: {e}")
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return '\n'.join(metrica.exponer() for metrica in metricas) + '\n'
+
+    def escribir_textfile(self, ruta: str) -> None:
+        """Escribe las métricas en un archivo de forma atómica (textfile collector)."""
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(self.exponer())
+        os.replace(temporal, ruta)
+
+
+# Registro compartido por todo el proceso.
+REGISTRO = RegistroMetricas()
+
+# --- Métricas de los componentes ---
+LATENCIA_PREPROCESAMIENTO = REGISTRO.histograma(
+    'sentimiento_preprocesamiento_segundos', 'Duración de cada llamada a LimpiaTexto.limpiar/limpiar_lote.')
+TEXTOS_PREPROCESADOS = REGISTRO.contador(
+    'sentimiento_textos_preprocesados_total', 'Textos limpiados por LimpiaTexto.')
+LATENCIA_INFERENCIA = REGISTRO.histograma(
+    'sentimiento_inferencia_segundos', 'Duración de cada llamada a AnalizadorSentimiento.analizar/analizar_lote.')
+TAMANO_LOTE_INFERENCIA = REGISTRO.histograma(
+    'sentimiento_inferencia_lote_textos', 'Textos enviados al modelo por llamada (tras caché y duplicados).',
+    limites=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+INFERENCIAS_EN_CURSO = REGISTRO.medidor(
+    'sentimiento_inferencias_en_curso', 'Llamadas de inferencia en ejecución.')
+PREDICCIONES = REGISTRO.contador(
+    'sentimiento_predicciones_total', 'Resultados devueltos por sentimiento predicho.', etiquetas=('sentimiento',))
+ERRORES = REGISTRO.contador(
+    'sentimiento_errores_total', 'Errores por etapa.', etiquetas=('etapa',))
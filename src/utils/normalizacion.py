@@ -0,0 +1,98 @@
+import re
+from typing import Dict
+
+
+class MotorNormalizacion:
+    """
+    Normalización precompilada de una sola pasada para LimpiaTexto.
+
+    Reemplaza los pasos sin spaCy (URLs, menciones, hashtags, emojis, puntuación y
+    números) por una única expresión regular con alternativas y un callback que
+    traduce los emojis del diccionario a palabras. El resultado es el mismo que
+    aplicar los pasos uno tras otro sobre el texto en minúsculas, salvo el caso
+    degenerado de un emoji de varios códigos (como '❤️') partido en dos por una URL,
+    mención o hashtag, que la limpieza por pasos vuelve a unir.
+    """
+
+    # Caracteres que sobreviven a la limpieza (ver LimpiaTexto._remover_puntuacion_y_numeros).
+    LETRAS_VALIDAS = 'a-záéíóúüñ'
+    CARACTERES_VALIDOS = LETRAS_VALIDAS + '\\s'
+    # Inicio de URL: las menciones y hashtags no deben comerse una URL pegada a ellos,
+    # porque en la limpieza original las URLs se eliminan antes.
+    _INICIO_URL = r'(?!https?://\S|www\.\S)'
+    # Equivalentes en RE2 (el motor de expresiones de pyarrow) de \w y \s de Python,
+    # que en RE2 solo cubren ASCII: sin ellos '@josé' dejaría la 'é' y un espacio de no
+    # separación no cortaría una URL.
+    _PALABRA_RE2 = r'[\p{L}\p{N}_]'
+    _ESPACIOS_RE2 = r'\t\n\x{0B}\f\r\x{1C}-\x{1F}\x{85}\p{Z}'
+
+    def __init__(self, emoji_dict: Dict[str, str]) -> None:
+        """
+        Args:
+            emoji_dict (Dict[str, str]): Emojis y la palabra por la que se sustituyen.
+        """
+        no_validos = re.compile(f'[^{self.CARACTERES_VALIDOS}]')
+        # La palabra se guarda ya sin los caracteres que el paso de puntuación eliminaría
+        # ("pulgar_arriba" -> "pulgararriba"), igual que en la limpieza por pasos.
+        self._palabras = {emoji: f" {no_validos.sub('', palabra)} " for emoji, palabra in emoji_dict.items()}
+
+        emojis = sorted(emoji_dict, key=len, reverse=True)
+        # Los caracteres que inician una alternativa no pueden formar parte de una
+        # racha de puntuación, o la racha se tragaría la mención, el hashtag o el emoji.
+        iniciales = re.escape(''.join({'@', '#'} | {emoji[0] for emoji in emojis}))
+
+        self.patron = re.compile(
+            r'https?://\S+|www\.\S+'
+            rf'|@(?:{self._INICIO_URL}\w)+'
+            rf'|#(?:{self._INICIO_URL}\w)+'
+            + ''.join(f'|{re.escape(emoji)}' for emoji in emojis)
+            + f'|[^{self.CARACTERES_VALIDOS}{iniciales}]+'
+            + f'|[{iniciales}]'
+        )
+
+        # Pasos de `normalizar_serie`, en la sintaxis RE2 de pyarrow.
+        no_espacio = f'[^{self._ESPACIOS_RE2}]'
+        self._patron_urls_re2 = rf'https?://{no_espacio}+|www\.{no_espacio}+'
+        self._patron_menciones_re2 = rf'[@#]{self._PALABRA_RE2}+'
+        self._patron_no_validos_re2 = f'[^{self.LETRAS_VALIDAS}{self._ESPACIOS_RE2}]+'
+
+    def _reemplazo(self, coincidencia: re.Match) -> str:
+        return self._palabras.get(coincidencia.group(0), '')
+
+    def normalizar(self, texto: str) -> str:
+        """Pasa el texto a minúsculas y aplica todos los pasos sin spaCy en una sola pasada."""
+        return self.patron.sub(self._reemplazo, texto.lower())
+
+    def normalizar_serie(self, serie):
+        """
+        Versión vectorizada para trabajos por lotes sobre una `pandas.Series` de textos
+        (dtype object, `string`, `string[pyarrow]` o `pd.ArrowDtype(pa.string())`).
+
+        Los pasos se aplican en orden, como en la limpieza original, con las funciones
+        de `pyarrow.compute` sobre todo el array: minúsculas, una expresión regular
+        para las URLs y otra para menciones y hashtags, un reemplazo literal por emoji
+        del diccionario y una última expresión para la puntuación, los números y el
+        resto de emojis. Ningún paso llama a Python por texto. Devuelve una Series con
+        el mismo índice, nombre y dtype; los valores nulos se conservan.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            raise ImportError(
+                "La normalización vectorizada necesita pyarrow. "
+                "Instálalo ejecutando: pip install pyarrow"
+            )
+
+        textos = pa.array(serie, from_pandas=True)
+        if not (pa.types.is_string(textos.type) or pa.types.is_large_string(textos.type)
+                or pa.types.is_null(textos.type)):
+            raise TypeError(f"normalizar_serie espera una Series de textos, no de {textos.type}.")
+
+        textos = pc.utf8_lower(textos)
+        textos = pc.replace_substring_regex(textos, self._patron_urls_re2, '')
+        textos = pc.replace_substring_regex(textos, self._patron_menciones_re2, '')
+        for emoji, palabra in self._palabras.items():
+            textos = pc.replace_substring(textos, emoji, palabra)
+        textos = pc.replace_substring_regex(textos, self._patron_no_validos_re2, '')
+        return type(serie)(textos, dtype=serie.dtype, index=serie.index, name=serie.name)
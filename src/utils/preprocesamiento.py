@@ -1,6 +1,12 @@
 import re
-import spacy
+import threading
+import time
 import unicodedata
+from typing import Any, Dict, List, Optional, Set
+
+from src.utils.lexicon import LexiconLemas
+from src.utils.metricas import ERRORES, LATENCIA_PREPROCESAMIENTO, TEXTOS_PREPROCESADOS
+from src.utils.normalizacion import MotorNormalizacion
 
 class LimpiaTexto:
     """
@@ -9,30 +15,27 @@ class LimpiaTexto:
     eliminación de URLs, menciones, hashtags, puntuación, números y emojis.
     """
 
-    def __init__(self):
+    MODELO_SPACY = "es_core_news_sm"
+    COMPONENTES_EXCLUIDOS = ["parser", "ner"]
+    # Palabras cruciales para el sentimiento que NO deben eliminarse como stopwords.
+    PALABRAS_A_CONSERVAR = {'sin', 'no', 'ni', 'nunca', 'tampoco', 'falta', 'problema', 'bien', 'bueno','buena','más o menos'}
+    # El pipeline de spaCy se carga una vez por proceso y lo comparten todas las instancias.
+    _modelos_nlp: Dict[str, Any] = {}
+    _lock_carga = threading.Lock()
+
+    def __init__(self, lexicon: Optional[LexiconLemas] = None):
         """
-        Inicializa la clase cargando el modelo de spaCy y creando una lista
-        de stopwords personalizada para no eliminar negaciones importantes que
-        cambian el significado del sentimiento.
+        Inicializa la clase. El modelo de spaCy (y con él la lista de stopwords
+        personalizada) no se carga aquí sino con `cargar()` o en la primera limpieza,
+        para que importar y construir el limpiador sea inmediato.
+
+        Args:
+            lexicon (LexiconLemas, opcional): Léxico token → lema. Si se indica, los
+                textos cuyos tokens ya están todos en el léxico no pasan por spaCy.
         """
-        try:
-            self.nlp = spacy.load("es_core_news_sm")
-        except OSError:
-            raise ImportError(
-                "El modelo 'es_core_news_sm' de spaCy no está instalado. "
-                "Instálalo ejecutando: python -m spacy download es_core_news_sm"
-            )
-
-        # --- INICIO DE LA CORRECCIÓN DE STOPWORDS ---
-        # 1. Cargar la lista de stopwords por defecto de spaCy
-        stopwords_por_defecto = self.nlp.Defaults.stop_words
-        
-        # 2. Definir palabras que son cruciales para el sentimiento y NO deben ser eliminadas
-        palabras_a_conservar = {'sin', 'no', 'ni', 'nunca', 'tampoco', 'falta', 'problema', 'bien', 'bueno','buena','más o menos'}
-        
-        # 3. Crear la nueva lista de stopwords personalizada restando las palabras a conservar
-        self.stopwords = stopwords_por_defecto - palabras_a_conservar
-        # --- FIN DE LA CORRECCIÓN DE STOPWORDS ---
+        self.lexicon = lexicon
+        self._nlp = None
+        self._stopwords: Optional[Set[str]] = None
 
         # Diccionario básico de emojis comunes en español
         self.emoji_dict = {
@@ -41,6 +44,59 @@ class LimpiaTexto:
             '😎': 'cool', '😉': 'guiño',
         }
 
+        # Pasos sin spaCy precompilados en una sola expresión regular.
+        self.motor = MotorNormalizacion(self.emoji_dict)
+
+    def cargar(self) -> 'LimpiaTexto':
+        """
+        Carga el modelo de spaCy (si no está ya cargado en el proceso) y crea la lista
+        de stopwords personalizada para no eliminar negaciones importantes que
+        cambian el significado del sentimiento. Es bloqueante y se puede llamar varias veces.
+        """
+        if self._nlp is not None:
+            return self
+        with LimpiaTexto._lock_carga:
+            if self.MODELO_SPACY not in LimpiaTexto._modelos_nlp:
+                import spacy
+                try:
+                    # Solo se cargan los componentes necesarios para los lemas: el parser y el NER
+                    # no se usan en la limpieza y son la parte más costosa del pipeline.
+                    LimpiaTexto._modelos_nlp[self.MODELO_SPACY] = spacy.load(
+                        self.MODELO_SPACY, exclude=self.COMPONENTES_EXCLUIDOS
+                    )
+                except OSError:
+                    raise ImportError(
+                        "El modelo 'es_core_news_sm' de spaCy no está instalado. "
+                        "Instálalo ejecutando: python -m spacy download es_core_news_sm"
+                    )
+            nlp = LimpiaTexto._modelos_nlp[self.MODELO_SPACY]
+            # Stopwords por defecto de spaCy, menos las palabras a conservar.
+            self._stopwords = nlp.Defaults.stop_words - self.PALABRAS_A_CONSERVAR
+            self._nlp = nlp
+        return self
+
+    def calentar(self) -> None:
+        """Carga el modelo y pasa un texto de prueba para que la primera limpieza real no pague la inicialización."""
+        self.cargar()
+        list(self.nlp.pipe(["Calentamiento del modelo de limpieza."]))
+
+    @property
+    def cargado(self) -> bool:
+        return self._nlp is not None
+
+    @property
+    def nlp(self):
+        """Pipeline de spaCy; se carga en el primer uso."""
+        if self._nlp is None:
+            self.cargar()
+        return self._nlp
+
+    @property
+    def stopwords(self) -> Set[str]:
+        if self._stopwords is None:
+            self.cargar()
+        return self._stopwords
+
     def limpiar(self, texto: str) -> str:
         """
         Método principal para limpiar el texto. Aplica los pasos de preprocesamiento en orden.
@@ -51,15 +107,49 @@ class LimpiaTexto:
         Returns:
             str: Texto procesado y limpio.
         """
-        texto = self._a_minusculas(texto)
-        texto = self._remover_urls(texto)
-        texto = self._remover_menciones_hashtags(texto)
-        texto = self._remover_emojis(texto)
-        texto = self._remover_puntuacion_y_numeros(texto)
-        texto = self._remover_stopwords(texto)
-        texto = self._lematizar(texto)
+        return self.limpiar_lote([texto])[0]
+
+    def limpiar_lote(self, textos: List[str], n_process: int = 1, batch_size: int = 256) -> List[str]:
+        """
+        Limpia una lista de textos con una sola pasada del modelo de spaCy.
+
+        La remoción de stopwords solo necesita los tokens, así que se hace con el
+        tokenizer (que no depende de los componentes del pipeline). Los textos
+        filtrados pasan después una única vez por `nlp.pipe` para lematizarlos.
+        El resultado es idéntico al de aplicar `_remover_stopwords` y `_lematizar`
+        por separado a cada texto.
+
+        Args:
+            textos (List[str]): Textos originales extraídos de redes sociales.
+            n_process (int): Procesos que usa spaCy para la lematización.
+            batch_size (int): Textos por lote en `nlp.pipe`.
+
+        Returns:
+            List[str]: Textos procesados y limpios, en el mismo orden.
+        """
+        inicio = time.perf_counter()
+        try:
+            limpios = self._procesar_lote(textos, n_process, batch_size)
+        except Exception:
+            ERRORES.inc(etapa='preprocesamiento')
+            raise
+        finally:
+            LATENCIA_PREPROCESAMIENTO.observar(time.perf_counter() - inicio)
+        TEXTOS_PREPROCESADOS.inc(len(textos))
+        return limpios
+
+    def _procesar_lote(self, textos: List[str], n_process: int, batch_size: int) -> List[str]:
+        """Pasos de `limpiar_lote`, sin la instrumentación."""
+        normalizados = [self.motor.normalizar(texto) for texto in textos]
+
+        sin_stopwords = [
+            ' '.join(token.text for token in doc if token.text not in self.stopwords)
+            for doc in self.nlp.tokenizer.pipe(normalizados, batch_size=batch_size)
+        ]
+
+        lematizados = self._lematizar_lote(sin_stopwords, n_process=n_process, batch_size=batch_size)
         # Quitar espacios extra que puedan quedar
-        return " ".join(texto.split())
+        return [" ".join(texto.split()) for texto in lematizados]
 
     def _a_minusculas(self, texto: str) -> str:
         """Convierte todo el texto a minúsculas."""
@@ -110,6 +200,31 @@ class LimpiaTexto:
 
     def _lematizar(self, texto: str) -> str:
         """Aplica lematización para reducir cada palabra a su raíz."""
-        doc = self.nlp(texto)
-        lemas = [token.lemma_ for token in doc if not token.is_space]
-        return ' '.join(lemas)
\ No newline at end of file
+        return self._lematizar_lote([texto])[0]
+
+    def _lematizar_lote(self, textos: List[str], n_process: int = 1, batch_size: int = 256) -> List[str]:
+        """
+        Lematiza varios textos. Con léxico, los textos cuyos tokens están todos en él
+        se resuelven sin spaCy; el resto pasa por `nlp.pipe` y alimenta el léxico.
+        """
+        if self.lexicon is None:
+            return [
+                ' '.join(token.lemma_ for token in doc if not token.is_space)
+                for doc in self.nlp.pipe(textos, n_process=n_process, batch_size=batch_size)
+            ]
+
+        lematizados: List[Optional[str]] = [None] * len(textos)
+        pendientes = []
+        for i, doc in enumerate(self.nlp.tokenizer.pipe(textos, batch_size=batch_size)):
+            lemas = self.lexicon.buscar([token.text for token in doc if not token.is_space])
+            if lemas is None:
+                pendientes.append(i)
+            else:
+                lematizados[i] = ' '.join(lemas)
+
+        docs = self.nlp.pipe([textos[i] for i in pendientes], n_process=n_process, batch_size=batch_size)
+        for i, doc in zip(pendientes, docs):
+            pares = [(token.text, token.lemma_) for token in doc if not token.is_space]
+            self.lexicon.aprender(pares)
+            lematizados[i] = ' '.join(lema for _, lema in pares)
+        return lematizados
\ No newline at end of file
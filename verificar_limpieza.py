@@ -0,0 +1,74 @@
+# filename: verificar_limpieza.py
+
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+import spacy
+
+from src.utils.preprocesamiento import LimpiaTexto
+
+# --- 1. CONFIGURACIÓN ---
+NOMBRE_DATASET_CSV = 'dataset_sentimiento.csv'
+RUTA_BASE_DATOS = 'sentimientos.db'
+PATRON_COMENTARIOS = 'comentarios_*.txt'
+
+
+def cargar_corpus_regresion() -> list[str]:
+    """Reúne el corpus de regresión: dataset etiquetado, comentarios extraídos y base de datos."""
+    textos = pd.read_csv(NOMBRE_DATASET_CSV)['texto'].dropna().astype(str).tolist()
+    for ruta in glob.glob(PATRON_COMENTARIOS):
+        with open(ruta, encoding='utf-8') as archivo:
+            textos.extend(linea.strip() for linea in archivo if linea.strip())
+    if os.path.exists(RUTA_BASE_DATOS):
+        conn = sqlite3.connect(RUTA_BASE_DATOS)
+        textos.extend(fila[0] for fila in conn.execute("SELECT texto_original FROM analisis"))
+        conn.close()
+    return textos
+
+
+def limpiar_referencia(limpiador: LimpiaTexto, nlp_completo, texto: str) -> str:
+    """
+    Limpieza original: pipeline completo de spaCy ejecutado dos veces por texto,
+    una para las stopwords y otra para los lemas.
+    """
+    texto = limpiador._a_minusculas(texto)
+    texto = limpiador._remover_urls(texto)
+    texto = limpiador._remover_menciones_hashtags(texto)
+    texto = limpiador._remover_emojis(texto)
+    texto = limpiador._remover_puntuacion_y_numeros(texto)
+    texto = ' '.join(token.text for token in nlp_completo(texto) if token.text not in limpiador.stopwords)
+    texto = ' '.join(token.lemma_ for token in nlp_completo(texto) if not token.is_space)
+    return " ".join(texto.split())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprueba que limpiar_lote produce lo mismo que la limpieza original.")
+    parser.add_argument('--n-process', type=int, default=1, help="Procesos de spaCy para limpiar_lote.")
+    parser.add_argument('--batch-size', type=int, default=256, help="Textos por lote en limpiar_lote.")
+    args = parser.parse_args()
+
+    textos = cargar_corpus_regresion()
+    limpiador = LimpiaTexto()
+    nlp_completo = spacy.load("es_core_news_sm")
+
+    inicio = time.perf_counter()
+    esperados = [limpiar_referencia(limpiador, nlp_completo, texto) for texto in textos]
+    tiempo_referencia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenidos = limpiador.limpiar_lote(textos, n_process=args.n_process, batch_size=args.batch_size)
+    tiempo_lote = time.perf_counter() - inicio
+
+    diferencias = [(t, e, o) for t, e, o in zip(textos, esperados, obtenidos) if e != o]
+    print(f"--- Regresión de limpieza ({len(textos)} textos) ---")
+    print(f"   - Original: {tiempo_referencia:.3f}s | limpiar_lote: {tiempo_lote:.3f}s (x{tiempo_referencia / tiempo_lote:.2f})")
+    print(f"   - Diferencias: {len(diferencias)}")
+    for texto, esperado, obtenido in diferencias[:20]:
+        print(f"     * {texto!r}\n       esperado: {esperado!r}\n       obtenido: {obtenido!r}")
+
+    sys.exit(1 if diferencias else 0)